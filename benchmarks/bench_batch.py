@@ -0,0 +1,56 @@
+# benchmarks/bench_batch.py
+"""
+Batch mode: sequential loop vs concurrent fan-out of a "transcripts" request.
+
+Posts one batch of LEAD_CREATE transcripts against an async CRM stand-in with
+a fixed latency and reports wall time per BATCH_CONCURRENCY setting
+(1 reproduces the old one-after-another loop).
+
+    python -m benchmarks.bench_batch [--size 50] [--delay 0.05] [--limits 1 10 50]
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot.settings import settings
+
+
+class SlowCRM:
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def create_lead(self, name, phone, city=None, source=None):
+        await asyncio.sleep(self.delay)
+        return {"lead_id": "bench", "status": "NEW"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=50, help="transcripts per batch")
+    parser.add_argument("--delay", type=float, default=0.05, help="simulated CRM latency in seconds")
+    parser.add_argument("--limits", type=int, nargs="+", default=[1, 10, 50])
+    args = parser.parse_args()
+
+    bot_app.async_crm_client_instance = SlowCRM(args.delay)
+    client = TestClient(bot_app.app)
+    batch = {"transcripts": ["Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"] * args.size}
+    client.post("/bot/handle", json={"transcripts": batch["transcripts"][:2]})  # warm up
+
+    print(f"{args.size} transcripts, CRM delay {args.delay * 1000:.0f} ms")
+    print(f"{'concurrency':>12}{'wall ms':>10}{'speedup':>10}")
+    baseline = None
+    for limit in args.limits:
+        settings.BATCH_CONCURRENCY = limit
+        start = time.perf_counter()
+        resp = client.post("/bot/handle", json=batch)
+        elapsed = time.perf_counter() - start
+        assert resp.status_code == 200 and len(resp.json()["responses"]) == args.size
+        baseline = baseline or elapsed
+        print(f"{limit:>12}{elapsed * 1000:>10.0f}{baseline / elapsed:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# benchmarks/bench_bulk_crm.py
+"""
+Batch CRM writes: one request per item vs coalesced bulk calls, against
+mock_crm served by uvicorn on a local port.
+
+Posts one batch of LEAD_CREATE transcripts through the app with the async
+HTTP client and reports wall time and CRM round trips with CRM_BULK off and on.
+
+    python -m benchmarks.bench_bulk_crm [--size 200] [--max-items 100]
+"""
+import argparse
+import time
+
+from fastapi.testclient import TestClient
+
+import mock_crm
+from bot import app as bot_app
+from bot.crm_client import AsyncHTTPCRMClient
+from bot.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=200, help="transcripts per batch")
+    parser.add_argument("--max-items", type=int, default=100, help="CRM_BULK_MAX_ITEMS")
+    args = parser.parse_args()
+
+    server, base_url = mock_crm.serve_in_background()
+    crm = AsyncHTTPCRMClient(base_url)
+    round_trips = 0
+    original_post = crm._post
+
+    async def counting_post(path, payload, timeout):
+        nonlocal round_trips
+        round_trips += 1
+        return await original_post(path, payload, timeout)
+
+    crm._post = counting_post
+    bot_app.async_crm_client_instance = crm
+    settings.CRM_BULK_MAX_ITEMS = args.max_items
+    client = TestClient(bot_app.app)
+    batch = {"transcripts": ["Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"] * args.size}
+
+    print(f"{args.size} transcripts, bulk chunks of {args.max_items}")
+    print(f"{'mode':<10}{'wall ms':>10}{'round trips':>13}{'speedup':>10}")
+    baseline = None
+    for mode, bulk in (("per-item", False), ("bulk", True)):
+        settings.CRM_BULK = bulk
+        client.post("/bot/handle", json={"transcripts": batch["transcripts"][:2]})  # warm up
+        round_trips = 0
+        start = time.perf_counter()
+        resp = client.post("/bot/handle", json=batch)
+        elapsed = time.perf_counter() - start
+        assert resp.status_code == 200 and len(resp.json()["responses"]) == args.size
+        baseline = baseline or elapsed
+        print(f"{mode:<10}{elapsed * 1000:>10.0f}{round_trips:>13}{baseline / elapsed:>9.1f}x")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
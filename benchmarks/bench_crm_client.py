@@ -0,0 +1,59 @@
+# benchmarks/bench_crm_client.py
+"""
+CRM client throughput: pooled keep-alive connections vs a new connection per
+request, against mock_crm served by uvicorn on a local port.
+
+    python -m benchmarks.bench_crm_client [--requests 500] [--threads 1 8]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import mock_crm
+from bot.crm_client import HTTPCRMClient
+
+PAYLOAD = {"name": "Rohan Sharma", "phone": "9876543210", "city": "Gurgaon", "source": "Instagram"}
+
+
+def run(call, n_requests: int, threads: int) -> float:
+    start = time.perf_counter()
+    if threads == 1:
+        for _ in range(n_requests):
+            call()
+    else:
+        with ThreadPoolExecutor(threads) as pool:
+            list(pool.map(lambda _: call(), range(n_requests)))
+    return n_requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    server, base_url = mock_crm.serve_in_background()
+    pooled = HTTPCRMClient(base_url, max_connections=max(args.threads), max_keepalive_connections=max(args.threads))
+    # Same client, but no keep-alive: every request opens and closes a TCP connection
+    unpooled = HTTPCRMClient(base_url, max_keepalive_connections=0)
+
+    def per_request():
+        unpooled.create_lead(**PAYLOAD)
+
+    def pooled_call():
+        pooled.create_lead(**PAYLOAD)
+
+    print(f"{'threads':>8}{'per-request/s':>16}{'pooled/s':>12}{'speedup':>10}")
+    for threads in args.threads:
+        run(pooled_call, 20, threads)  # warm up
+        fresh = run(per_request, args.requests, threads)
+        reused = run(pooled_call, args.requests, threads)
+        print(f"{threads:>8}{fresh:>16,.0f}{reused:>12,.0f}{reused / fresh:>9.2f}x")
+
+    pooled.close()
+    unpooled.close()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
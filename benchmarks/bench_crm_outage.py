@@ -0,0 +1,72 @@
+# benchmarks/bench_crm_outage.py
+"""
+CRM outage: request latency and CRM load with and without the circuit breaker.
+
+The CRM stand-in takes --delay seconds and then answers 503 to every call.
+Fires LEAD_CREATE requests at the app in-process and reports p50/p99 latency
+and how many calls reached the CRM.
+
+    python -m benchmarks.bench_crm_outage [--requests 300] [--concurrency 20] [--delay 0.1]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from bot import app as bot_app
+from bot.crm_client import AsyncHTTPCRMClient, build_resilience_policy
+from bot.settings import settings
+
+
+async def load(n_requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=bot_app.app)
+    gate = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bot") as client:
+        async def one():
+            async with gate:
+                start = time.perf_counter()
+                resp = await client.post("/bot/handle", json={
+                    "transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+                })
+                latencies.append(time.perf_counter() - start)
+                statuses.append(resp.status_code)
+
+        await asyncio.gather(*[one() for _ in range(n_requests)])
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.1, help="seconds the failing CRM takes to answer")
+    args = parser.parse_args()
+
+    print(f"CRM answers 503 after {args.delay * 1000:.0f} ms; {args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'mode':<10}{'p50 ms':>9}{'p99 ms':>9}{'CRM calls':>11}{'  statuses'}")
+    for mode in ("no-breaker", "breaker"):
+        calls = 0
+
+        async def outage(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(args.delay)
+            return httpx.Response(503, json={"detail": "down"})
+
+        settings.CRM_BREAKER = mode == "breaker"
+        bot_app.async_crm_client_instance = AsyncHTTPCRMClient(
+            "http://crm", transport=httpx.MockTransport(outage), resilience=build_resilience_policy()
+        )
+        latencies, statuses = asyncio.run(load(args.requests, args.concurrency))
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        counts = {code: statuses.count(code) for code in sorted(set(statuses))}
+        print(f"{mode:<10}{statistics.median(latencies) * 1000:>9.1f}{p99 * 1000:>9.1f}{calls:>11}  {counts}")
+
+
+if __name__ == "__main__":
+    main()
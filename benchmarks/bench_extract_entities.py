@@ -0,0 +1,153 @@
+# benchmarks/bench_extract_entities.py
+"""
+Micro-benchmark for bot.app.extract_entities.
+
+Compares the precompiled extraction engine against the original
+implementation (kept below verbatim as `baseline_extract_entities`) and
+reports transcripts/sec per intent. Run from the repo root:
+
+    python -m benchmarks.bench_extract_entities [--seconds 1.0]
+"""
+import argparse
+import re
+import time
+from typing import Dict
+
+import dateparser
+
+from bot.app import extract_entities
+
+CORPUS = {
+    "LEAD_CREATE": [
+        "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210, source Instagram.",
+        "Add a new lead Test User from Delhi phone 9876543210 source Instagram.",
+        "Add a new lead: Priya Nair from Mumbai, phone 91234-56789",
+        "Create lead name Priya Nair, city Mumbai.",
+        "New lead Amit Verma contact 98 765 43 210 from Pune source Referral",
+    ],
+    "LEAD_UPDATE": [
+        "Update lead 65ce1c14 to in progress",
+        "Update lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab to WON notes booked unit A2",
+        "Mark lead 12345678 as lost notes: budget mismatch",
+        "Change lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab to follow up",
+    ],
+    "VISIT_SCHEDULE": [
+        "Schedule a visit for lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab at 2025-10-02T17:00:00+05:30",
+        "Fix a site visit for lead 65ce1c14 at 2025-10-05T11:30:00+05:30 notes bring brochure",
+    ],
+}
+
+
+# ------------------------------
+# Baseline (pre-optimisation) implementation
+# ------------------------------
+def baseline_extract_entities(transcript: str, intent: str) -> Dict:
+    entities = {
+        "name": None, "phone": None, "city": None, "source": None,
+        "lead_id": None, "visit_time": None, "notes": None, "status": None
+    }
+
+    if intent == "LEAD_CREATE":
+        name_patterns = [
+            r'(?:lead[:\s]+)([A-Za-z\s]+?)(?:\s+from|\s+phone|\s+,|\s+contact|$)',
+            r'(?:name\s+)([A-Za-z\s]+?)(?:\s+from|\s+phone|\s+,|\s+contact|$)'
+        ]
+        for pattern in name_patterns:
+            name_match = re.search(pattern, transcript, re.IGNORECASE)
+            if name_match:
+                entities["name"] = name_match.group(1).strip()
+                break
+
+        phone_patterns = [
+            r'(?:phone|contact)[:\s]*([0-9\s\-+]+)',
+            r'(\d{2}\s*\d{3}\s*\d{2}\s*\d{3})',
+            r'(\d{5}\-\d{5})',
+            r'(\d{10})'
+        ]
+        for pattern in phone_patterns:
+            phone_match = re.search(pattern, transcript, re.IGNORECASE)
+            if phone_match:
+                entities["phone"] = re.sub(r'[\s\-+]', '', phone_match.group(1))
+                break
+
+        city_match = re.search(r'from\s+([A-Za-z]+)', transcript, re.IGNORECASE)
+        if city_match:
+            entities["city"] = city_match.group(1)
+        elif re.search(r'city\s+([A-Za-z]+)', transcript, re.IGNORECASE):
+            city_match = re.search(r'city\s+([A-Za-z]+)', transcript, re.IGNORECASE)
+            entities["city"] = city_match.group(1)
+
+        source_match = re.search(r'source\s+([A-Za-z]+)', transcript, re.IGNORECASE)
+        if source_match:
+            entities["source"] = source_match.group(1)
+
+    elif intent == "LEAD_UPDATE":
+        for pattern in [r'lead\s+([a-f0-9\-]{8,})', r'lead\s+([a-f0-9]{8})']:
+            lead_id_match = re.search(pattern, transcript, re.IGNORECASE)
+            if lead_id_match:
+                entities["lead_id"] = lead_id_match.group(1)
+                break
+
+        if "in progress" in transcript.lower() or "in_progress" in transcript.lower():
+            entities["status"] = "IN_PROGRESS"
+        elif "won" in transcript.lower():
+            entities["status"] = "WON"
+        elif "lost" in transcript.lower():
+            entities["status"] = "LOST"
+        elif "follow_up" in transcript.lower() or "follow up" in transcript.lower():
+            entities["status"] = "FOLLOW_UP"
+        elif "new" in transcript.lower():
+            entities["status"] = "NEW"
+
+        notes_match = re.search(r'notes[:\s]+(.+)', transcript, re.IGNORECASE)
+        if notes_match:
+            entities["notes"] = notes_match.group(1).strip()
+
+    elif intent == "VISIT_SCHEDULE":
+        for pattern in [r'lead\s+([a-f0-9\-]{8,})', r'lead\s+([a-f0-9]{8})']:
+            lead_id_match = re.search(pattern, transcript, re.IGNORECASE)
+            if lead_id_match:
+                entities["lead_id"] = lead_id_match.group(1)
+                break
+
+        time_match = re.search(r'at\s+(.+?)(?:\s+notes|$)', transcript, re.IGNORECASE)
+        if time_match:
+            time_str = time_match.group(1).strip()
+            try:
+                parsed_time = dateparser.parse(time_str)
+                entities["visit_time"] = parsed_time.isoformat() if parsed_time else time_str
+            except Exception:
+                entities["visit_time"] = time_str
+
+    return entities
+
+
+def throughput(fn, samples, seconds: float) -> float:
+    """Return calls/sec of fn over the (transcript, intent) samples."""
+    done = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for transcript, intent in samples:
+            fn(transcript, intent)
+        done += len(samples)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per measurement")
+    args = parser.parse_args()
+
+    print(f"{'intent':<16}{'before/s':>12}{'after/s':>12}{'speedup':>10}")
+    for intent, transcripts in CORPUS.items():
+        samples = [(t, intent) for t in transcripts]
+        for transcript, _ in samples:
+            assert extract_entities(transcript, intent) == baseline_extract_entities(transcript, intent), transcript
+        before = throughput(baseline_extract_entities, samples, args.seconds)
+        after = throughput(extract_entities, samples, args.seconds)
+        print(f"{intent:<16}{before:>12,.0f}{after:>12,.0f}{after / before:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
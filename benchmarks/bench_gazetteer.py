@@ -0,0 +1,84 @@
+# benchmarks/bench_gazetteer.py
+"""
+Gazetteer at 50k entries: build time, memory and lookup throughput.
+
+Builds a synthetic gazetteer of multi-word place names with aliases and
+misspellings, then scans transcripts that mention some of them. The naive
+baseline checks every surface form with a substring test.
+
+    python -m benchmarks.bench_gazetteer [--entries 50000] [--transcripts 20000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from bot.gazetteer import Gazetteer
+
+SYLLABLES = ["ka", "ra", "pu", "na", "de", "li", "ban", "ga", "lo", "re", "mum", "bai", "che", "nai", "jai",
+             "hy", "dra", "bad", "ko", "ta", "sur", "at", "in", "dor", "nag", "pat", "vi", "sha", "kha", "pur"]
+
+
+def make_entries(n: int, rng: random.Random):
+    mapping = {}
+    while len(mapping) < n:
+        words = [
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+            for _ in range(rng.choice((1, 1, 1, 2, 2, 3)))
+        ]
+        canonical = " ".join(words)
+        if canonical in mapping:
+            continue
+        aliases = []
+        for _ in range(rng.randint(0, 2)):
+            word = list(rng.choice(words).lower())
+            i = rng.randrange(len(word) - 1)
+            word[i], word[i + 1] = word[i + 1], word[i]  # transposition typo
+            aliases.append(canonical.lower().replace("".join(words[0].lower()), "".join(word), 1))
+        mapping[canonical] = aliases
+    return mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--transcripts", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    mapping = make_entries(args.entries, rng)
+    names = list(mapping)
+    transcripts = [
+        f"Add a new lead Asha Rao from {rng.choice(names)}, phone 98{rng.randrange(10 ** 8):08d}, source Instagram"
+        for _ in range(args.transcripts)
+    ]
+
+    start = time.perf_counter()
+    gazetteer = Gazetteer.from_mapping(mapping)
+    build = time.perf_counter() - start
+    # A second build under tracemalloc, which slows it down, just for its size
+    del gazetteer
+    tracemalloc.start()
+    gazetteer = Gazetteer.from_mapping(mapping)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{len(gazetteer):,} surface forms for {len(mapping):,} names: "
+          f"build {build * 1000:.0f} ms, {memory / 2 ** 20:.1f} MiB")
+
+    start = time.perf_counter()
+    found = sum(gazetteer.find(t, ("from",)) is not None for t in transcripts)
+    elapsed = time.perf_counter() - start
+    print(f"trie:  {len(transcripts) / elapsed:>10,.0f} transcripts/s ({found} matched)")
+
+    surfaces = [surface.lower() for canonical, aliases in mapping.items() for surface in (canonical, *aliases)]
+    sample = transcripts[:50]
+    start = time.perf_counter()
+    for text in sample:
+        lowered = text.lower()
+        max((s for s in surfaces if s in lowered), key=len, default=None)
+    elapsed = time.perf_counter() - start
+    print(f"naive: {len(sample) / elapsed:>10,.0f} transcripts/s (substring test per surface form)")
+
+
+if __name__ == "__main__":
+    main()
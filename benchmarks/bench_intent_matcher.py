@@ -0,0 +1,78 @@
+# benchmarks/bench_intent_matcher.py
+"""
+Intent keyword matching: per-keyword substring loop vs Aho-Corasick automaton.
+
+Builds phrase tables of 10, 100 and 1000 trigger phrases spread over a set of
+intents and reports transcripts/sec for both strategies. Run from the repo
+root:
+
+    python -m benchmarks.bench_intent_matcher [--seconds 1.0]
+"""
+import argparse
+import random
+import time
+
+from bot.matcher import KeywordAutomaton
+
+WORDS = [
+    "lead", "visit", "schedule", "update", "mark", "set", "change", "create",
+    "add", "new", "site", "book", "call", "cancel", "reschedule", "follow",
+    "status", "client", "customer", "meeting", "tour", "flat", "plot", "unit",
+]
+INTENTS = ["LEAD_CREATE", "VISIT_SCHEDULE", "LEAD_UPDATE", "CALLBACK", "CANCEL"]
+
+TRANSCRIPTS = [
+    "add a new lead: rohan sharma from gurgaon, phone 9876543210, source instagram.",
+    "schedule a visit for lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab at 3 pm tomorrow",
+    "update lead 65ce1c14 to won notes booked unit a2",
+    "can you help me with something?",
+]
+
+
+def make_table(n_phrases: int, seed: int = 7):
+    rng = random.Random(seed)
+    table = {intent: [] for intent in INTENTS}
+    seen = set()
+    while len(seen) < n_phrases:
+        phrase = " ".join(rng.sample(WORDS, rng.randint(2, 3)))
+        if phrase not in seen:
+            seen.add(phrase)
+            table[rng.choice(INTENTS)].append(phrase)
+    return table
+
+
+def naive_labels(table, text):
+    return {intent for intent, phrases in table.items() if any(p in text for p in phrases)}
+
+
+def throughput(fn, seconds: float) -> float:
+    done = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for text in TRANSCRIPTS:
+            fn(text)
+        done += len(TRANSCRIPTS)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per measurement")
+    args = parser.parse_args()
+
+    print(f"{'phrases':>8}{'build ms':>10}{'states':>8}{'loop/s':>12}{'automaton/s':>14}{'speedup':>10}")
+    for n in (10, 100, 1000):
+        table = make_table(n)
+        start = time.perf_counter()
+        automaton = KeywordAutomaton((p, intent) for intent, phrases in table.items() for p in phrases)
+        build_ms = (time.perf_counter() - start) * 1000
+        for text in TRANSCRIPTS:
+            assert automaton.find_labels(text) == naive_labels(table, text), text
+        loop = throughput(lambda t: naive_labels(table, t), args.seconds)
+        fast = throughput(automaton.find_labels, args.seconds)
+        print(f"{n:>8}{build_ms:>10.1f}{automaton.size:>8}{loop:>12,.0f}{fast:>14,.0f}{fast / loop:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# benchmarks/bench_intent_model.py
+"""
+Intent model: keyword rules vs hashed n-gram model, one at a time vs batched.
+
+Trains a model on synthetic paraphrases (no trigger phrases), then reports
+per-transcript cost of the keyword fast path, single-transcript model calls
+and batched model calls, plus load time of the memory-mapped model file and
+accuracy on held-out templates.
+
+    python -m benchmarks.bench_intent_model [--examples 2000] [--batch 1000] [--bits 18]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from bot import nlu
+from bot.classifier import IntentModel, accuracy, train
+
+TRAIN = {
+    "LEAD_CREATE": ["please register {name} from {city}, number {phone}", "got an enquiry from {name} in {city} contact {phone}",
+                    "{name} from {city} is interested, reach at {phone}", "onboard {name}, {city}, mobile {phone}"],
+    "LEAD_UPDATE": ["lead {id} is now {status}", "move {id} to {status}", "{id} status should be {status}",
+                    "please flag {id} as {status}"],
+    "VISIT_SCHEDULE": ["book a site tour for {id} at {time}", "arrange a property viewing for {id} at {time}",
+                       "{id} wants to see the flat at {time}", "plan an appointment with {id} at {time}"],
+    "UNKNOWN": ["what's the weather like today", "hello there", "tell me a joke", "can you play some music",
+                "who won the match yesterday"],
+}
+HELD_OUT = {
+    "LEAD_CREATE": ["new prospect {name} based in {city}, call {phone}"],
+    "LEAD_UPDATE": ["customer {id} has gone {status}"],
+    "VISIT_SCHEDULE": ["set up a walkthrough for {id} at {time}"],
+    "UNKNOWN": ["how are you doing"],
+}
+KEYWORD = "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210, source Instagram"
+
+
+def generate(templates, n, rng):
+    texts, intents = [], []
+    for _ in range(n):
+        intent = rng.choice(sorted(templates))
+        texts.append(rng.choice(templates[intent]).format(
+            name=rng.choice(["Rohan Sharma", "Priya Singh", "Amit Verma", "Neha Gupta"]),
+            city=rng.choice(["Gurgaon", "Noida", "Pune", "Jaipur", "Delhi"]),
+            phone=f"98{rng.randrange(10 ** 8):08d}", id=f"{rng.randrange(16 ** 8):08x}",
+            status=rng.choice(["won", "lost", "in progress", "follow up"]),
+            time=rng.choice(["3 pm tomorrow", "10 am monday", "5 pm today"])))
+        intents.append(intent)
+    return texts, intents
+
+
+def per_item_us(fn, items, repeat=3) -> float:
+    best = min(_timed(fn, items) for _ in range(repeat))
+    return best / len(items) * 1e6
+
+
+def _timed(fn, items) -> float:
+    start = time.perf_counter()
+    fn(items)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--examples", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--bits", type=int, default=18)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    texts, intents = generate(TRAIN, args.examples, rng)
+    start = time.perf_counter()
+    model = train(texts, intents, bits=args.bits)
+    print(f"trained on {len(texts)} examples in {time.perf_counter() - start:.1f}s")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "intent_model.bin")
+        model.save(path)
+        start = time.perf_counter()
+        model = IntentModel.load(path)
+        print(f"model file {os.path.getsize(path) / 2 ** 20:.1f} MiB, memory-mapped load "
+              f"{(time.perf_counter() - start) * 1000:.2f} ms")
+
+        held_texts, held_intents = generate(HELD_OUT, args.batch, rng)
+        print(f"held-out accuracy {accuracy(model, held_texts, held_intents):.3f}")
+
+        batch = held_texts[:args.batch]
+        nlu.configure_model(model)
+        keyword_us = per_item_us(lambda items: [nlu.classify_intent(nlu.prepare(t)) for t in items], [KEYWORD] * len(batch))
+        single_us = per_item_us(lambda items: [model.classify_intent(t) for t in items], batch)
+        batched_us = per_item_us(model.predict, batch)
+        pipeline_us = per_item_us(nlu.classify_batch, batch)
+        nlu.configure_model(None)
+
+    print(f"{'path':<28}{'µs/transcript':>15}")
+    print(f"{'keyword rules (hit)':<28}{keyword_us:>15.1f}")
+    print(f"{'model, one at a time':<28}{single_us:>15.1f}")
+    print(f"{'model, batch of ' + str(len(batch)):<28}{batched_us:>15.1f}")
+    print(f"{'nlu.classify_batch':<28}{pipeline_us:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/bench_lead_store.py
+"""
+Lead store at scale: indexed LeadStore vs the old dict-of-dicts with scans.
+
+Inserts N leads (default 1M) into both, then times lookups by id, by phone,
+and city+status queries, and reports memory per lead (tracemalloc).
+
+    python -m benchmarks.bench_lead_store [--leads 1000000] [--queries 200]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+import uuid
+
+from bot.lead_store import LeadStore
+
+CITIES = [f"City{i}" for i in range(50)]
+STATUSES = ["NEW", "IN_PROGRESS", "FOLLOW_UP", "WON", "LOST"]
+
+
+def rows(n: int):
+    rng = random.Random(7)
+    for i in range(n):
+        yield str(uuid.UUID(int=rng.getrandbits(128))), f"Lead {i}", f"9{i:09d}", rng.choice(CITIES), rng.choice(STATUSES)
+
+
+def build_dict(data):
+    plain = {}
+    for lead_id, name, phone, city, status in data:
+        plain[lead_id] = {"lead_id": lead_id, "name": name, "phone": phone, "city": city, "source": None, "status": status}
+    return plain
+
+
+def build_store(data):
+    store = LeadStore()
+    for lead_id, name, phone, city, status in data:
+        store.add(name, phone, city, status=status, lead_id=lead_id)
+    return store
+
+
+def traced_bytes(build, data) -> int:
+    tracemalloc.start()
+    result = build(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(i)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--leads", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--memory-sample", type=int, default=100_000, help="leads built under tracemalloc")
+    parser.add_argument("--scan-queries", type=int, default=5, help="queries for the O(n) dict scans")
+    args = parser.parse_args()
+    data = list(rows(args.leads))
+    lead_ids = [row[0] for row in data]
+
+    start = time.perf_counter()
+    plain = build_dict(data)
+    dict_insert = args.leads / (time.perf_counter() - start)
+    start = time.perf_counter()
+    store = build_store(data)
+    store_insert = args.leads / (time.perf_counter() - start)
+
+    # Memory on a sample: tracemalloc slows allocation too much to wrap the timed runs
+    sample = data[:args.memory_sample]
+    dict_bytes, store_bytes = (traced_bytes(build, sample) / len(sample) for build in (build_dict, build_store))
+
+    print(f"{args.leads:,} leads")
+    print(f"{'operation':<22}{'dict scan':>14}{'LeadStore':>14}{'speedup':>10}")
+    print(f"{'insert (leads/s)':<22}{dict_insert:>14,.0f}{store_insert:>14,.0f}{store_insert / dict_insert:>9.1f}x")
+    print(f"{'bytes per lead':<22}{dict_bytes:>14,.0f}{store_bytes:>14,.0f}"
+          f"{dict_bytes / store_bytes:>9.1f}x")
+
+    cases = [
+        ("get by id (us)",
+         lambda i: plain.get(lead_ids[i * 7919 % args.leads]),
+         lambda i: store.get(lead_ids[i * 7919 % args.leads])),
+        ("find by phone (us)",
+         lambda i: [r for r in plain.values() if r["phone"] == f"9{i * 7919 % args.leads:09d}"],
+         lambda i: store.find_by_phone(f"9{i * 7919 % args.leads:09d}")),
+        ("city+status (us)",
+         lambda i: [r for r in plain.values() if r["city"] == CITIES[i % 50] and r["status"] == "WON"],
+         lambda i: store.find(city=CITIES[i % 50], status="WON")),
+    ]
+    for label, scan, indexed in cases:
+        repeat = args.queries if label.startswith("get") else args.scan_queries
+        before, after = timed(scan, repeat), timed(indexed, args.queries)
+        print(f"{label:<22}{before:>14,.1f}{after:>14,.1f}{before / after:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_metrics.py
+"""
+Instrumentation overhead: what /metrics recording adds to each request.
+
+Replays the records one single-transcript request makes (intent counter, four
+stage timings with their perf_counter reads, CRM status counter) and reports
+the cost per request, single-threaded and with threads recording at once.
+Also reports the cost of rendering /metrics.
+
+    python -m benchmarks.bench_metrics [--requests 200000] [--threads 1 8]
+"""
+import argparse
+import threading
+import time
+
+from bot import metrics
+
+
+def record_one_request():
+    # Mirrors analyze_transcript/_analyze, the visit-time resolver and record_crm
+    started = time.perf_counter()
+    classified = time.perf_counter()
+    metrics.INTENT_SECONDS.observe(classified - started)
+    resolved = time.perf_counter()
+    metrics.DATETIME_SECONDS.observe(resolved - classified)
+    metrics.ENTITIES_SECONDS.observe(time.perf_counter() - classified)
+    metrics.REQUESTS.labels("VISIT_SCHEDULE").inc()
+    crm_started = time.perf_counter()
+    metrics.CRM_SECONDS.observe(time.perf_counter() - crm_started)
+    metrics.CRM_RESPONSES.labels("schedule_visit", "200").inc()
+
+
+def empty_request():
+    # The same perf_counter reads without recording, to isolate the metric cost
+    started = time.perf_counter()
+    classified = time.perf_counter()
+    _ = classified - started
+    resolved = time.perf_counter()
+    _ = resolved - classified, time.perf_counter() - classified
+    crm_started = time.perf_counter()
+    _ = time.perf_counter() - crm_started
+
+
+def per_request_us(fn, n_requests: int, threads: int) -> float:
+    def work():
+        for _ in range(n_requests):
+            fn()
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    # Wall time per request as seen by one thread (threads share the GIL)
+    return (time.perf_counter() - start) / (n_requests * threads) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200000, help="requests per thread")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    record_one_request()  # register the shard and label cells
+    print(f"{'threads':>8}{'baseline µs':>13}{'instrumented µs':>17}{'overhead µs':>13}")
+    for threads in args.threads:
+        base = per_request_us(empty_request, args.requests, threads)
+        inst = per_request_us(record_one_request, args.requests, threads)
+        print(f"{threads:>8}{base:>13.3f}{inst:>17.3f}{inst - base:>13.3f}")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        metrics.REGISTRY.render()
+    print(f"render /metrics: {(time.perf_counter() - start) / 100 * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_mock_crm_storage.py
+"""
+mock_crm storage backends: in-memory vs SQLite (WAL, batched commits) vs
+SQLite committing every write.
+
+Runs a create/update/query mix directly against each store, then drives
+mock_crm over HTTP (uvicorn on a local port) with the same mix from several
+client threads, and reports operations/requests per second per backend.
+
+    python -m benchmarks.bench_mock_crm_storage [--ops 20000] [--requests 3000] [--threads 8]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+import mock_crm
+from bot.settings import settings
+
+BACKENDS = [
+    ("memory", "memory", None),
+    ("sqlite-batched", "sqlite", settings.MOCK_CRM_COMMIT_BATCH),
+    ("sqlite-per-write", "sqlite", 1),
+]
+
+
+def workload(client: httpx.Client, n: int, seed: int) -> None:
+    rng = random.Random(seed)
+    lead_ids = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.5 or not lead_ids:
+            resp = client.post("/crm/leads", json={"name": "Rohan Sharma", "phone": f"9{rng.randrange(10**9):09d}",
+                                                   "city": rng.choice(["Pune", "Delhi", "Gurgaon"])})
+            lead_ids.append(resp.json()["lead_id"])
+        elif roll < 0.8:
+            client.post(f"/crm/leads/{rng.choice(lead_ids)}/status", json={"status": "WON"})
+        else:
+            client.get("/crm/leads", params={"city": "Pune", "status": "WON", "limit": 10})
+
+
+def store_ops(store, n: int, seed: int) -> None:
+    rng = random.Random(seed)
+    lead_ids = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.5 or not lead_ids:
+            lead_ids.append(store.add("Rohan Sharma", f"9{rng.randrange(10**9):09d}",
+                                      rng.choice(["Pune", "Delhi", "Gurgaon"])).lead_id)
+        elif roll < 0.8:
+            store.update(rng.choice(lead_ids), status="WON")
+        else:
+            store.find(city="Pune", status="WON", limit=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", type=int, default=20000, help="direct store operations")
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{args.ops} direct store operations (50% create, 30% update, 20% query)")
+    print(f"{'backend':<18}{'ops/s':>10}{'commits':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, kind, batch in BACKENDS:
+            if batch is not None:
+                settings.MOCK_CRM_COMMIT_BATCH = batch
+            mock_crm.use_storage(kind, os.path.join(tmp, f"{label}.db"))
+            start = time.perf_counter()
+            store_ops(mock_crm.LEADS, args.ops, seed=0)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<18}{args.ops / elapsed:>10,.0f}{getattr(mock_crm.LEADS, 'commits', '-'):>10}")
+        mock_crm.use_storage("memory")
+    settings.MOCK_CRM_COMMIT_BATCH = BACKENDS[1][2]
+
+    server, base_url = mock_crm.serve_in_background()
+    print()
+    per_thread = args.requests // args.threads
+    print(f"{per_thread * args.threads} requests (50% create, 30% update, 20% query), {args.threads} threads")
+    print(f"{'backend':<18}{'req/s':>10}{'commits':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, kind, batch in BACKENDS:
+            if batch is not None:
+                settings.MOCK_CRM_COMMIT_BATCH = batch
+            mock_crm.use_storage(kind, os.path.join(tmp, f"{label}.db"))
+            with httpx.Client(base_url=base_url, limits=httpx.Limits(max_connections=args.threads)) as client:
+                workload(client, 50, seed=0)  # warm up
+                start = time.perf_counter()
+                with ThreadPoolExecutor(args.threads) as pool:
+                    list(pool.map(lambda seed: workload(client, per_thread, seed), range(args.threads)))
+                elapsed = time.perf_counter() - start
+            commits = getattr(mock_crm.LEADS, "commits", "-")
+            print(f"{label:<18}{per_thread * args.threads / elapsed:>10,.0f}{commits:>10}")
+        mock_crm.use_storage("memory")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
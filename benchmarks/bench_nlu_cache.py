@@ -0,0 +1,69 @@
+# benchmarks/bench_nlu_cache.py
+"""
+NLU results cache: analyze_transcript throughput with the cache off and on.
+
+The workload mimics IVR traffic: a share of requests repeat a small set of
+transcripts (with whitespace variations), the rest are unique.
+
+    python -m benchmarks.bench_nlu_cache [--requests 20000] [--repeat-share 0.8]
+"""
+import argparse
+import random
+import time
+
+from bot import app as bot_app
+from bot import nlu
+
+COMMON = [
+    "Can you help me?",
+    "Update lead 65ce1c14 to WON",
+    "Update lead 65ce1c14 to in progress",
+    "Schedule a visit for lead 65ce1c14 at 5 pm tomorrow",
+    "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210",
+]
+
+
+def workload(n: int, repeat_share: float):
+    rng = random.Random(7)
+    for i in range(n):
+        if rng.random() < repeat_share:
+            yield rng.choice(COMMON) + " " * rng.randint(0, 2)
+        else:
+            yield f"Schedule a visit for lead {i:08x} at {rng.randint(1, 12)} pm next friday"
+
+
+def run(transcripts) -> float:
+    start = time.perf_counter()
+    for transcript in transcripts:
+        bot_app.analyze_transcript(transcript)
+    return len(transcripts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--repeat-share", type=float, default=0.8)
+    args = parser.parse_args()
+
+    transcripts = list(workload(args.requests, args.repeat_share))
+    run(transcripts[:200])  # warm up
+
+    size = nlu.RESULTS_CACHE.max_size
+    nlu.RESULTS_CACHE.max_size = 0
+    nlu.RESULTS_CACHE.clear()
+    uncached = run(transcripts)
+
+    nlu.RESULTS_CACHE.max_size = size
+    nlu.RESULTS_CACHE.clear()
+    before = nlu.cache_stats()
+    cached = run(transcripts)
+    stats = nlu.cache_stats()
+    hits, misses = stats["hits"] - before["hits"], stats["misses"] - before["misses"]
+
+    print(f"{args.requests} transcripts, {args.repeat_share:.0%} repeats")
+    print(f"{'uncached/s':>12}{'cached/s':>12}{'speedup':>10}{'hit rate':>10}")
+    print(f"{uncached:>12,.0f}{cached:>12,.0f}{cached / uncached:>9.1f}x{hits / (hits + misses):>10.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/bench_outbox.py
+"""
+Outbox: /bot/handle latency as the CRM slows down, direct calls vs OUTBOX_MODE=always.
+
+Fires concurrent LEAD_CREATE requests at the app in-process against a blocking
+CRM stand-in with a fixed latency and reports p50/p99 request latency per
+mode, plus how long the outbox worker took to deliver the queued actions.
+
+    python -m benchmarks.bench_outbox [--requests 200] [--concurrency 50] [--delays 0.01 0.1 0.5]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+import httpx
+
+from bot import app as bot_app
+from bot.outbox import Outbox
+from bot.settings import settings
+
+
+class SlowCRM:
+    blocking_io = True
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def create_lead(self, name, phone, city=None, source=None):
+        time.sleep(self.delay)
+        return {"lead_id": "bench", "status": "NEW"}
+
+
+async def load(n_requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=bot_app.app)
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bot", timeout=None) as client:
+        async def one():
+            async with gate:
+                start = time.perf_counter()
+                resp = await client.post("/bot/handle", json={
+                    "transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+                })
+                latencies.append(time.perf_counter() - start)
+                assert resp.status_code in (200, 202), resp.text
+
+        await asyncio.gather(*[one() for _ in range(n_requests)])
+    latencies.sort()
+    return statistics.median(latencies), latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delays", type=float, nargs="+", default=[0.01, 0.1, 0.5])
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'CRM ms':>7}{'mode':>8}{'p50 ms':>9}{'p99 ms':>9}{'drain s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for delay in args.delays:
+            bot_app.crm_client_instance = SlowCRM(delay)
+            bot_app.async_crm_client_instance = None
+            for mode in ("off", "always"):
+                settings.OUTBOX_MODE = mode
+                box = Outbox(os.path.join(tmp, f"outbox-{delay}.db"), bot_app.deliver_action,
+                             bot_app.outbox_transient, concurrency=settings.OUTBOX_CONCURRENCY, poll_interval=0.01)
+                bot_app.outbox_instance = box
+                start = time.perf_counter()
+                p50, p99 = asyncio.run(load(args.requests, args.concurrency))
+                drain = ""
+                if mode == "always":
+                    while box.stats()["pending"]:
+                        time.sleep(0.01)
+                    drain = f"{time.perf_counter() - start:.2f}"
+                box.close()
+                print(f"{delay * 1000:>7.0f}{mode:>8}{p50 * 1000:>9.1f}{p99 * 1000:>9.1f}{drain:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# benchmarks/bench_redos.py
+"""
+Worst-case inputs: entity pattern and end-to-end NLU latency on adversarial transcripts.
+
+Times the old unbounded lazy name pattern against the bounded one as the
+input grows (quadratic vs linear), then runs worst-case transcripts of
+TRANSCRIPT_MAX_LEN characters through the full analysis and reports the
+median and slowest latency.
+
+    python -m benchmarks.bench_redos [--lengths 1000 2000 4000 8000]
+"""
+import argparse
+import re
+import statistics
+import time
+
+from bot import app as bot_app
+from bot import nlu
+from bot.settings import settings
+
+OLD_NAME_RE = re.compile(r'(?:lead[:\s]+)([A-Za-z\s]+?)(?:\s+from|\s+phone|\s+,|\s+contact|$)', re.IGNORECASE)
+
+PREFIXES = ["Add a new lead: ", "Schedule a visit for lead 65ce1c14 at ", "Update lead 65ce1c14 to won notes ", ""]
+UNITS = ["1 ", "lead ", "lead a", "name ", "at ", "tomorrow 5 pm monday ", "from delhi ", "1:2:", "phone 9 "]
+
+
+def worst_case(unit: str, length: int) -> str:
+    return (unit * (length // len(unit) + 1))[:length - 1] + "!"
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lengths", type=int, nargs="+", default=[1000, 2000, 4000, 8000])
+    args = parser.parse_args()
+
+    print(f"{'chars':>7}{'old name ms':>13}{'new name ms':>13}")
+    for length in args.lengths:
+        text = worst_case("lead ", length)
+        old = timed(OLD_NAME_RE.search, text)
+        new = timed(nlu.NAME_PATTERNS[0].search, text)
+        print(f"{length:>7}{old * 1000:>13.2f}{new * 1000:>13.2f}")
+
+    nlu.warm_up()
+    latencies = []
+    for prefix in PREFIXES:
+        for unit in UNITS:
+            transcript = prefix + worst_case(unit, settings.TRANSCRIPT_MAX_LEN - len(prefix))
+            nlu.RESULTS_CACHE.clear()
+            latencies.append(timed(bot_app.analyze_transcript, transcript))
+    print(f"{len(latencies)} worst-case transcripts of {settings.TRANSCRIPT_MAX_LEN} chars: "
+          f"median {statistics.median(latencies) * 1000:.2f} ms, slowest {max(latencies) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
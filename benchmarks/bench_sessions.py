@@ -0,0 +1,69 @@
+# benchmarks/bench_sessions.py
+"""
+Session store at 100k concurrent sessions: memory per session and turn throughput.
+
+Fills a SessionStore with one finished turn per session (a third of them
+left pending, awaiting an entity), then times resume + end_turn on random
+sessions, and reports what LRU eviction does once the store is full.
+
+    python -m benchmarks.bench_sessions [--sessions 100000] [--turns 200000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from bot.app import REQUIRED_ENTITIES
+from bot.nlu import ENTITY_KEYS
+from bot.sessions import SessionStore
+
+CREATED = dict.fromkeys(ENTITY_KEYS)
+CREATED.update(name="Rohan Sharma", phone="9876543210", city="Gurgaon")
+PARTIAL = dict.fromkeys(ENTITY_KEYS)
+PARTIAL.update(name="Rohan Sharma", city="Gurgaon")
+VISIT = dict.fromkeys(ENTITY_KEYS)
+VISIT.update(visit_time="2026-10-18T17:00:00")
+
+
+def fill(store: SessionStore, n: int) -> None:
+    for i in range(n):
+        session_id = f"call-{i:08d}"
+        if i % 3:
+            store.end_turn(session_id, "LEAD_CREATE", 0.95, CREATED, lead_id=f"{i:08x}-0000-4000-8000-000000000000")
+        else:
+            store.end_turn(session_id, "LEAD_CREATE", 0.95, PARTIAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=200000)
+    args = parser.parse_args()
+
+    store = SessionStore(args.sessions, 1800, REQUIRED_ENTITIES)
+    tracemalloc.start()
+    fill(store, args.sessions)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"{len(store):,} sessions: {memory / 2 ** 20:.1f} MiB, {memory / len(store):.0f} bytes/session "
+          f"(including the session ids)")
+
+    ids = [f"call-{random.randrange(args.sessions):08d}" for _ in range(args.turns)]
+    start = time.perf_counter()
+    for session_id in ids:
+        analyzed, _ = store.resume(session_id, "schedule a visit for him at 5 pm tomorrow", "VISIT_SCHEDULE", 0.95, VISIT)
+        store.end_turn(session_id, *analyzed)
+    elapsed = time.perf_counter() - start
+    print(f"resume + end_turn: {args.turns / elapsed:,.0f} turns/s, {elapsed / args.turns * 1e6:.2f} us/turn")
+
+    start = time.perf_counter()
+    for i in range(args.sessions, args.sessions + args.turns):
+        store.end_turn(f"call-{i:08d}", "VISIT_SCHEDULE", 0.95, VISIT)
+    elapsed = time.perf_counter() - start
+    stats = store.stats()
+    print(f"{args.turns:,} new sessions into a full store: {args.turns / elapsed:,.0f}/s, "
+          f"{stats['evictions']:,} evicted, {stats['sessions']:,} kept")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_shared_state.py
+"""
+Shared state across worker processes: counter throughput, correctness and rate-limit cost.
+
+Starts N processes that each increment the same few counters in one
+memory-mapped file, as uvicorn workers on one node would, then checks no
+increment was lost. Also times single-process operations on the file and
+on a process-local anonymous map, and a rate-limit check.
+
+    python -m benchmarks.bench_shared_state [--workers 4] [--ops 50000] [--file /dev/shm/bot-bench]
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from bot.ratelimit import RateLimiter
+from bot.shared_state import SharedState
+
+KEYS = [f"client-{i}" for i in range(16)]
+
+
+def hammer(path: str, ops: int) -> None:
+    state = SharedState(path)
+    for i in range(ops):
+        state.incr(KEYS[i % len(KEYS)])
+    state.close()
+
+
+def time_ops(label: str, ops: int, operation) -> None:
+    start = time.perf_counter()
+    for i in range(ops):
+        operation(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {ops / elapsed:>12,.0f} ops/s {elapsed / ops * 1e6:>8.2f} us/op")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=50000)
+    parser.add_argument("--file", default=None, help="state file (default: a temporary file, on /dev/shm if present)")
+    args = parser.parse_args()
+
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    path = args.file or os.path.join(tempfile.mkdtemp(dir=directory), "bot-state")
+    if os.path.exists(path):
+        os.remove(path)
+
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=hammer, args=(path, args.ops)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    # Time from the first increment, not from interpreter start-up
+    SharedState(path).close()
+    start = time.perf_counter()
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+    state = SharedState(path)
+    total = sum(state.counter(key) for key in KEYS)
+    expected = args.workers * args.ops
+    print(f"{args.workers} processes x {args.ops:,} incr on {len(KEYS)} keys: {total:,} counted of {expected:,} "
+          f"({'ok' if total == expected else 'LOST UPDATES'}), <= {elapsed:.2f}s including process start-up")
+
+    anonymous = SharedState()
+    time_ops("incr (file)", args.ops, lambda i: state.incr(KEYS[i % len(KEYS)]))
+    time_ops("incr (anonymous)", args.ops, lambda i: anonymous.incr(KEYS[i % len(KEYS)]))
+    time_ops("set 200 B (file)", args.ops, lambda i: state.set(f"key-{i}", b"x" * 200, ttl=60))
+    time_ops("get (file)", args.ops, lambda i: state.get(f"key-{i}"))
+    limiter = RateLimiter(state, limit=10 ** 9, window=60)
+    time_ops("rate-limit check (file)", args.ops, lambda i: limiter.check(KEYS[i % len(KEYS)]))
+    state.close()
+    os.remove(path)
+    if args.file is None:
+        os.rmdir(os.path.dirname(path))
+
+
+if __name__ == "__main__":
+    main()
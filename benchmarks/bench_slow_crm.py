@@ -0,0 +1,82 @@
+# benchmarks/bench_slow_crm.py
+"""
+Load test: /bot/handle latency while the CRM is slow.
+
+Fires concurrent LEAD_CREATE requests at the app in-process and reports
+p50/p99 latency and throughput for three CRM setups:
+  - blocking-inline: a blocking client called on the event loop (the old path)
+  - blocking-thread: the same client offloaded to the thread pool
+  - async:           a non-blocking client awaited on the loop
+
+    python -m benchmarks.bench_slow_crm [--requests 200] [--concurrency 50] [--delay 0.05]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from bot import app as bot_app
+
+
+def make_clients(delay: float):
+    class BlockingCRM:
+        blocking_io = False
+
+        def create_lead(self, name, phone, city=None, source=None):
+            time.sleep(delay)
+            return {"lead_id": "bench", "status": "NEW"}
+
+    class ThreadedCRM(BlockingCRM):
+        blocking_io = True
+
+    class AsyncCRM:
+        async def create_lead(self, name, phone, city=None, source=None):
+            await asyncio.sleep(delay)
+            return {"lead_id": "bench", "status": "NEW"}
+
+    return {"blocking-inline": BlockingCRM(), "blocking-thread": ThreadedCRM(), "async": AsyncCRM()}
+
+
+async def load(n_requests: int, concurrency: int):
+    transport = httpx.ASGITransport(app=bot_app.app)
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bot") as client:
+        async def one(i):
+            async with gate:
+                start = time.perf_counter()
+                resp = await client.post("/bot/handle", json={
+                    "transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+                })
+                latencies.append(time.perf_counter() - start)
+                assert resp.status_code == 200, resp.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(n_requests)])
+        return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.05, help="simulated CRM latency in seconds")
+    args = parser.parse_args()
+
+    print(f"CRM delay {args.delay * 1000:.0f} ms, {args.requests} requests, concurrency {args.concurrency}")
+    print(f"{'mode':<17}{'p50 ms':>9}{'p99 ms':>9}{'req/s':>9}")
+    for mode, client in make_clients(args.delay).items():
+        bot_app.async_crm_client_instance = client if mode == "async" else None
+        bot_app.crm_client_instance = client
+        latencies, elapsed = asyncio.run(load(args.requests, args.concurrency))
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{mode:<17}{statistics.median(latencies) * 1000:>9.1f}{p99 * 1000:>9.1f}"
+              f"{args.requests / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/bench_startup.py
+"""
+Cold-start benchmark for the bot service.
+
+Each measurement runs in a fresh interpreter and reports:
+  - time to `import bot.app` and resident memory after import
+  - time to the first /bot/handle response (a lead that needs no dateparser)
+  - time to the first response whose visit time falls back to dateparser
+with lazy loading (default) and with NLU_WARMUP=1, where the warm-up runs in
+the app's startup hook. The cost of `import dateparser` alone is shown for
+reference: it used to be paid by every worker on import. Run from the repo
+root:
+
+    python -m benchmarks.bench_startup [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+import bot.app
+t_import = time.perf_counter() - t0
+rss_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+dateparser_on_import = "dateparser" in sys.modules
+from fastapi.testclient import TestClient
+with TestClient(bot.app.app) as client:
+    t_ready = time.perf_counter() - t0
+    t1 = time.perf_counter()
+    client.post("/bot/handle", json={"transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"})
+    t_first = time.perf_counter() - t1
+    t2 = time.perf_counter()
+    client.post("/bot/handle", json={"transcript": "Schedule a visit for lead 65ce1c14 at October 20 at 5pm"})
+    t_fallback = time.perf_counter() - t2
+print(json.dumps({
+    "import_ms": t_import * 1000, "ready_ms": t_ready * 1000, "first_ms": t_first * 1000,
+    "fallback_ms": t_fallback * 1000, "rss_mb": rss_import / 1024,
+    "dateparser_on_import": dateparser_on_import,
+}))
+"""
+
+DATEPARSER_ONLY = r"""
+import json, time
+t0 = time.perf_counter()
+import dateparser
+print(json.dumps({"import_ms": (time.perf_counter() - t0) * 1000}))
+"""
+
+
+def run(code: str, env_extra=None) -> dict:
+    env = dict(os.environ, **(env_extra or {}))
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def median_of(samples, key):
+    return statistics.median(s[key] for s in samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="fresh interpreters per mode")
+    args = parser.parse_args()
+
+    dp = [run(DATEPARSER_ONLY) for _ in range(args.runs)]
+    print(f"import dateparser alone: {median_of(dp, 'import_ms'):.0f} ms\n")
+
+    print(f"{'mode':<10}{'import ms':>11}{'ready ms':>10}{'1st resp ms':>13}{'1st fallback ms':>17}{'RSS MB':>9}"
+          f"{'dateparser on import':>22}")
+    for mode, env in (("lazy", {"NLU_WARMUP": "0"}), ("warm-up", {"NLU_WARMUP": "1"})):
+        samples = [run(CHILD, env) for _ in range(args.runs)]
+        print(f"{mode:<10}{median_of(samples, 'import_ms'):>11.0f}{median_of(samples, 'ready_ms'):>10.0f}"
+              f"{median_of(samples, 'first_ms'):>13.1f}{median_of(samples, 'fallback_ms'):>17.1f}"
+              f"{median_of(samples, 'rss_mb'):>9.1f}{str(samples[0]['dateparser_on_import']):>22}")
+
+
+if __name__ == "__main__":
+    main()
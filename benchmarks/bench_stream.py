@@ -0,0 +1,68 @@
+# benchmarks/bench_stream.py
+"""
+Streaming vs JSON-array batch mode: peak memory and throughput.
+
+Feeds N LEAD_UPDATE transcripts through stream_transcripts (reading lines as
+the window allows, results consumed as they arrive) and through process_batch
+(whole list in, whole list out), with a no-op async CRM, and reports the
+tracemalloc peak of each. Streaming should stay flat as N grows.
+
+    python -m benchmarks.bench_stream [--sizes 1000 10000 50000]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from bot import app as bot_app
+
+LINE = "Update lead 7b1b8f54-aaaa-bbbb-cccc-{:012d} to won"
+
+
+class NullCRM:
+    async def update_status(self, lead_id, status, notes=None):
+        return {"lead_id": lead_id, "status": status}
+
+
+async def run_stream(n: int) -> int:
+    async def source():
+        for i in range(n):
+            yield (LINE.format(i) + "\n").encode()
+
+    count = 0
+    async for _ in bot_app.stream_transcripts(source()):
+        count += 1
+    return count
+
+
+async def run_batch(n: int) -> int:
+    return len(await bot_app.process_batch([LINE.format(i) for i in range(n)]))
+
+
+def measure(coro_fn, n: int):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = asyncio.run(coro_fn(n))
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert count == n
+    return peak / 1024 / 1024, n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    args = parser.parse_args()
+
+    bot_app.async_crm_client_instance = NullCRM()
+    asyncio.run(run_stream(50))  # warm up
+    print(f"{'lines':>8}{'stream MiB':>12}{'batch MiB':>12}{'stream/s':>10}{'batch/s':>10}")
+    for n in args.sizes:
+        stream_mib, stream_rate = measure(run_stream, n)
+        batch_mib, batch_rate = measure(run_batch, n)
+        print(f"{n:>8}{stream_mib:>12.1f}{batch_mib:>12.1f}{stream_rate:>10,.0f}{batch_rate:>10,.0f}")
+
+
+if __name__ == "__main__":
+    main()
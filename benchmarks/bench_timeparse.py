@@ -0,0 +1,62 @@
+# benchmarks/bench_timeparse.py
+"""
+Visit-time resolution: plain dateparser vs the tiered resolver.
+
+Reports phrases/sec for dateparser.parse, the resolver with its cache
+disabled (grammar + fallback on every call) and the cached resolver. Run
+from the repo root:
+
+    python -m benchmarks.bench_timeparse [--seconds 1.0]
+"""
+import argparse
+import time
+from datetime import datetime
+
+import dateparser
+
+from bot import timeparse
+
+PHRASES = [
+    "2025-10-02T17:00:00+05:30",
+    "3 pm tomorrow",
+    "tomorrow at 11:30 am",
+    "next Monday 5pm",
+    "5 pm",
+    "October 20 at 5pm",  # grammar miss, falls back to dateparser
+]
+
+
+def throughput(fn, seconds: float) -> float:
+    done = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for phrase in PHRASES:
+            fn(phrase)
+        done += len(PHRASES)
+    return done / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=1.0, help="time budget per measurement")
+    args = parser.parse_args()
+
+    now = datetime.now()
+    rows = [
+        ("dateparser.parse", lambda p: dateparser.parse(p)),
+        ("resolver, uncached", lambda p: timeparse._resolve(timeparse.normalize_phrase(p), now)),
+        ("resolver, cached", lambda p: timeparse.resolve_time(p, now)),
+    ]
+    baseline = None
+    print(f"{'strategy':<22}{'phrases/s':>14}{'speedup':>10}")
+    for label, fn in rows:
+        for phrase in PHRASES:  # warm up: dateparser loads language data lazily
+            fn(phrase)
+        rate = throughput(fn, args.seconds)
+        baseline = baseline or rate
+        print(f"{label:<22}{rate:>14,.0f}{rate / baseline:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
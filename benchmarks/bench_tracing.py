@@ -0,0 +1,59 @@
+# benchmarks/bench_tracing.py
+"""
+Tracing overhead on process_single_transcript: undecorated vs TRACING off vs on.
+
+Runs the sync pipeline against the in-memory CRM with the NLU cache disabled
+and reports µs per transcript. With tracing on, the slow threshold is set out
+of reach so the numbers show span collection without log writes.
+
+    python -m benchmarks.bench_tracing [--iterations 5000]
+"""
+import argparse
+import time
+
+from bot import app as bot_app
+from bot import nlu
+from bot.cache import TTLCache
+from bot.settings import settings
+
+TRANSCRIPTS = [
+    "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210, source Instagram",
+    "Update lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab to in progress",
+    "Schedule a visit for lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab at 3 pm tomorrow",
+]
+
+
+def per_call_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(TRANSCRIPTS[i % len(TRANSCRIPTS)])
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+
+    nlu.RESULTS_CACHE = TTLCache(0)
+    settings.TRACE_SLOW_MS = float("inf")
+    undecorated = bot_app.process_single_transcript.__wrapped__
+    per_call_us(undecorated, 300)  # warm up parsers and caches
+
+    runs = []
+    for label, tracing_on, fn in (
+        ("undecorated", False, undecorated),
+        ("tracing off", False, bot_app.process_single_transcript),
+        ("tracing on", True, bot_app.process_single_transcript),
+    ):
+        settings.TRACING = tracing_on
+        runs.append((label, min(per_call_us(fn, args.iterations) for _ in range(3))))
+
+    baseline = runs[0][1]
+    print(f"{'mode':<13}{'µs/transcript':>15}{'overhead µs':>13}")
+    for label, us in runs:
+        print(f"{label:<13}{us:>15.2f}{us - baseline:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
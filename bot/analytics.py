@@ -0,0 +1,168 @@
+# bot/analytics.py
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from .settings import settings
+
+logger = logging.getLogger("bot_analytics")
+
+
+class AnalyticsWriter:
+    """
+    Background JSONL sink for analytics records.
+
+    `submit` only enqueues the record; a worker thread serializes records and
+    appends them in batches, flushing when `batch_size` records are waiting or
+    `flush_interval` seconds have passed. The file is kept open between
+    batches and rotated to `path.1 … path.N` once it grows past `max_bytes`.
+    When the queue is full, records are dropped and counted rather than
+    blocking the caller.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10000,
+        batch_size: int = 256,
+        flush_interval: float = 1.0,
+        max_bytes: int = 50 * 1024 * 1024,
+        backup_count: int = 5,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.written = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+    def submit(self, record: Dict[str, Any]) -> bool:
+        """Queue a record for writing; returns False if it was dropped."""
+        if self._thread is None:
+            self.start()
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """
+        Stop the worker after draining everything already queued. If it is
+        still writing after `timeout`, it closes the file itself on exit.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join(timeout)
+            if thread.is_alive():
+                return
+        self._close_file()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), "written": self.written, "dropped": self.dropped}
+
+    # ------------------------------
+    # Worker thread
+    # ------------------------------
+    def _run(self) -> None:
+        batch: List[Dict[str, Any]] = []
+        deadline = None
+        while True:
+            timeout = self.flush_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                batch.append(self._queue.get(timeout=min(timeout, 0.1)))
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            except queue.Empty:
+                if self._stop.is_set():
+                    break
+            if batch and (len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch, deadline = [], None
+        if batch:
+            self._write(batch)
+        self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        data = "".join(json.dumps(record) + "\n" for record in batch).encode("utf-8")
+        try:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            if self.max_bytes and self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self._file.flush()
+            self.written += len(batch)
+        except Exception as e:
+            logger.warning("Failed to write %d analytics records: %s", len(batch), e)
+
+    def _rotate(self) -> None:
+        self._file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+
+
+_default_writer: Optional[AnalyticsWriter] = None
+_default_lock = threading.Lock()
+
+
+def default_writer(path: str) -> AnalyticsWriter:
+    """Return the process-wide writer, creating it on first use."""
+    global _default_writer
+    if _default_writer is None:
+        with _default_lock:
+            if _default_writer is None:
+                _default_writer = AnalyticsWriter(
+                    path,
+                    max_queue=settings.ANALYTICS_QUEUE_SIZE,
+                    batch_size=settings.ANALYTICS_BATCH_SIZE,
+                    flush_interval=settings.ANALYTICS_FLUSH_INTERVAL,
+                    max_bytes=settings.ANALYTICS_MAX_BYTES,
+                    backup_count=settings.ANALYTICS_BACKUP_COUNT,
+                )
+                atexit.register(_default_writer.close)
+    return _default_writer
+
+
+def shutdown() -> None:
+    """Drain and close the process-wide writer, if one was started."""
+    global _default_writer
+    with _default_lock:
+        writer, _default_writer = _default_writer, None
+    if writer is not None:
+        writer.close()
@@ -1,12 +1,29 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, List, Union, Any
-from datetime import datetime
+from typing import Optional, Dict, List, Union, Any, AsyncIterator
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import contextvars
+import inspect
+import threading
+import time
 import uuid
-import re
-import dateparser
 import json
+import math
+
+from . import analytics, metrics, nlu, tracing
+from .idempotency import IdempotencyConflict, IdempotencyStore, IdempotencyUnavailable, fingerprint
+from .lead_store import LeadStore
+from .outbox import Outbox
+from .ratelimit import RateLimiter
+from .sessions import SessionStore
+from .shared_state import SharedState
+from .crm_client import CRMError, CRMUnavailable, build_async_http_client, build_http_client, build_resilience_policy
+from .nlu import classify_intent, extract_entities
+from .settings import settings
 
 # ------------------------------
 # BotRequest schema
@@ -14,51 +31,36 @@ import json
 class BotRequest(BaseModel):
     transcript: Optional[str] = None
     transcripts: Optional[List[str]] = None
+    # {"idempotency_key": "..."} makes retries of this request safe;
+    # {"session_id": "..."} links single-transcript turns of one conversation
+    metadata: Optional[Dict[str, Any]] = None
 
 # ------------------------------
 # Mock CRM Client
 # ------------------------------
-class CRMError(Exception):
-    def __init__(self, code, message):
-        self.code = code
-        self.message = message
-        super().__init__(message)
-
 class CRMClient:
     def __init__(self):
-        self.leads = {}  # In-memory storage for testing
+        self.leads = LeadStore()  # In-memory storage for testing
     
     def create_lead(self, name, phone, city=None, source=None):
-        lead_id = str(uuid.uuid4())
-        self.leads[lead_id] = {
-            "lead_id": lead_id,
-            "name": name,
-            "phone": phone,
-            "city": city,
-            "source": source,
-            "status": "NEW"
-        }
+        lead = self.leads.add(name, phone, city, source)
         return {
-            "lead_id": lead_id,
+            "lead_id": lead.lead_id,
             "status": "NEW"
         }
 
-    def update_status(self, lead_id, status, notes=None):
+    def _ensure_lead(self, lead_id):
         # For testing purposes, we'll create a dummy lead if it doesn't exist
         if lead_id not in self.leads:
-            # Instead of raising error, create a dummy lead for testing
-            self.leads[lead_id] = {
-                "lead_id": lead_id,
-                "name": "Test Lead",
-                "phone": "1234567890",
-                "city": "Test City",
-                "source": "Test",
-                "status": "NEW"
-            }
-        
-        self.leads[lead_id]["status"] = status
+            self.leads.add("Test Lead", "1234567890", "Test City", "Test", lead_id=lead_id)
+
+    def update_status(self, lead_id, status, notes=None):
+        # Instead of raising error, create a dummy lead for testing
+        self._ensure_lead(lead_id)
         if notes:
-            self.leads[lead_id]["notes"] = notes
+            self.leads.update(lead_id, status=status, notes=notes)
+        else:
+            self.leads.update(lead_id, status=status)
             
         return {
             "lead_id": lead_id,
@@ -66,16 +68,7 @@ class CRMClient:
         }
 
     def schedule_visit(self, lead_id, visit_time, notes=None):
-        # For testing purposes, we'll create a dummy lead if it doesn't exist
-        if lead_id not in self.leads:
-            self.leads[lead_id] = {
-                "lead_id": lead_id,
-                "name": "Test Lead",
-                "phone": "1234567890",
-                "city": "Test City",
-                "source": "Test",
-                "status": "NEW"
-            }
+        self._ensure_lead(lead_id)
             
         visit_id = str(uuid.uuid4())
         return {
@@ -83,160 +76,74 @@ class CRMClient:
             "status": "SCHEDULED"
         }
 
-# ------------------------------
-# Intent classification & entity extraction
-# ------------------------------
-def classify_intent(transcript: str):
-    """Classify intent based on transcript patterns"""
-    transcript_lower = transcript.lower()
-    
-    # LEAD_CREATE patterns
-    lead_create_patterns = [
-        "add a new lead", "add lead", "create lead", "new lead"
-    ]
-    
-    # VISIT_SCHEDULE patterns  
-    visit_patterns = [
-        "schedule a visit", "schedule visit", "fix a site visit", "fix a visit"
-    ]
-    
-    # LEAD_UPDATE patterns
-    update_patterns = [
-        "update lead", "mark lead", "set lead", "change lead"
-    ]
-    
-    # Check for multiple intents - prioritize by order
-    has_visit = any(pattern in transcript_lower for pattern in visit_patterns)
-    has_update = any(pattern in transcript_lower for pattern in update_patterns)
-    has_create = any(pattern in transcript_lower for pattern in lead_create_patterns)
-    
-    if has_visit:
-        return "VISIT_SCHEDULE", 0.95
-    elif has_update:
-        return "LEAD_UPDATE", 0.95
-    elif has_create:
-        return "LEAD_CREATE", 0.95
-    else:
-        return "UNKNOWN", 0.5
-
-def extract_entities(transcript: str, intent: str) -> Dict:
-    """Extract entities based on intent and transcript"""
-    entities = {
-        "name": None,
-        "phone": None, 
-        "city": None,
-        "source": None,
-        "lead_id": None,
-        "visit_time": None,
-        "notes": None,
-        "status": None
-    }
-    
-    if intent == "LEAD_CREATE":
-        # Extract name - handle both "lead: Name" and "lead Name" patterns
-        name_patterns = [
-            r'(?:lead[:\s]+)([A-Za-z\s]+?)(?:\s+from|\s+phone|\s+,|\s+contact|$)',
-            r'(?:name\s+)([A-Za-z\s]+?)(?:\s+from|\s+phone|\s+,|\s+contact|$)'
-        ]
-        
-        for pattern in name_patterns:
-            name_match = re.search(pattern, transcript, re.IGNORECASE)
-            if name_match:
-                entities["name"] = name_match.group(1).strip()
-                break
-        
-        # Extract phone number - handle multiple formats
-        phone_patterns = [
-            r'(?:phone|contact)[:\s]*([0-9\s\-+]+)',
-            r'(\d{2}\s*\d{3}\s*\d{2}\s*\d{3})',  # 98 765 43 210
-            r'(\d{5}\-\d{5})',  # 91234-56789
-            r'(\d{10})'  # 9876543210
-        ]
-        
-        for pattern in phone_patterns:
-            phone_match = re.search(pattern, transcript, re.IGNORECASE)
-            if phone_match:
-                # Clean phone number - remove spaces, dashes
-                phone = re.sub(r'[\s\-+]', '', phone_match.group(1))
-                entities["phone"] = phone
-                break
-        
-        # Extract city (after "from")
-        city_match = re.search(r'from\s+([A-Za-z]+)', transcript, re.IGNORECASE)
-        if city_match:
-            entities["city"] = city_match.group(1)
-        elif re.search(r'city\s+([A-Za-z]+)', transcript, re.IGNORECASE):
-            city_match = re.search(r'city\s+([A-Za-z]+)', transcript, re.IGNORECASE)
-            entities["city"] = city_match.group(1)
-        
-        # Extract source (after "source")
-        source_match = re.search(r'source\s+([A-Za-z]+)', transcript, re.IGNORECASE)
-        if source_match:
-            entities["source"] = source_match.group(1)
-            
-    elif intent == "LEAD_UPDATE":
-        # Extract lead ID - handle both full UUIDs and shortened versions
-        lead_id_patterns = [
-            r'lead\s+([a-f0-9\-]{8,})',  # Standard UUID format
-            r'lead\s+([a-f0-9]{8})',     # Shortened 8-char format
-        ]
-        
-        for pattern in lead_id_patterns:
-            lead_id_match = re.search(pattern, transcript, re.IGNORECASE)
-            if lead_id_match:
-                entities["lead_id"] = lead_id_match.group(1)
-                break
-        
-        # Extract status
-        if "in progress" in transcript.lower() or "in_progress" in transcript.lower():
-            entities["status"] = "IN_PROGRESS"
-        elif "won" in transcript.lower():
-            entities["status"] = "WON"
-        elif "lost" in transcript.lower():
-            entities["status"] = "LOST"
-        elif "follow_up" in transcript.lower() or "follow up" in transcript.lower():
-            entities["status"] = "FOLLOW_UP"
-        elif "new" in transcript.lower():
-            entities["status"] = "NEW"
-        
-        # Extract notes (after "notes:")
-        notes_match = re.search(r'notes[:\s]+(.+)', transcript, re.IGNORECASE)
-        if notes_match:
-            entities["notes"] = notes_match.group(1).strip()
-    
-    elif intent == "VISIT_SCHEDULE":
-        # Extract lead ID
-        lead_id_patterns = [
-            r'lead\s+([a-f0-9\-]{8,})',
-            r'lead\s+([a-f0-9]{8})',
-        ]
-        
-        for pattern in lead_id_patterns:
-            lead_id_match = re.search(pattern, transcript, re.IGNORECASE)
-            if lead_id_match:
-                entities["lead_id"] = lead_id_match.group(1)
-                break
-        
-        # Extract visit time using dateparser for natural language
-        time_match = re.search(r'at\s+(.+?)(?:\s+notes|$)', transcript, re.IGNORECASE)
-        if time_match:
-            time_str = time_match.group(1).strip()
-            try:
-                parsed_time = dateparser.parse(time_str)
-                if parsed_time:
-                    entities["visit_time"] = parsed_time.isoformat()
-                else:
-                    entities["visit_time"] = time_str  # Keep original if parsing fails
-            except:
-                entities["visit_time"] = time_str
-    
-    return entities
-
 # ------------------------------
 # FastAPI App
 # ------------------------------
-app = FastAPI()
-crm_client_instance = CRMClient()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _nlu_executor, outbox_instance
+    # Heavy parsers load lazily; warming up moves that cost before the first request
+    if settings.NLU_WARMUP:
+        nlu.warm_up()
+    # Deliver actions left queued by an earlier run without waiting for a new one
+    if settings.OUTBOX_MODE != "off":
+        get_outbox().start()
+    yield
+    # Drain queued analytics records before the worker exits
+    analytics.shutdown()
+    tracing.shutdown()
+    if hasattr(crm_client_instance, "close"):
+        crm_client_instance.close()
+    if async_crm_client_instance is not None:
+        await async_crm_client_instance.aclose()
+    if _nlu_executor is not None:
+        _nlu_executor.shutdown(wait=False)
+        _nlu_executor = None
+    if outbox_instance is not None:
+        outbox_instance.close()
+        outbox_instance = None
+
+app = FastAPI(lifespan=lifespan)
+
+def build_crm_client():
+    """Pick the CRM backend from settings"""
+    if settings.CRM_MODE == "http":
+        return build_http_client(crm_resilience)
+    return CRMClient()
+
+def build_async_crm_client():
+    """Async CRM backend for the request path, or None to reuse crm_client_instance"""
+    if settings.CRM_MODE == "http":
+        return build_async_http_client(crm_resilience)
+    return None
+
+# One breaker and retry budget shared by the sync and async HTTP clients
+crm_resilience = build_resilience_policy()
+crm_client_instance = build_crm_client()
+async_crm_client_instance = build_async_crm_client()
+# Counters and keys every worker on the node sees when SHARED_STATE_FILE is set; opened on
+# first use and kept for the life of the process (the map buffers nothing to flush)
+shared_state: Optional[SharedState] = None
+rate_limiter: Optional[RateLimiter] = None
+
+def get_shared_state() -> SharedState:
+    """The shared-state table: the SHARED_STATE_FILE every worker maps, else one private to this process"""
+    global shared_state
+    if shared_state is None:
+        shared_state = SharedState(settings.SHARED_STATE_FILE, settings.SHARED_STATE_SLOTS, settings.SHARED_STATE_VALUE_BYTES)
+    return shared_state
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    """The rate limiter, created on first use; None while RATE_LIMIT is 0"""
+    global rate_limiter
+    if settings.RATE_LIMIT <= 0:
+        return None
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(get_shared_state(), settings.RATE_LIMIT, settings.RATE_LIMIT_WINDOW)
+    return rate_limiter
+
+shared_backend = get_shared_state() if settings.SHARED_STATE_FILE else None
+idempotency_store = IdempotencyStore(settings.IDEMPOTENCY_MAX_KEYS, settings.IDEMPOTENCY_TTL, shared=shared_backend)
 
 @app.post("/bot/handle")
 async def handle_bot(request: Request):
@@ -246,29 +153,186 @@ async def handle_bot(request: Request):
         data = await request.json()
     except:
         return JSONResponse(status_code=400, content={"error": {"type": "VALIDATION_ERROR", "details": "Invalid JSON"}})
-    
+
+    limited = rate_limit(request, data)
+    if limited is not None:
+        return limited
+
+    key = idempotency_key(request, data)
+    if key is None:
+        return await dispatch(data)
+    if not isinstance(key, str) or not 0 < len(key) <= 255:
+        return JSONResponse(status_code=400, content={"error": {"type": "VALIDATION_ERROR", "details": "Invalid idempotency key"}})
+
+    async def produce():
+        response = await dispatch(data)
+        if isinstance(response, JSONResponse):
+            return response.status_code, json.loads(response.body)
+        return 200, response
+
+    request_fingerprint = fingerprint({"transcript": data.get("transcript"), "transcripts": data.get("transcripts")})
+    try:
+        (status_code, body), replayed = await idempotency_store.run(key, request_fingerprint, produce)
+    except IdempotencyConflict:
+        return JSONResponse(status_code=422, content={"error": {
+            "type": "IDEMPOTENCY_CONFLICT",
+            "details": "Idempotency key was already used with a different request"
+        }})
+    except IdempotencyUnavailable as e:
+        return JSONResponse(status_code=409, content={"error": {"type": "IDEMPOTENCY_UNAVAILABLE", "details": e.details}})
+    headers = {"Idempotent-Replayed": "true"} if replayed else None
+    return JSONResponse(status_code=status_code, content=body, headers=headers)
+
+@app.get("/bot/metrics")
+async def bot_metrics():
+    """CRM circuit breaker / retry budget state and cache counters"""
+    resilience = getattr(request_crm_client(), "resilience", None)
+    return {
+        "crm": resilience.stats() if resilience is not None else None,
+        "nlu_cache": nlu.cache_stats(),
+        "idempotency": idempotency_store.stats(),
+        "sessions": session_store.stats(),
+        "rate_limit": rate_limiter.stats() if rate_limiter is not None else None,
+        "shared_state": shared_state.stats() if shared_state is not None else None,
+        "outbox": outbox_instance.stats() if outbox_instance is not None else None,
+    }
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Request, stage latency, CRM status and batch size metrics in Prometheus text format"""
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/bot/outbox/{tracking_id}")
+async def outbox_status(tracking_id: str):
+    """Delivery status of an action accepted into the outbox"""
+    entry = get_outbox().get(tracking_id) if settings.OUTBOX_MODE != "off" else None
+    if entry is None:
+        return JSONResponse(status_code=404, content={"error": {"type": "NOT_FOUND", "details": "Unknown tracking id"}})
+    return entry
+
+def client_key(request: Request) -> str:
+    """
+    Who rate limits apply to: the peer address, or the RATE_LIMIT_CLIENT_HEADER
+    value when that header is set by a trusted proxy (clients could forge it)
+    """
+    if settings.RATE_LIMIT_CLIENT_HEADER:
+        client_id = request.headers.get(settings.RATE_LIMIT_CLIENT_HEADER)
+        if client_id:
+            return client_id
+    return request.client.host if request.client else "unknown"
+
+def rate_limit(request: Request, data: Dict):
+    """A 429 response if the client is over its limit, else None; a batch costs one unit per transcript"""
+    transcripts = data.get("transcripts")
+    cost = len(transcripts) if isinstance(transcripts, list) and transcripts else 1
+    return over_rate_limit(client_key(request), cost)
+
+def over_rate_limit(client: str, cost: int = 1) -> Optional[JSONResponse]:
+    """Spend `cost` units of the client's limit; a 429 response (also for streamed lines) if over it, else None"""
+    limiter = get_rate_limiter()
+    if limiter is None:
+        return None
+    allowed, retry_after = limiter.check(client, cost)
+    if allowed:
+        return None
+    retry_after = max(1, math.ceil(retry_after))
+    return JSONResponse(
+        status_code=429,
+        content={"error": {
+            "type": "RATE_LIMITED",
+            "details": f"Over {limiter.limit} transcripts per {limiter.window:g}s",
+            "retry_after": retry_after,
+        }},
+        headers={"Retry-After": str(retry_after)},
+    )
+
+def idempotency_key(request: Request, data: Dict):
+    """The Idempotency-Key header, else metadata.idempotency_key, else None"""
+    key = request.headers.get("Idempotency-Key")
+    if key is None and isinstance(data.get("metadata"), dict):
+        key = data["metadata"].get("idempotency_key")
+    return key
+
+def session_key(data: Dict):
+    """metadata.session_id, or None"""
+    metadata = data.get("metadata")
+    return metadata.get("session_id") if isinstance(metadata, dict) else None
+
+async def dispatch(data: Dict):
     # Support both formats
     if "transcripts" in data:
-        transcripts = data["transcripts"]
-        responses = []
-        
-        for transcript in transcripts:
-            response = process_single_transcript(transcript)
-            responses.append(response)
-        
-        return {"responses": responses}
+        return {"responses": await process_batch(data["transcripts"])}
     else:
         transcript = data.get("transcript", "")
-        return process_single_transcript(transcript)
+        session_id = session_key(data)
+        if session_id is not None and (not isinstance(session_id, str) or not 0 < len(session_id) <= 255):
+            return JSONResponse(status_code=400, content={"error": {"type": "VALIDATION_ERROR", "details": "Invalid session id"}})
+        return await process_single_transcript_async(transcript, session_id)
 
-def process_single_transcript(transcript: str):
-    """Process a single transcript"""
+class DuplexStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body is produced while the request body is still
+    being read. The stock class polls `receive` for a disconnect in parallel,
+    which would steal request body messages; here the request stream itself
+    reports the disconnect.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+
+@app.post("/bot/handle/stream")
+async def handle_bot_stream(request: Request):
+    """Process newline-delimited transcripts, replying with one NDJSON result per line"""
+    return DuplexStreamingResponse(stream_transcripts(request.stream(), client_key(request)), media_type="application/x-ndjson")
+
+# ------------------------------
+# Processing stages
+# ------------------------------
+_nlu_executor = None
+
+REQUIRED_ENTITIES = {
+    "LEAD_CREATE": ("name", "phone"),
+    "LEAD_UPDATE": ("lead_id", "status"),
+    "VISIT_SCHEDULE": ("lead_id", "visit_time"),
+}
+
+# Conversation state for requests that carry metadata.session_id
+session_store = SessionStore(settings.SESSION_MAX, settings.SESSION_TTL, REQUIRED_ENTITIES, shared=shared_backend,
+                             budget=settings.NLU_TIME_BUDGET_MS / 1000)
+
+def analyze_transcript(transcript: str):
+    """Classify intent and extract entities (CPU-bound), reusing cached results"""
+    analyzed = nlu.analyze_cached(transcript, _analyze)
+    metrics.REQUESTS.labels(analyzed[0]).inc()
+    return analyzed
+
+def _analyze(doc):
     # Step 1: Classify intent
-    intent, confidence = classify_intent(transcript)
+    started = time.perf_counter()
+    intent, confidence = classify_intent(doc)
+    classified = time.perf_counter()
+    metrics.INTENT_SECONDS.observe(classified - started)
+    tracing.record("intent", classified - started)
 
     # Step 2: Extract entities
-    entities = extract_entities(transcript, intent)
+    entities = extract_entities(doc, intent)
+    extracted = time.perf_counter() - classified
+    metrics.ENTITIES_SECONDS.observe(extracted)
+    tracing.record("entities", extracted)
+    return intent, confidence, entities
+
+def oversized(transcript) -> Optional[JSONResponse]:
+    """413 for a transcript over TRANSCRIPT_MAX_LEN characters, else None; checked before any NLU"""
+    if len(transcript or "") <= settings.TRANSCRIPT_MAX_LEN:
+        return None
+    return JSONResponse(status_code=413, content={
+        "error": {
+            "type": "VALIDATION_ERROR",
+            "details": f"Transcript exceeds {settings.TRANSCRIPT_MAX_LEN} characters"
+        }
+    })
 
+def check_transcript(intent: str, confidence: float, entities: Dict):
+    """Return an early response for unknown intents or missing entities, else None"""
     # Step 3: Handle low confidence or unknown intent
     if confidence < 0.7 or intent == "UNKNOWN":
         return {
@@ -280,98 +344,82 @@ def process_single_transcript(transcript: str):
         }
 
     # Step 4: Validate required fields
+    missing_fields = [field for field in REQUIRED_ENTITIES.get(intent, ()) if not entities.get(field)]
+    if missing_fields:
+        return JSONResponse(status_code=400, content={
+            "error": {
+                "type": "VALIDATION_ERROR", 
+                "details": f"Missing required entities: {', '.join(missing_fields)}"
+            }
+        })
+    return None
+
+def plan_crm_action(intent: str, entities: Dict):
+    """Map a validated intent to (client method name, kwargs, crm_call), or None"""
     if intent == "LEAD_CREATE":
-        missing_fields = []
-        if not entities.get("name"):
-            missing_fields.append("name")
-        if not entities.get("phone"):
-            missing_fields.append("phone")
-        
-        if missing_fields:
-            return JSONResponse(status_code=400, content={
-                "error": {
-                    "type": "VALIDATION_ERROR", 
-                    "details": f"Missing required entities: {', '.join(missing_fields)}"
-                }
-            })
-            
+        return "create_lead", {
+            "name": entities["name"],
+            "phone": entities["phone"],
+            "city": entities.get("city"),
+            "source": entities.get("source")
+        }, {"endpoint": "/crm/leads", "method": "POST", "status_code": 200}
     elif intent == "LEAD_UPDATE":
-        missing_fields = []
-        if not entities.get("lead_id"):
-            missing_fields.append("lead_id")
-        if not entities.get("status"):
-            missing_fields.append("status")
-            
-        if missing_fields:
-            return JSONResponse(status_code=400, content={
-                "error": {
-                    "type": "VALIDATION_ERROR", 
-                    "details": f"Missing required entities: {', '.join(missing_fields)}"
-                }
-            })
-            
+        return "update_status", {
+            "lead_id": entities["lead_id"],
+            "status": entities["status"],
+            "notes": entities.get("notes")
+        }, {"endpoint": f"/crm/leads/{entities['lead_id']}/status", "method": "POST", "status_code": 200}
     elif intent == "VISIT_SCHEDULE":
-        missing_fields = []
-        if not entities.get("lead_id"):
-            missing_fields.append("lead_id")
-        if not entities.get("visit_time"):
-            missing_fields.append("visit_time")
-            
-        if missing_fields:
-            return JSONResponse(status_code=400, content={
-                "error": {
-                    "type": "VALIDATION_ERROR", 
-                    "details": f"Missing required entities: {', '.join(missing_fields)}"
-                }
-            })
-
-    # Step 5: Perform CRM action
-    try:
-        if intent == "LEAD_CREATE":
-            crm_result = crm_client_instance.create_lead(
-                name=entities["name"],
-                phone=entities["phone"],
-                city=entities.get("city"),
-                source=entities.get("source")
-            )
-            crm_call = {
-                "endpoint": "/crm/leads",
-                "method": "POST",
-                "status_code": 200
-            }
-        elif intent == "LEAD_UPDATE":
-            crm_result = crm_client_instance.update_status(
-                lead_id=entities["lead_id"],
-                status=entities["status"],
-                notes=entities.get("notes")
-            )
-            crm_call = {
-                "endpoint": f"/crm/leads/{entities['lead_id']}/status",
-                "method": "POST",
-                "status_code": 200
-            }
-        elif intent == "VISIT_SCHEDULE":
-            crm_result = crm_client_instance.schedule_visit(
-                lead_id=entities["lead_id"],
-                visit_time=entities["visit_time"],
-                notes=entities.get("notes")
-            )
-            crm_call = {
-                "endpoint": "/crm/visits",
-                "method": "POST",
-                "status_code": 200
-            }
-        else:
-            crm_result = {}
-            crm_call = {}
+        return "schedule_visit", {
+            "lead_id": entities["lead_id"],
+            "visit_time": entities["visit_time"],
+            "notes": entities.get("notes")
+        }, {"endpoint": "/crm/visits", "method": "POST", "status_code": 200}
+    return None
 
-    except CRMError as e:
-        return JSONResponse(status_code=502, content={
+def crm_error_response(e: CRMError):
+    if isinstance(e, CRMUnavailable):
+        # Circuit open: fail fast without touching the CRM
+        return JSONResponse(status_code=503, content={
             "error": {
-                "type": "CRM_ERROR",
+                "type": "CRM_UNAVAILABLE",
                 "details": e.message
             }
         })
+    return JSONResponse(status_code=502, content={
+        "error": {
+            "type": "CRM_ERROR",
+            "details": e.message
+        }
+    })
+
+@tracing.traced
+def process_single_transcript(transcript: str):
+    """Process a single transcript"""
+    rejected = oversized(transcript)
+    if rejected is not None:
+        return rejected
+    intent, confidence, entities = analyze_transcript(transcript)
+    early = check_transcript(intent, confidence, entities)
+    if early is not None:
+        return early
+
+    # Step 5: Perform CRM action
+    action = plan_crm_action(intent, entities)
+    crm_result, crm_call = {}, {}
+    if action is not None:
+        method, kwargs, crm_call = action
+        if should_queue(kwargs):
+            return queue_action(intent, entities, method, kwargs, crm_call)
+        started = time.perf_counter()
+        try:
+            crm_result = getattr(crm_client_instance, method)(**kwargs)
+        except CRMError as e:
+            record_crm(method, started, e)
+            if outbox_accepts(e):
+                return queue_action(intent, entities, method, kwargs, crm_call)
+            return crm_error_response(e)
+        record_crm(method, started)
 
     return {
         "intent": intent,
@@ -380,5 +428,447 @@ def process_single_transcript(transcript: str):
         "crm_call": crm_call
     }
 
+async def run_nlu(transcript: str):
+    """Run analyze_transcript off the event loop when an NLU pool is configured"""
+    return await in_nlu_pool(analyze_transcript, transcript)
+
+async def in_nlu_pool(fn, *args):
+    """Call fn(*args) in the NLU pool, or inline when NLU_WORKERS is 0"""
+    global _nlu_executor
+    if settings.NLU_WORKERS <= 0:
+        return fn(*args)
+    if _nlu_executor is None:
+        _nlu_executor = ThreadPoolExecutor(max_workers=settings.NLU_WORKERS, thread_name_prefix="nlu")
+    loop = asyncio.get_running_loop()
+    # Carry the context over so stage timings reach the request's trace
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_nlu_executor, context.run, fn, *args)
+
+def request_crm_client():
+    """CRM client used on the async request path"""
+    return async_crm_client_instance or crm_client_instance
+
+async def call_crm(method: str, *args, **kwargs):
+    """Call a CRM client method without blocking the event loop"""
+    client = request_crm_client()
+    call = getattr(client, method)
+    label = f"bulk_{args[0]}" if method == "bulk" and args else method
+    started = time.perf_counter()
+    try:
+        if inspect.iscoroutinefunction(call):
+            result = await call(*args, **kwargs)
+        elif getattr(client, "blocking_io", False):
+            result = await run_in_threadpool(call, *args, **kwargs)
+        else:
+            # In-memory clients return immediately
+            result = call(*args, **kwargs)
+    except CRMError as e:
+        record_crm(label, started, e)
+        raise
+    record_crm(label, started)
+    return result
+
+def record_crm(method: str, started: float, error: Optional[CRMError] = None) -> None:
+    """CRM call latency and status code (200 for any success) for /metrics and the trace"""
+    seconds = time.perf_counter() - started
+    metrics.CRM_SECONDS.observe(seconds)
+    tracing.record("crm", seconds)
+    metrics.CRM_RESPONSES.labels(method, str(error.status_code) if error is not None else "200").inc()
+
+@tracing.traced
+async def process_single_transcript_async(transcript: str, session_id: Optional[str] = None):
+    """
+    Process a single transcript without blocking the event loop. With a
+    session id, the turn can complete the session's pending turn or use its
+    last lead_id, and is remembered for the next one.
+    """
+    rejected = oversized(transcript)
+    if rejected is not None:
+        return rejected
+    analyzed = await run_nlu(transcript)
+    if session_id is None:
+        return await finish_transcript_async(*analyzed)
+    # Completing a pending turn re-extracts entities, so it runs in the pool too
+    analyzed, carried_over = await in_nlu_pool(session_store.resume, session_id, transcript, *analyzed)
+    response = await finish_transcript_async(*analyzed)
+    return end_turn(session_id, analyzed, carried_over, response)
+
+def end_turn(session_id: str, analyzed, carried_over: List[str], response):
+    """Remember the turn in its session and report what the session supplied and still awaits"""
+    intent, confidence, entities = analyzed
+    body = json.loads(response.body) if isinstance(response, JSONResponse) else response
+    lead_id = (body.get("result") or {}).get("lead_id") or entities.get("lead_id")
+    awaiting = session_store.end_turn(session_id, intent, confidence, entities, lead_id)
+    body = {**body, "session": {"id": session_id, "carried_over": carried_over, "awaiting": awaiting}}
+    if isinstance(response, JSONResponse):
+        return JSONResponse(status_code=response.status_code, content=body)
+    return body
+
+async def finish_transcript_async(intent: str, confidence: float, entities: Dict):
+    """Validate an analyzed transcript and perform its CRM action"""
+    early = check_transcript(intent, confidence, entities)
+    if early is not None:
+        return early
+
+    # Step 5: Perform CRM action
+    action = plan_crm_action(intent, entities)
+    crm_result, crm_call = {}, {}
+    if action is not None:
+        method, kwargs, crm_call = action
+        if should_queue(kwargs):
+            return await run_in_threadpool(queue_action, intent, entities, method, kwargs, crm_call)
+        try:
+            crm_result = await call_crm(method, **kwargs)
+        except CRMError as e:
+            if outbox_accepts(e):
+                return await run_in_threadpool(queue_action, intent, entities, method, kwargs, crm_call)
+            return crm_error_response(e)
+
+    return {
+        "intent": intent,
+        "entities": entities,
+        "result": crm_result,
+        "crm_call": crm_call
+    }
+
+# ------------------------------
+# Outbox (write-behind CRM actions)
+# ------------------------------
+outbox_instance: Optional[Outbox] = None
+_outbox_lock = threading.Lock()
+
+def get_outbox() -> Outbox:
+    """The process-wide outbox, opened on first use"""
+    global outbox_instance
+    if outbox_instance is None:
+        with _outbox_lock:
+            if outbox_instance is None:
+                outbox_instance = Outbox(
+                    settings.OUTBOX_DB,
+                    perform=deliver_action,
+                    is_transient=outbox_transient,
+                    batch_size=settings.OUTBOX_BATCH_SIZE,
+                    concurrency=settings.OUTBOX_CONCURRENCY,
+                    poll_interval=settings.OUTBOX_POLL_INTERVAL,
+                    retention=settings.OUTBOX_RETENTION,
+                    lease=settings.OUTBOX_LEASE,
+                )
+    return outbox_instance
+
+def deliver_action(method: str, kwargs: Dict):
+    """Outbox worker: perform a queued action with the blocking CRM client"""
+    started = time.perf_counter()
+    try:
+        result = getattr(crm_client_instance, method)(**kwargs)
+    except CRMError as e:
+        record_crm(method, started, e)
+        raise
+    record_crm(method, started)
+    return result
+
+def outbox_transient(e: Exception) -> bool:
+    """Failures worth another delivery attempt later; anything else fails the action"""
+    return isinstance(e, CRMError) and (e.retryable or e.status_code >= 500)
+
+def should_queue(kwargs: Dict) -> bool:
+    """Queue up front in "always" mode, or behind actions already queued for the same lead"""
+    if settings.OUTBOX_MODE == "always":
+        return True
+    return settings.OUTBOX_MODE == "fallback" and get_outbox().pending_for(kwargs.get("lead_id")) > 0
+
+def outbox_accepts(e: CRMError) -> bool:
+    """
+    In "fallback" mode, queue actions the CRM never acted on: circuit open or
+    retries of a safe-to-resend failure exhausted. Timeouts and other 5xx
+    may have been applied, so they are still reported as errors.
+    """
+    return settings.OUTBOX_MODE == "fallback" and (isinstance(e, CRMUnavailable) or e.retryable)
+
+def queue_action(intent: str, entities: Dict, method: str, kwargs: Dict, crm_call: Dict):
+    """Persist the action and answer 202 with its tracking id"""
+    tracking_id = get_outbox().enqueue(method, kwargs, lead_key=kwargs.get("lead_id"))
+    return JSONResponse(status_code=202, content={
+        "intent": intent,
+        "entities": entities,
+        "result": {"status": "ACCEPTED", "tracking_id": tracking_id},
+        "crm_call": {**crm_call, "status_code": 202, "queued": True}
+    })
+
+# ------------------------------
+# Batch mode
+# ------------------------------
+def batch_item(response) -> Dict:
+    """Inline error responses as plain dicts carrying their status code"""
+    if isinstance(response, JSONResponse):
+        return {"status_code": response.status_code, **json.loads(response.body)}
+    return response
+
+async def process_batch(transcripts: List[str]) -> List[Dict]:
+    """
+    Process a batch concurrently, at most BATCH_CONCURRENCY transcripts at a
+    time. Responses keep the input order, and transcripts that reference the
+    same lead_id run one after another in input order. When the CRM client
+    supports bulk calls, the batch's CRM actions are coalesced into them.
+    Oversized transcripts get their 413 in place and are never analyzed.
+    """
+    metrics.BATCH_SIZE.observe(len(transcripts), "request")
+    gate = asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY))
+    rejected = {}
+    for i, transcript in enumerate(transcripts):
+        response = oversized(transcript)
+        if response is not None:
+            rejected[i] = _timed(response, 0)
+    if rejected:
+        transcripts = [t for i, t in enumerate(transcripts) if i not in rejected]
+    if nlu.INTENT_MODEL is not None:
+        # Score every keyword miss in the batch with one model call, off the event loop
+        transcripts = await in_nlu_pool(nlu.prepare_batch, transcripts)
+
+    async def analyze(transcript):
+        async with gate:
+            start = time.perf_counter()
+            analyzed = await run_nlu(transcript)
+            return analyzed, time.perf_counter() - start
+
+    analyzed = await asyncio.gather(*[analyze(t) for t in transcripts])
+    responses = await finish_batch(analyzed, gate)
+    if rejected:
+        remaining = iter(responses)
+        responses = [rejected[i] if i in rejected else next(remaining) for i in range(len(responses) + len(rejected))]
+    return responses
+
+async def finish_batch(analyzed, gate: Optional[asyncio.Semaphore] = None) -> List[Dict]:
+    """Validate analyzed transcripts, given as ((intent, confidence, entities), nlu seconds), and run their CRM actions"""
+    if gate is None:
+        gate = asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY))
+    if settings.CRM_BULK and settings.OUTBOX_MODE != "always" and hasattr(request_crm_client(), "bulk"):
+        return await _coalesce_batch(analyzed, gate)
+    return await _fan_out_batch(analyzed, gate)
+
+def _timed(response, seconds: float) -> Dict:
+    return {**batch_item(response), "elapsed_ms": round(seconds * 1000, 3)}
+
+async def _fan_out_batch(analyzed, gate) -> List[Dict]:
+    """One CRM call per transcript, chained per lead"""
+    chains: Dict[Any, List[int]] = {}
+    for i, ((_, _, entities), _) in enumerate(analyzed):
+        chains.setdefault(entities.get("lead_id") or i, []).append(i)
+
+    responses: List[Optional[Dict]] = [None] * len(analyzed)
+
+    async def run_chain(indices):
+        for i in indices:
+            (intent, confidence, entities), nlu_seconds = analyzed[i]
+            async with gate:
+                start = time.perf_counter()
+                response = await finish_transcript_async(intent, confidence, entities)
+                elapsed = nlu_seconds + time.perf_counter() - start
+            responses[i] = _timed(response, elapsed)
+
+    await asyncio.gather(*[run_chain(indices) for indices in chains.values()])
+    return responses
+
+async def _coalesce_batch(analyzed, gate) -> List[Dict]:
+    """
+    Group CRM actions into bulk calls. The n-th action on a lead goes into
+    round n, so each lead's actions still reach the CRM in input order;
+    within a round there is one bulk call per method (chunked by
+    CRM_BULK_MAX_ITEMS).
+    """
+    responses: List[Optional[Dict]] = [None] * len(analyzed)
+    rounds: List[Dict[str, List]] = []
+    actions_per_lead: Dict[str, int] = {}
+
+    for i, ((intent, confidence, entities), nlu_seconds) in enumerate(analyzed):
+        early = check_transcript(intent, confidence, entities)
+        action = plan_crm_action(intent, entities) if early is None else None
+        if action is None:
+            response = early if early is not None else {"intent": intent, "entities": entities, "result": {}, "crm_call": {}}
+            responses[i] = _timed(response, nlu_seconds)
+            continue
+        method, kwargs, crm_call = action
+        lead_id = kwargs.get("lead_id")
+        round_no = actions_per_lead.get(lead_id, 0) if lead_id else 0
+        if lead_id:
+            actions_per_lead[lead_id] = round_no + 1
+        while len(rounds) <= round_no:
+            rounds.append({})
+        rounds[round_no].setdefault(method, []).append((i, kwargs, crm_call))
+
+    async def run_bulk(method, entries):
+        # Checked per round: an earlier action on the lead may have been queued meanwhile
+        queued = [entry for entry in entries if should_queue(entry[1])]
+        for i, kwargs, crm_call in queued:
+            (intent, _, entities), nlu_seconds = analyzed[i]
+            response = await run_in_threadpool(queue_action, intent, entities, method, kwargs, crm_call)
+            responses[i] = _timed(response, nlu_seconds)
+        entries = [entry for entry in entries if responses[entry[0]] is None]
+        if not entries:
+            return
+        metrics.BATCH_SIZE.observe(len(entries), "crm_bulk")
+        async with gate:
+            start = time.perf_counter()
+            try:
+                outcomes = await call_crm("bulk", method, [kwargs for _, kwargs, _ in entries])
+            except CRMError as e:
+                outcomes = [e] * len(entries)
+            crm_seconds = time.perf_counter() - start
+        for (i, kwargs, crm_call), outcome in zip(entries, outcomes):
+            (intent, _, entities), nlu_seconds = analyzed[i]
+            if isinstance(outcome, CRMError) and outbox_accepts(outcome):
+                response = await run_in_threadpool(queue_action, intent, entities, method, kwargs, crm_call)
+            elif isinstance(outcome, CRMError):
+                response = crm_error_response(outcome)
+            else:
+                response = {"intent": intent, "entities": entities, "result": outcome,
+                            "crm_call": {**crm_call, "bulk": True}}
+            responses[i] = _timed(response, nlu_seconds + crm_seconds)
+
+    size = max(1, settings.CRM_BULK_MAX_ITEMS)
+    for groups in rounds:
+        await asyncio.gather(*[
+            run_bulk(method, entries[start:start + size])
+            for method, entries in groups.items()
+            for start in range(0, len(entries), size)
+        ])
+    return responses
+
+# ------------------------------
+# Streaming mode
+# ------------------------------
+async def iter_stream_lines(chunks: AsyncIterator[bytes], max_line_bytes: int):
+    """
+    Split a byte stream into (line number, line) pairs without holding more
+    than one line. Lines longer than `max_line_bytes` are discarded and
+    yielded as None.
+    """
+    buffer = bytearray()
+    line_no = 0
+    overlong = False
+    async for chunk in chunks:
+        buffer += chunk
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_no += 1
+            too_long = overlong or end - start > max_line_bytes
+            yield line_no, None if too_long else bytes(buffer[start:end])
+            overlong = False
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > max_line_bytes:
+            overlong = True
+            buffer.clear()
+    if buffer or overlong:
+        yield line_no + 1, None if overlong else bytes(buffer)
+
+def parse_stream_line(line: bytes) -> str:
+    """A line is a JSON object with "transcript", a JSON string, or plain text"""
+    text = line.decode("utf-8", errors="replace").strip()
+    if text[:1] in ("{", '"'):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return text
+        if isinstance(data, dict):
+            return str(data.get("transcript") or "")
+        if isinstance(data, str):
+            return data
+    return text
+
+async def stream_transcripts(chunks: AsyncIterator[bytes], client: Optional[str] = None):
+    """
+    Process an NDJSON/plain-text transcript stream and yield NDJSON results
+    as they finish, each tagged with its input line number.
+
+    At most STREAM_WINDOW lines are read but not yet written back, so a slow
+    client stops the reader (and, through TCP, the sender) instead of results
+    piling up in memory. Work runs BATCH_CONCURRENCY at a time, and
+    transcripts that reference the same lead_id reach the CRM in input order.
+    Each line is charged to `client`'s rate limit; lines over it get a 429.
+    """
+    window = asyncio.Semaphore(max(1, settings.STREAM_WINDOW))
+    gate = asyncio.Semaphore(max(1, settings.BATCH_CONCURRENCY))
+    results: asyncio.Queue = asyncio.Queue()
+    lead_tails: Dict[str, asyncio.Event] = {}
+
+    async def run_item(line_no, line, claimed_before, claimed):
+        start = time.perf_counter()
+        done = asyncio.Event()
+        lead_id = None
+        try:
+            if line is None:
+                response = JSONResponse(status_code=413, content={"error": {
+                    "type": "VALIDATION_ERROR",
+                    "details": f"Line exceeds {settings.STREAM_MAX_LINE_BYTES} bytes"
+                }})
+            else:
+                transcript = parse_stream_line(line)
+                response = oversized(transcript)
+                if response is None and client is not None:
+                    response = over_rate_limit(client)
+            if response is not None:
+                # Rejected lines hold no lead, but must not let later lines claim ahead of earlier ones
+                await claimed_before.wait()
+                claimed.set()
+            else:
+                async with gate:
+                    intent, confidence, entities = await run_nlu(transcript)
+                # Claim the lead in input order, then wait for earlier work on it
+                await claimed_before.wait()
+                lead_id = entities.get("lead_id")
+                previous = lead_tails.get(lead_id) if lead_id else None
+                if lead_id:
+                    lead_tails[lead_id] = done
+                claimed.set()
+                if previous is not None:
+                    await previous.wait()
+                async with gate:
+                    response = await finish_transcript_async(intent, confidence, entities)
+        except Exception as e:
+            await claimed_before.wait()
+            claimed.set()
+            response = JSONResponse(status_code=500, content={"error": {"type": "INTERNAL_ERROR", "details": str(e)}})
+        finally:
+            done.set()
+            if lead_id and lead_tails.get(lead_id) is done:
+                del lead_tails[lead_id]
+        results.put_nowait({"line": line_no, **_timed(response, time.perf_counter() - start)})
+
+    async def read():
+        pending = set()
+        claimed = asyncio.Event()
+        claimed.set()
+        try:
+            async for line_no, line in iter_stream_lines(chunks, settings.STREAM_MAX_LINE_BYTES):
+                if line is not None and not line.strip():
+                    continue
+                await window.acquire()
+                claimed_before, claimed = claimed, asyncio.Event()
+                task = asyncio.create_task(run_item(line_no, line, claimed_before, claimed))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            for task in pending:
+                task.cancel()
+            results.put_nowait(None)
+
+    reader = asyncio.create_task(read())
+    try:
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            yield (json.dumps(item) + "\n").encode("utf-8")
+            window.release()
+    finally:
+        if not reader.done():
+            reader.cancel()
+    await reader
+
 # Export the functions and classes for testing
 __all__ = ['classify_intent', 'extract_entities', 'CRMClient', 'CRMError']
\ No newline at end of file
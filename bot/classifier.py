@@ -0,0 +1,238 @@
+# bot/classifier.py
+"""
+Hashed character n-gram intent classifier (multinomial logistic regression).
+
+Transcripts are lowered, padded with a space on each side and cut into
+character n-grams; each n-gram is hashed into one of 2**bits feature slots.
+A transcript's score is the sum of its n-grams' weight rows over
+sqrt(n-gram count), so scoring a batch is one gather of weight rows plus a
+per-transcript segment sum, with no dense feature matrix. Needs NumPy; the
+rest of the bot runs without it.
+
+The model file is a small JSON header followed by a float32 weight matrix
+and is loaded with np.memmap, so processes serving the same model share
+its pages.
+
+    python -m bot.classifier train labeled.jsonl -o intent_model.bin [--bits 18] [--epochs 30]
+    python -m bot.classifier evaluate labeled.jsonl -m intent_model.bin
+
+Labeled files hold one {"transcript": "...", "intent": "..."} object per line.
+"""
+import argparse
+import json
+import struct
+import sys
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"BOTINTENT1\n"
+ALIGN = 64
+
+PRIME = np.uint64(1000003)
+GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+class IntentModel:
+    """Linear softmax model over hashed char n-grams; `weights` holds one row per slot plus a bias row."""
+
+    def __init__(self, labels: Sequence[str], weights: np.ndarray, ngram_range: Tuple[int, int] = (3, 5)):
+        self.labels = list(labels)
+        self.weights = weights
+        self.n_features = weights.shape[0] - 1
+        if self.n_features & (self.n_features - 1):
+            raise ValueError("Feature count must be a power of two")
+        self.bits = self.n_features.bit_length() - 1
+        self.ngram_range = tuple(ngram_range)
+
+    # ------------------------------
+    # Inference
+    # ------------------------------
+    def features(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashed n-gram slots of every text as (slot, text index) arrays"""
+        # NUL separates texts, so n-grams spanning two texts can be masked out
+        joined = b"\x00".join((" " + text.lower().replace("\x00", " ") + " ").encode("utf-8") for text in texts)
+        data = np.frombuffer(joined, dtype=np.uint8)
+        separator = data == 0
+        owner = np.cumsum(separator)
+        shift = np.uint64(64 - self.bits)
+        slots, owners = [], []
+        for n in range(self.ngram_range[0], self.ngram_range[1] + 1):
+            count = len(data) - n + 1
+            if count <= 0:
+                continue
+            h = np.full(count, n, dtype=np.uint64)
+            spans_texts = np.zeros(count, dtype=bool)
+            for k in range(n):
+                h = h * PRIME + data[k:k + count]
+                spans_texts |= separator[k:k + count]
+            keep = ~spans_texts
+            slots.append(((h * GOLDEN) >> shift)[keep])
+            owners.append(owner[:count][keep])
+        if not slots:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        return np.concatenate(slots).astype(np.intp), np.concatenate(owners).astype(np.intp)
+
+    def logits(self, texts: Sequence[str]) -> np.ndarray:
+        """Scores of every label for a batch of texts, shape (len(texts), len(labels))"""
+        return self._scores(*self.features(texts), len(texts))
+
+    def _scores(self, slots: np.ndarray, owners: np.ndarray, size: int) -> np.ndarray:
+        norms = _norms(owners, size)
+        rows = self.weights[slots]
+        scores = np.empty((size, len(self.labels)), dtype=np.float64)
+        for j in range(len(self.labels)):
+            scores[:, j] = np.bincount(owners, weights=rows[:, j], minlength=size)
+        scores /= norms[:, None]
+        scores += self.weights[-1]
+        return scores
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        return _softmax(self.logits(texts))
+
+    def predict(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """(intent, probability) of the most likely label for each text, scored as one batch"""
+        if not texts:
+            return []
+        proba = self.predict_proba(texts)
+        best = proba.argmax(axis=1)
+        return [(self.labels[i], float(p)) for i, p in zip(best, proba[np.arange(len(best)), best])]
+
+    def classify_intent(self, transcript: str) -> Tuple[str, float]:
+        """Same interface as nlu.classify_intent"""
+        return self.predict([transcript])[0]
+
+    # ------------------------------
+    # Persistence
+    # ------------------------------
+    def save(self, path: str) -> None:
+        header = json.dumps({
+            "labels": self.labels,
+            "n_features": self.n_features,
+            "ngram_range": list(self.ngram_range),
+        }).encode("utf-8")
+        prefix = len(MAGIC) + 4 + len(header)
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            f.write(b"\x00" * (-prefix % ALIGN))
+            f.write(np.ascontiguousarray(self.weights, dtype="<f4").tobytes())
+
+    @classmethod
+    def load(cls, path: str) -> "IntentModel":
+        """Open a saved model; the weights stay memory-mapped read-only"""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an intent model file")
+            (length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length))
+        prefix = len(MAGIC) + 4 + length
+        offset = prefix + (-prefix % ALIGN)
+        shape = (header["n_features"] + 1, len(header["labels"]))
+        weights = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=shape)
+        return cls(header["labels"], weights, tuple(header["ngram_range"]))
+
+
+def _norms(owners: np.ndarray, size: int) -> np.ndarray:
+    # Each n-gram counts 1/sqrt(n-grams in its text): the L2 norm of a text's
+    # count vector when its n-grams are distinct
+    return np.sqrt(np.maximum(np.bincount(owners, minlength=size), 1))
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    np.exp(scores, out=scores)
+    scores /= scores.sum(axis=1, keepdims=True)
+    return scores
+
+
+# ------------------------------
+# Training
+# ------------------------------
+def train(
+    texts: Sequence[str],
+    intents: Sequence[str],
+    bits: int = 18,
+    ngram_range: Tuple[int, int] = (3, 5),
+    epochs: int = 30,
+    learning_rate: float = 0.5,
+    batch_size: int = 64,
+    l2: float = 1e-5,
+    seed: int = 0,
+) -> IntentModel:
+    """Fit the model with mini-batch AdaGrad on softmax cross-entropy"""
+    labels = sorted(set(intents))
+    index = {label: i for i, label in enumerate(labels)}
+    targets = np.array([index[intent] for intent in intents])
+    model = IntentModel(labels, np.zeros(((1 << bits) + 1, len(labels)), dtype=np.float32), ngram_range)
+    weights = model.weights
+    squared = np.full_like(weights, 1e-8)
+    rng = np.random.default_rng(seed)
+
+    for _ in range(epochs):
+        order = rng.permutation(len(texts))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            slots, owners = model.features([texts[i] for i in batch])
+            norms = _norms(owners, len(batch))
+            error = _softmax(model._scores(slots, owners, len(batch)))
+            error[np.arange(len(batch)), targets[batch]] -= 1
+            error /= len(batch)
+
+            # Gradient rows only for the slots this batch touched
+            touched, inverse = np.unique(slots, return_inverse=True)
+            contributions = error[owners] / norms[owners, None]
+            grad = np.empty((len(touched), len(labels)))
+            for j in range(len(labels)):
+                grad[:, j] = np.bincount(inverse, weights=contributions[:, j], minlength=len(touched))
+            grad += l2 * weights[touched]
+            rows = np.append(touched, weights.shape[0] - 1)
+            grad = np.vstack([grad, error.sum(axis=0)])
+            squared[rows] += grad ** 2
+            weights[rows] -= learning_rate * grad / np.sqrt(squared[rows])
+    return model
+
+
+def read_labeled(path: str) -> Tuple[List[str], List[str]]:
+    texts, intents = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                texts.append(item["transcript"])
+                intents.append(item["intent"])
+    return texts, intents
+
+
+def accuracy(model: IntentModel, texts: Sequence[str], intents: Sequence[str]) -> float:
+    predicted = model.predict(texts)
+    return sum(p == t for (p, _), t in zip(predicted, intents)) / max(1, len(intents))
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_cmd = commands.add_parser("train", help="fit a model on labeled JSONL")
+    train_cmd.add_argument("data")
+    train_cmd.add_argument("-o", "--output", default="intent_model.bin")
+    train_cmd.add_argument("--bits", type=int, default=18, help="log2 of the hashed feature slots")
+    train_cmd.add_argument("--epochs", type=int, default=30)
+    evaluate_cmd = commands.add_parser("evaluate", help="report accuracy of a model on labeled JSONL")
+    evaluate_cmd.add_argument("data")
+    evaluate_cmd.add_argument("-m", "--model", default="intent_model.bin")
+    args = parser.parse_args(argv)
+
+    texts, intents = read_labeled(args.data)
+    if args.command == "train":
+        model = train(texts, intents, bits=args.bits, epochs=args.epochs)
+        model.save(args.output)
+        print(f"{len(texts)} examples, {len(model.labels)} intents, "
+              f"training accuracy {accuracy(model, texts, intents):.3f}", file=sys.stderr)
+    else:
+        model = IntentModel.load(args.model)
+        print(f"accuracy {accuracy(model, texts, intents):.3f} on {len(texts)} examples", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,301 @@
 # bot/crm_client.py
+import asyncio
+import json
 import uuid
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Union
+
+import httpx
+
+from .lead_store import LeadStore
+from .resilience import CircuitBreaker, CircuitOpenError, ResiliencePolicy, RetryBudget
 from .settings import settings
 
 class CRMError(Exception):
-    def __init__(self, status_code: int, message: str):
+    def __init__(self, status_code: int, message: str, retryable: bool = False):
         self.status_code = status_code
         self.message = message
+        # True when the CRM certainly did not act on the request, so resending is safe
+        self.retryable = retryable
         super().__init__(f"CRMError {status_code}: {message}")
 
+class CRMUnavailable(CRMError):
+    """The circuit breaker is open; the CRM was not called."""
+    def __init__(self):
+        super().__init__(503, "CRM circuit breaker is open")
+
 class CRMClient:
     """
     Mock/in-memory CRM client for local testing.
     Stores leads in memory to allow sequential operations.
     """
+    blocking_io = False
+
     def __init__(self, base_url: str = None, timeout: int = 5):
         self.base_url = base_url or settings.CRM_BASE_URL
         self.timeout = timeout
-        self.leads: Dict[str, Dict[str, Any]] = {}  # In-memory storage for leads
+        self.leads = LeadStore()  # In-memory storage for leads
 
     def create_lead(self, name: str, phone: str, city: str, source: str = None) -> Dict[str, Any]:
-        lead_id = str(uuid.uuid4())
-        self.leads[lead_id] = {
-            "name": name,
-            "phone": phone,
-            "city": city,
-            "source": source,
-            "status": "NEW"
-        }
-        return {"lead_id": lead_id, "status": "NEW"}
+        lead = self.leads.add(name, phone, city, source)
+        return {"lead_id": lead.lead_id, "status": lead.status}
 
     def schedule_visit(self, lead_id: str, visit_time: str, notes: str = None) -> Dict[str, Any]:
-        if lead_id not in self.leads:
+        fields = {"visit_time": visit_time, "notes": notes} if notes else {"visit_time": visit_time}
+        try:
+            self.leads.update(lead_id, **fields)
+        except KeyError:
             raise CRMError(404, '{"detail":"Lead not found"}')
-        self.leads[lead_id]["visit_time"] = visit_time
-        if notes:
-            self.leads[lead_id]["notes"] = notes
         return {"visit_id": str(uuid.uuid4()), "status": "SCHEDULED"}
 
     def update_status(self, lead_id: str, status: str, notes: str = None) -> Dict[str, Any]:
-        if lead_id not in self.leads:
+        fields = {"status": status, "notes": notes} if notes else {"status": status}
+        try:
+            self.leads.update(lead_id, **fields)
+        except KeyError:
             raise CRMError(404, '{"detail":"Lead not found"}')
-        self.leads[lead_id]["status"] = status
-        if notes:
-            self.leads[lead_id]["notes"] = notes
-        return {"lead_id": lead_id, "status": status}
\ No newline at end of file
+        return {"lead_id": lead_id, "status": status}
+
+def _crm_result(response: httpx.Response) -> Dict[str, Any]:
+    if response.status_code >= 400:
+        # 429/503 mean the CRM turned the request away without acting on it
+        raise CRMError(response.status_code, response.text, retryable=response.status_code in (429, 503))
+    try:
+        return response.json()
+    except ValueError:
+        # The CRM may have acted, so this is not retryable
+        raise CRMError(502, f"CRM sent a non-JSON {response.status_code} response: {response.text[:200]}") from None
+
+
+def _crm_transport_error(e: httpx.HTTPError) -> CRMError:
+    # Only failures before the request went out are safe to resend: a read
+    # timeout may hide a lead that was created anyway
+    unsent = isinstance(e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+    if isinstance(e, httpx.TimeoutException):
+        return CRMError(504, f"CRM request timed out: {e}", retryable=unsent)
+    return CRMError(503, f"CRM unreachable: {e}", retryable=unsent)
+
+
+def _is_crm_failure(e: BaseException) -> bool:
+    """Errors that count against the circuit breaker (not 4xx rejections)"""
+    return isinstance(e, CRMError) and (e.status_code >= 500 or e.status_code == 429)
+
+
+def _is_retryable(e: BaseException) -> bool:
+    return isinstance(e, CRMError) and e.retryable
+
+
+def build_resilience_policy() -> Optional[ResiliencePolicy]:
+    """Circuit breaker and retry budget configured from settings, or None when disabled"""
+    if not settings.CRM_BREAKER:
+        return None
+    return ResiliencePolicy(
+        CircuitBreaker(
+            failure_rate=settings.CRM_BREAKER_FAILURE_RATE,
+            min_calls=settings.CRM_BREAKER_MIN_CALLS,
+            window=settings.CRM_BREAKER_WINDOW,
+            open_seconds=settings.CRM_BREAKER_OPEN_SECONDS,
+        ),
+        RetryBudget(ratio=settings.CRM_RETRY_BUDGET),
+        is_failure=_is_crm_failure,
+        is_retryable=_is_retryable,
+        max_retries=settings.CRM_RETRIES,
+        backoff_base=settings.CRM_RETRY_BACKOFF,
+        backoff_max=settings.CRM_RETRY_BACKOFF_MAX,
+    )
+
+
+# Bulk endpoint per single-item client method
+BULK_PATHS = {
+    "create_lead": "/crm/leads:batch",
+    "schedule_visit": "/crm/visits:batch",
+    "update_status": "/crm/leads/status:batch",
+}
+
+
+def _bulk_outcomes(body: Dict[str, Any]) -> List[Union[Dict[str, Any], CRMError]]:
+    """Per-item result dicts, or CRMError for the items the CRM rejected"""
+    return [
+        item["result"] if item.get("ok") else CRMError(item.get("status_code", 500), json.dumps({"detail": item.get("error")}))
+        for item in body["results"]
+    ]
+
+
+def _limits(max_connections: int, max_keepalive_connections: int, keepalive_expiry: float) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+
+
+class HTTPCRMClient:
+    """
+    HTTP CRM client with the same interface as CRMClient.
+    A single httpx.Client is shared across calls so keep-alive connections
+    are pooled and reused; HTTP and transport failures surface as CRMError.
+    """
+    blocking_io = True
+
+    def __init__(
+        self,
+        base_url: str = None,
+        timeout: float = 5.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        transport: Optional[httpx.BaseTransport] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+    ):
+        self.base_url = (base_url or settings.CRM_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.resilience = resilience
+        self._client = httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=_limits(max_connections, max_keepalive_connections, keepalive_expiry),
+            transport=transport,
+        )
+
+    def _post(self, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        if self.resilience is None:
+            return self._send(path, payload, timeout)
+        try:
+            return self.resilience.call(lambda: self._send(path, payload, timeout))
+        except CircuitOpenError:
+            raise CRMUnavailable() from None
+
+    def _send(self, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            response = self._client.post(path, json=payload, timeout=timeout or self.timeout)
+        except httpx.HTTPError as e:
+            raise _crm_transport_error(e) from e
+        return _crm_result(response)
+
+    def create_lead(self, name: str, phone: str, city: str, source: str = None, timeout: float = None) -> Dict[str, Any]:
+        payload = {"name": name, "phone": phone, "city": city, "source": source}
+        return self._post("/crm/leads", payload, timeout)
+
+    def schedule_visit(self, lead_id: str, visit_time: str, notes: str = None, timeout: float = None) -> Dict[str, Any]:
+        payload = {"lead_id": lead_id, "visit_time": visit_time, "notes": notes}
+        return self._post("/crm/visits", payload, timeout)
+
+    def update_status(self, lead_id: str, status: str, notes: str = None, timeout: float = None) -> Dict[str, Any]:
+        payload = {"status": status, "notes": notes}
+        return self._post(f"/crm/leads/{lead_id}/status", payload, timeout)
+
+    def bulk(self, method: str, items: List[Dict[str, Any]], timeout: float = None) -> List[Union[Dict[str, Any], CRMError]]:
+        """
+        Send many calls of one method (e.g. "create_lead") as a single bulk
+        request. Returns one outcome per item, in order: its result dict or
+        the CRMError the CRM reported for it.
+        """
+        return _bulk_outcomes(self._post(BULK_PATHS[method], {"items": items}, timeout))
+
+    def close(self) -> None:
+        self._client.close()
+
+
+async def _aclose_stale(client: httpx.AsyncClient) -> None:
+    """Close a client created on an earlier event loop"""
+    try:
+        await client.aclose()
+    except RuntimeError:
+        # Its loop has already closed: the pool is shut, and sockets it could
+        # not close there are released when their transports are collected
+        pass
+
+
+class AsyncHTTPCRMClient:
+    """
+    Non-blocking twin of HTTPCRMClient for the async request path.
+    The pooled httpx.AsyncClient is created on first use inside the running
+    event loop (and recreated if the loop changes, e.g. between test runs).
+    """
+    def __init__(
+        self,
+        base_url: str = None,
+        timeout: float = 5.0,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        resilience: Optional[ResiliencePolicy] = None,
+    ):
+        self.base_url = (base_url or settings.CRM_BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.resilience = resilience
+        self._limits = _limits(max_connections, max_keepalive_connections, keepalive_expiry)
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            stale = self._client
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, timeout=self.timeout, limits=self._limits, transport=self._transport
+            )
+            self._loop = loop
+            if stale is not None:
+                await _aclose_stale(stale)
+        return self._client
+
+    async def _post(self, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        if self.resilience is None:
+            return await self._send(path, payload, timeout)
+        try:
+            return await self.resilience.acall(lambda: self._send(path, payload, timeout))
+        except CircuitOpenError:
+            raise CRMUnavailable() from None
+
+    async def _send(self, path: str, payload: Dict[str, Any], timeout: Optional[float]) -> Dict[str, Any]:
+        client = await self._get_client()
+        try:
+            response = await client.post(path, json=payload, timeout=timeout or self.timeout)
+        except httpx.HTTPError as e:
+            raise _crm_transport_error(e) from e
+        return _crm_result(response)
+
+    async def create_lead(self, name: str, phone: str, city: str, source: str = None, timeout: float = None) -> Dict[str, Any]:
+        payload = {"name": name, "phone": phone, "city": city, "source": source}
+        return await self._post("/crm/leads", payload, timeout)
+
+    async def schedule_visit(self, lead_id: str, visit_time: str, notes: str = None, timeout: float = None) -> Dict[str, Any]:
+        payload = {"lead_id": lead_id, "visit_time": visit_time, "notes": notes}
+        return await self._post("/crm/visits", payload, timeout)
+
+    async def update_status(self, lead_id: str, status: str, notes: str = None, timeout: float = None) -> Dict[str, Any]:
+        payload = {"status": status, "notes": notes}
+        return await self._post(f"/crm/leads/{lead_id}/status", payload, timeout)
+
+    async def bulk(self, method: str, items: List[Dict[str, Any]], timeout: float = None) -> List[Union[Dict[str, Any], CRMError]]:
+        """Async counterpart of HTTPCRMClient.bulk"""
+        return _bulk_outcomes(await self._post(BULK_PATHS[method], {"items": items}, timeout))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def build_http_client(resilience: Optional[ResiliencePolicy] = None) -> HTTPCRMClient:
+    """HTTPCRMClient configured from settings"""
+    return HTTPCRMClient(
+        base_url=settings.CRM_BASE_URL,
+        timeout=settings.CRM_TIMEOUT,
+        max_connections=settings.CRM_POOL_SIZE,
+        max_keepalive_connections=settings.CRM_POOL_KEEPALIVE,
+        resilience=resilience,
+    )
+
+
+def build_async_http_client(resilience: Optional[ResiliencePolicy] = None) -> AsyncHTTPCRMClient:
+    """AsyncHTTPCRMClient configured from settings"""
+    return AsyncHTTPCRMClient(
+        base_url=settings.CRM_BASE_URL,
+        timeout=settings.CRM_TIMEOUT,
+        max_connections=settings.CRM_POOL_SIZE,
+        max_keepalive_connections=settings.CRM_POOL_KEEPALIVE,
+        resilience=resilience,
+    )
@@ -0,0 +1,200 @@
+# bot/gazetteer.py
+import json
+import re
+import sys
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Terminal marker inside a trie node; tokens are never empty
+_END = ""
+
+# Canonical name -> aliases and common misspellings. CITY_GAZETTEER_FILE and
+# SOURCE_GAZETTEER_FILE extend these with the same JSON shape.
+CITIES: Dict[str, List[str]] = {
+    "Agra": [],
+    "Ahmedabad": ["amdavad", "ahmadabad", "ahemdabad"],
+    "Ajmer": [],
+    "Allahabad": ["prayagraj", "prayag raj"],
+    "Amritsar": ["amritser"],
+    "Aurangabad": ["chhatrapati sambhajinagar"],
+    "Bangalore": ["bengaluru", "banglore", "bangaluru", "blr"],
+    "Bhopal": [],
+    "Bhubaneswar": ["bhubaneshwar", "bbsr"],
+    "Chandigarh": ["chandigad", "chd"],
+    "Chennai": ["madras", "chenai"],
+    "Coimbatore": ["kovai", "coimbatur"],
+    "Dehradun": ["dehra dun"],
+    "Delhi": ["dilli", "dehli", "delhi ncr"],
+    "Faridabad": ["faridabaad"],
+    "Ghaziabad": ["gaziabad"],
+    "Goa": ["panaji", "panjim"],
+    "Greater Noida": ["gr noida", "greater noida west", "noida extension"],
+    "Gurgaon": ["gurugram", "gurgoan", "gurgram", "ggn"],
+    "Guwahati": ["gauhati"],
+    "Hyderabad": ["hyd", "hydrabad", "secunderabad"],
+    "Indore": [],
+    "Jaipur": ["jaipure", "pink city"],
+    "Jodhpur": [],
+    "Kanpur": ["cawnpore"],
+    "Kochi": ["cochin", "ernakulam"],
+    "Kolkata": ["calcutta", "kolkatta", "kol"],
+    "Lucknow": ["lko", "lucknaw"],
+    "Ludhiana": [],
+    "Madurai": [],
+    "Mangalore": ["mangaluru"],
+    "Meerut": [],
+    "Mumbai": ["bombay", "mumbay", "bom"],
+    "Mysore": ["mysuru"],
+    "Nagpur": [],
+    "Nashik": ["nasik"],
+    "Navi Mumbai": ["new bombay", "navi mumbay"],
+    "New Delhi": ["new dilli"],
+    "Noida": ["noyda"],
+    "Patna": [],
+    "Pune": ["poona", "puna"],
+    "Raipur": [],
+    "Rajkot": [],
+    "Ranchi": [],
+    "Shimla": ["simla"],
+    "Surat": [],
+    "Thane": ["thana"],
+    "Thiruvananthapuram": ["trivandrum", "tvm"],
+    "Udaipur": [],
+    "Vadodara": ["baroda"],
+    "Varanasi": ["banaras", "benares", "kashi"],
+    "Visakhapatnam": ["vizag", "vishakhapatnam"],
+}
+
+SOURCES: Dict[str, List[str]] = {
+    "99acres": ["99 acres", "ninety nine acres"],
+    "Facebook": ["fb", "face book", "facebook ads", "meta"],
+    "Google Ads": ["google ad", "adwords", "google adwords", "google search"],
+    "Housing.com": ["housing", "housing com"],
+    "Instagram": ["insta", "ig", "instagram ads"],
+    "JustDial": ["just dial", "jd"],
+    "LinkedIn": ["linked in"],
+    "MagicBricks": ["magic bricks", "magicbrick"],
+    "Newspaper": ["newspaper ad", "news paper", "print ad"],
+    "NoBroker": ["no broker"],
+    "Referral": ["reference", "referred", "word of mouth"],
+    "Walk-in": ["walk in", "walkin", "site walk in"],
+    "Website": ["web site", "our website", "web"],
+    "WhatsApp": ["whats app", "whatsapp ad"],
+    "YouTube": ["you tube", "yt"],
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; punctuation and hyphens separate words"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class Gazetteer:
+    """
+    Token trie mapping surface forms (names, aliases, misspellings) to
+    canonical names.
+
+    Built once; `scan` walks the transcript's tokens left to right and at
+    each position follows the trie as far as it goes, keeping the longest
+    entry that ends there, then resumes after it. Matches never overlap and
+    always cover whole words, so "New Delhi" beats "Delhi" and "Delhi" is
+    not found inside "Delhite". Each node is a dict of next token -> child,
+    with the canonical name under the empty-string key; a node with no
+    children is stored as the bare canonical string, which keeps the many
+    one-word entries down to a single dict slot.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        self._root: Dict[str, dict] = {}
+        self.size = 0
+        self.longest = 0
+        for surface, canonical in entries:
+            tokens = tokenize(surface)
+            if not tokens:
+                continue
+            node = self._root
+            for token in tokens[:-1]:
+                child = node.get(token)
+                if child is None:
+                    child = node[sys.intern(token)] = {}
+                elif child.__class__ is str:
+                    child = node[token] = {_END: child}
+                node = child
+            last = tokens[-1]
+            child = node.get(last)
+            if child.__class__ is dict:
+                self.size += _END not in child
+                child[_END] = canonical
+            else:
+                self.size += child is None
+                node[sys.intern(last)] = canonical
+            self.longest = max(self.longest, len(tokens))
+
+    @classmethod
+    def from_mapping(cls, mapping: Mapping[str, Sequence[str]]) -> "Gazetteer":
+        """Build from {canonical: [alias, ...]}; each canonical name matches itself too"""
+        return cls(
+            (surface, canonical)
+            for canonical, aliases in mapping.items()
+            for surface in (canonical, *aliases)
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def scan(self, tokens: Sequence[str]) -> Iterator[Tuple[int, int, str]]:
+        """Yield (start, end, canonical) token spans of leftmost-longest matches"""
+        root = self._root
+        i, n = 0, len(tokens)
+        while i < n:
+            node = root.get(tokens[i])
+            if node is None:
+                i += 1
+                continue
+            if node.__class__ is str:
+                yield i, i + 1, node
+                i += 1
+                continue
+            best_end, best = (i + 1, node[_END]) if _END in node else (0, None)
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                if node.__class__ is str:
+                    best_end, best = j, node
+                    break
+                if _END in node:
+                    best_end, best = j, node[_END]
+            if best is None:
+                i += 1
+            else:
+                yield i, best_end, best
+                i = best_end
+
+    def find_all(self, text: str) -> List[str]:
+        """Canonical names of every match in text, in order"""
+        return [canonical for _, _, canonical in self.scan(tokenize(text))]
+
+    def find(self, text: str, cues: Sequence[str] = ()) -> Optional[str]:
+        """
+        The first match right after one of the cue words ("from", "source"),
+        else None when cues are given; without cues, the first match anywhere.
+        """
+        tokens = tokenize(text)
+        for start, _, canonical in self.scan(tokens):
+            if not cues or (start and tokens[start - 1] in cues):
+                return canonical
+        return None
+
+
+def load_gazetteer(defaults: Mapping[str, Sequence[str]], path: Optional[str] = None) -> Gazetteer:
+    """The built-in entries, extended by a JSON file of {canonical: [alias, ...]} if given"""
+    mapping: Dict[str, List[str]] = {canonical: list(aliases) for canonical, aliases in defaults.items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for canonical, aliases in json.load(f).items():
+                mapping.setdefault(canonical, []).extend(aliases)
+    return Gazetteer.from_mapping(mapping)
@@ -0,0 +1,145 @@
+# bot/idempotency.py
+import asyncio
+import hashlib
+import json
+import zlib
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .cache import TTLCache
+from .shared_state import SharedState
+
+Outcome = Tuple[int, Dict[str, Any]]
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request body."""
+
+
+class IdempotencyUnavailable(Exception):
+    """Another worker ran the request but its outcome cannot be replayed here."""
+
+    def __init__(self, details: str):
+        super().__init__(details)
+        self.details = details
+
+
+def fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remembers the outcome of recent requests by idempotency key.
+
+    The first request with a key runs; duplicates that arrive while it is in
+    flight wait for its outcome, and later ones get the stored outcome, so
+    the CRM is called once. Only successful (2xx) outcomes are kept, for up
+    to `ttl` seconds and at most `max_keys` keys (least recently used keys
+    go first); after a failure the next retry runs again. Must be used from
+    a single event loop.
+
+    With a `shared` state the key is also claimed across workers: a
+    duplicate that reaches another worker waits for the claim's owner
+    (polling every `poll_interval` s, for at most `claim_ttl` s) and replays
+    the outcome it published. Outcomes are stored compressed; one too large
+    for a shared value cannot be replayed elsewhere, and a claim whose owner
+    died lapses after `claim_ttl`.
+    """
+
+    def __init__(self, max_keys: int, ttl: float, shared: Optional[SharedState] = None,
+                 claim_ttl: float = 60, poll_interval: float = 0.02):
+        self.completed = TTLCache(max_keys, ttl)
+        self._in_flight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.replays = 0
+        self.shared = shared
+        self.claim_ttl = claim_ttl
+        self.poll_interval = poll_interval
+
+    async def run(self, key: str, request_fingerprint: str, produce: Callable[[], Awaitable[Outcome]]) -> Tuple[Outcome, bool]:
+        """Return (outcome, replayed). Raises IdempotencyConflict on key reuse with another body."""
+        stored = self.completed.get(key)
+        if stored is not None:
+            return self._replay(stored[0], request_fingerprint, stored[1])
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            # shield: a cancelled duplicate must not cancel the original
+            return self._replay(in_flight[0], request_fingerprint, await asyncio.shield(in_flight[1]))
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = (request_fingerprint, future)
+        claimed = False
+        try:
+            elsewhere = await self._claim_shared(key, request_fingerprint) if self.shared is not None else None
+            claimed = self.shared is not None and elsewhere is None
+            outcome = elsewhere if elsewhere is not None else await produce()
+        except BaseException as e:
+            if claimed:
+                self.shared.delete(_shared_key(key))
+            future.set_exception(e)
+            future.exception()  # waiters re-raise it; don't log it as unretrieved
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        if 200 <= outcome[0] < 300:
+            self.completed.put(key, (request_fingerprint, outcome))
+            if claimed:
+                self._publish(key, request_fingerprint, outcome)
+        elif claimed:
+            # Failures are not remembered; a retry may run on any worker
+            self.shared.delete(_shared_key(key))
+        future.set_result(outcome)
+        if elsewhere is not None:
+            self.replays += 1
+        return outcome, elsewhere is not None
+
+    async def _claim_shared(self, key: str, request_fingerprint: str) -> Optional[Outcome]:
+        """None once this worker holds the key's claim, else the outcome another worker published"""
+        shared_key = _shared_key(key)
+        digest = bytes.fromhex(request_fingerprint)
+        waited = 0.0
+        while True:
+            if self.shared.add(shared_key, _PENDING + digest, self.claim_ttl):
+                return None
+            value = self.shared.get(shared_key)
+            if value is None:
+                continue  # released or lapsed meanwhile: try to claim it again
+            if value[1:33] != digest:
+                raise IdempotencyConflict()
+            if value[:1] == _DONE:
+                status_code, body = json.loads(zlib.decompress(value[33:]))
+                return status_code, body
+            if value[:1] == _TOO_LARGE:
+                raise IdempotencyUnavailable("The request was handled by another worker; its response is too large to replay")
+            if waited >= self.claim_ttl:
+                raise IdempotencyUnavailable("The request is still in progress on another worker")
+            await asyncio.sleep(self.poll_interval)
+            waited += self.poll_interval
+
+    def _publish(self, key: str, request_fingerprint: str, outcome: Outcome) -> None:
+        digest = bytes.fromhex(request_fingerprint)
+        payload = zlib.compress(json.dumps(outcome, separators=(",", ":")).encode("utf-8"), 1)
+        value = _DONE + digest + payload
+        if len(value) > self.shared.value_bytes:
+            value = _TOO_LARGE + digest
+        self.shared.set(_shared_key(key), value, self.completed.ttl)
+
+    def _replay(self, stored_fingerprint: str, request_fingerprint: str, outcome: Outcome) -> Tuple[Outcome, bool]:
+        if stored_fingerprint != request_fingerprint:
+            raise IdempotencyConflict()
+        self.replays += 1
+        return outcome, True
+
+    def stats(self) -> Dict[str, int]:
+        return {**self.completed.stats(), "in_flight": len(self._in_flight), "replays": self.replays}
+
+
+# Shared values: a one-byte state, the request fingerprint, then the compressed outcome
+_PENDING = b"P"
+_DONE = b"D"
+_TOO_LARGE = b"L"
+
+
+def _shared_key(key: str) -> str:
+    return "idem:" + key
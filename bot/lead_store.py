@@ -0,0 +1,208 @@
+# bot/lead_store.py
+import itertools
+import re
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+LEAD_FIELDS = ("lead_id", "name", "phone", "city", "source", "status", "notes", "visit_time")
+
+
+class LeadRecord:
+    """
+    One stored lead. Records are owned by their LeadStore: read them freely,
+    but change them through `LeadStore.update` so the indexes stay in sync.
+    Item access (`record["status"]`) is kept for code written against the
+    old dict records.
+    """
+    __slots__ = LEAD_FIELDS
+
+    def __init__(self, lead_id: str, name: Optional[str], phone: Optional[str], city: Optional[str] = None,
+                 source: Optional[str] = None, status: str = "NEW", notes: Optional[str] = None,
+                 visit_time: Optional[str] = None):
+        self.lead_id = lead_id
+        self.name = name
+        self.phone = phone
+        self.city = city
+        self.source = source
+        self.status = status
+        self.notes = notes
+        self.visit_time = visit_time
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in LEAD_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        value = getattr(self, field, None) if field in LEAD_FIELDS else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in LEAD_FIELDS}
+
+    def __repr__(self) -> str:
+        return f"LeadRecord({self.lead_id!r}, status={self.status!r})"
+
+
+_NON_DIGITS_RE = re.compile(r"\D")
+
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    if not phone:
+        return None
+    # Already-clean phones are used as-is, so the index shares the record's string
+    return (phone if phone.isdigit() else _NON_DIGITS_RE.sub("", phone)) or None
+
+
+def city_key(city: Optional[str]) -> Optional[str]:
+    return " ".join(city.split()).casefold() if city else None
+
+
+def status_key(status: Optional[str]) -> Optional[str]:
+    # "In Progress", "in-progress" and "IN_PROGRESS" are one status
+    return "_".join(status.replace("-", " ").split()).upper() if status else None
+
+
+class LeadStore:
+    """
+    In-memory lead table with secondary indexes on phone (digits only), city
+    (case-insensitive) and status, so lookups and filters cost O(matches)
+    rather than a scan. All methods are safe to call from several threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records: Dict[str, LeadRecord] = {}
+        # Phones are nearly unique, so a phone maps straight to its lead_id
+        # and only becomes a list when shared. City and status map to
+        # insertion-ordered dicts used as sets, so results come back oldest
+        # first.
+        self._by_phone: Dict[str, Union[str, List[str]]] = {}
+        self._by_city: Dict[str, Dict[str, None]] = {}
+        self._by_status: Dict[str, Dict[str, None]] = {}
+
+    # ------------------------------
+    # Writes
+    # ------------------------------
+    def add(self, name: Optional[str], phone: Optional[str], city: Optional[str] = None, source: Optional[str] = None,
+            status: str = "NEW", lead_id: Optional[str] = None, **extra: Any) -> LeadRecord:
+        record = LeadRecord(lead_id or str(uuid.uuid4()), name, phone, city, source, status, **extra)
+        with self._lock:
+            previous = self._records.get(record.lead_id)
+            if previous is not None:
+                self._unindex(previous)
+            self._records[record.lead_id] = record
+            self._index(record)
+        return record
+
+    def update(self, lead_id: str, **fields: Any) -> LeadRecord:
+        """Set fields on a lead and re-index it; raises KeyError for unknown leads"""
+        unknown = set(fields) - set(LEAD_FIELDS[1:])
+        if unknown:
+            raise TypeError(f"Unknown lead fields: {', '.join(sorted(unknown))}")
+        with self._lock:
+            record = self._records[lead_id]
+            self._unindex(record)
+            for field, value in fields.items():
+                setattr(record, field, value)
+            self._index(record)
+        return record
+
+    def remove(self, lead_id: str) -> Optional[LeadRecord]:
+        with self._lock:
+            record = self._records.pop(lead_id, None)
+            if record is not None:
+                self._unindex(record)
+        return record
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._by_phone.clear()
+            self._by_city.clear()
+            self._by_status.clear()
+
+    # ------------------------------
+    # Reads
+    # ------------------------------
+    def get(self, lead_id: str) -> Optional[LeadRecord]:
+        return self._records.get(lead_id)
+
+    def __getitem__(self, lead_id: str) -> LeadRecord:
+        return self._records[lead_id]
+
+    def __contains__(self, lead_id: object) -> bool:
+        return lead_id in self._records
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def find_by_phone(self, phone: str) -> List[LeadRecord]:
+        return self.find(phone=phone)
+
+    def find_by_city(self, city: str) -> List[LeadRecord]:
+        return self.find(city=city)
+
+    def find_by_status(self, status: str) -> List[LeadRecord]:
+        return self.find(status=status)
+
+    def find(self, phone: Optional[str] = None, city: Optional[str] = None, status: Optional[str] = None,
+             limit: Optional[int] = None) -> List[LeadRecord]:
+        """Leads matching every given filter, intersecting the smallest index first"""
+        with self._lock:
+            candidates: List[Iterable[str]] = []
+            if phone is not None:
+                ids = self._by_phone.get(phone_key(phone), ())
+                candidates.append((ids,) if isinstance(ids, str) else ids)
+            if city is not None:
+                candidates.append(self._by_city.get(city_key(city), ()))
+            if status is not None:
+                candidates.append(self._by_status.get(status_key(status), ()))
+            if not candidates:
+                ids: Iterable[str] = self._records
+            else:
+                candidates.sort(key=len)
+                ids = candidates[0]
+                for other in candidates[1:]:
+                    # filter() keeps the membership test loop in C
+                    ids = filter((set(other) if isinstance(other, (list, tuple)) else other).__contains__, ids)
+            if limit is not None:
+                ids = itertools.islice(ids, max(0, limit))
+            return list(map(self._records.__getitem__, ids))
+
+    # ------------------------------
+    # Index maintenance (caller holds the lock)
+    # ------------------------------
+    def _index(self, record: LeadRecord) -> None:
+        key = phone_key(record.phone)
+        if key:
+            ids = self._by_phone.get(key)
+            if ids is None:
+                self._by_phone[key] = record.lead_id
+            elif isinstance(ids, str):
+                self._by_phone[key] = [ids, record.lead_id]
+            else:
+                ids.append(record.lead_id)
+        key = city_key(record.city)
+        if key:
+            self._by_city.setdefault(key, {})[record.lead_id] = None
+        key = status_key(record.status)
+        if key:
+            self._by_status.setdefault(key, {})[record.lead_id] = None
+
+    def _unindex(self, record: LeadRecord) -> None:
+        key = phone_key(record.phone)
+        if key:
+            ids = self._by_phone[key]
+            if isinstance(ids, str):
+                del self._by_phone[key]
+            else:
+                ids.remove(record.lead_id)
+                if len(ids) == 1:
+                    self._by_phone[key] = ids[0]
+        for index, key in ((self._by_city, city_key(record.city)), (self._by_status, status_key(record.status))):
+            if key:
+                index[key].pop(record.lead_id, None)
+                if not index[key]:
+                    del index[key]
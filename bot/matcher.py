@@ -0,0 +1,79 @@
+# bot/matcher.py
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Set, Tuple
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick multi-pattern matcher.
+
+    Built once from (phrase, label) pairs; a single pass over the text reports
+    every phrase occurring in it, so the cost of a scan depends on the text
+    length and not on the number of phrases. Matching is plain substring
+    matching, like `phrase in text`; callers pass already-lowered text.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, str]]):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[Tuple[str, str]]] = [set()]
+
+        for phrase, label in phrases:
+            if not phrase:
+                continue
+            state = 0
+            for ch in phrase:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add((phrase, label))
+
+        # Breadth-first pass: resolve failure links and fold them into a
+        # deterministic transition table so scanning never backtracks. Each
+        # state keeps only transitions that differ from the root's; anything
+        # else falls back to a root lookup.
+        root = goto[0]
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [{}] + [None] * (len(goto) - 1)
+        queue = deque(root.values())
+        while queue:
+            state = queue.popleft()
+            inherited = delta[fail[state]]
+            outputs[state] |= outputs[fail[state]]
+            transitions = dict(inherited)
+            for ch, nxt in goto[state].items():
+                fail[nxt] = inherited.get(ch) or root.get(ch, 0)
+                transitions[ch] = nxt
+                queue.append(nxt)
+            delta[state] = transitions
+
+        self._root = root
+        self._delta = delta
+        self._outputs: List[Tuple[Tuple[str, str], ...]] = [tuple(sorted(out)) for out in outputs]
+        self._labels: List[FrozenSet[str]] = [frozenset(label for _, label in out) for out in self._outputs]
+        self.size = len(goto)
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str, str]]:
+        """Yield (end_index, phrase, label) for every occurrence, overlaps included."""
+        delta, root = self._delta, self._root
+        outputs = self._outputs
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch) or root.get(ch, 0)
+            for phrase, label in outputs[state]:
+                yield i + 1, phrase, label
+
+    def find_labels(self, text: str) -> Set[str]:
+        """Return the labels of every phrase found in text."""
+        delta, root = self._delta, self._root
+        labels_at = self._labels
+        found: Set[str] = set()
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch) or root.get(ch, 0)
+            if labels_at[state]:
+                found |= labels_at[state]
+        return found
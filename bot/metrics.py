@@ -0,0 +1,276 @@
+# bot/metrics.py
+import threading
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from sub-100µs regex stages up to slow CRM calls
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+class _Metric:
+    """
+    Base for metrics recorded without a shared lock. Each thread writes to
+    its own shard (a dict of label values -> cells), so recording is a
+    thread-local lookup plus a list update; only a thread's first record
+    takes the lock, to register its shard. Scrapes sum the shards.
+    """
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[Dict[Tuple[str, ...], list]] = []
+        self._children: Dict[Tuple[str, ...], "_Child"] = {}
+
+    def _shard(self) -> Dict[Tuple[str, ...], list]:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _cells(self, labels: Tuple[str, ...]) -> list:
+        """This thread's cells for a label set, created on first use"""
+        shard = self._shard()
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = self._new_cells()
+        return cells
+
+    def _new_cells(self) -> list:
+        raise NotImplementedError
+
+    def _merged(self) -> Dict[Tuple[str, ...], list]:
+        with self._lock:
+            shards = list(self._shards)
+        merged: Dict[Tuple[str, ...], list] = {}
+        for shard in shards:
+            for labels, cells in list(shard.items()):
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(cells)
+                else:
+                    for i, value in enumerate(cells):
+                        total[i] += value
+        return merged
+
+    def _label_text(self, labels: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, labels)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, cells in sorted(self._merged().items()):
+            lines.extend(self._samples(labels, cells))
+        return lines
+
+    def _samples(self, labels: Tuple[str, ...], cells: list) -> Iterable[str]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        # Reset in place: bound children keep references to their cells
+        with self._lock:
+            for shard in self._shards:
+                for cells in shard.values():
+                    cells[:] = self._new_cells()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._cells(labels)[0] += amount
+
+    def labels(self, *labels: str) -> "_CounterChild":
+        """Counter bound to fixed label values, skipping the per-call label lookup"""
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children.setdefault(labels, _CounterChild(self, labels))
+        return child
+
+    def _new_cells(self) -> list:
+        return [0]
+
+    def value(self, *labels: str) -> float:
+        return self._merged().get(labels, [0])[0]
+
+    def _samples(self, labels, cells):
+        yield f"{self.name}{self._label_text(labels)} {_number(cells[0])}"
+
+
+class Gauge(_Metric):
+    """
+    Value that is set rather than accumulated. Sets are rare (e.g. state
+    changes), so every thread writes one shared shard under the lock.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._shards.append(self._values)
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            cells = self._values.get(labels)
+            if cells is None:
+                self._values[labels] = [value]
+            else:
+                cells[0] = value
+
+    def _new_cells(self) -> list:
+        return [0]
+
+    def value(self, *labels: str) -> float:
+        return self._merged().get(labels, [0])[0]
+
+    def _samples(self, labels, cells):
+        yield f"{self.name}{self._label_text(labels)} {_number(cells[0])}"
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; cells are per-bucket counts followed by the running sum."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str) -> None:
+        cells = self._cells(labels)
+        cells[bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def labels(self, *labels: str) -> "_HistogramChild":
+        """Histogram bound to fixed label values, skipping the per-call label lookup"""
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children.setdefault(labels, _HistogramChild(self, labels))
+        return child
+
+    def _new_cells(self) -> list:
+        # One slot per bucket, one for +Inf, then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def count(self, *labels: str) -> int:
+        cells = self._merged().get(labels)
+        return sum(cells[:-1]) if cells else 0
+
+    def _samples(self, labels, cells):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), cells):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else _number(bound)
+            bucket_labels = self._label_text(labels, 'le="%s"' % le)
+            yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+        yield f"{self.name}_sum{self._label_text(labels)} {_number(cells[-1])}"
+        yield f"{self.name}_count{self._label_text(labels)} {cumulative}"
+
+
+class _Child:
+    __slots__ = ("_metric", "_labels", "_local")
+
+    def __init__(self, metric: _Metric, labels: Tuple[str, ...]):
+        self._metric = metric
+        self._labels = labels
+        self._local = threading.local()
+
+    def _cells(self) -> list:
+        cells = self._local.cells = self._metric._cells(self._labels)
+        return cells
+
+
+class _CounterChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount: float = 1) -> None:
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self._cells()
+        cells[0] += amount
+
+
+class _HistogramChild(_Child):
+    __slots__ = ("_bounds",)
+
+    def __init__(self, metric: "Histogram", labels: Tuple[str, ...]):
+        super().__init__(metric, labels)
+        self._bounds = metric.buckets
+
+    def observe(self, value: float) -> None:
+        try:
+            cells = self._local.cells
+        except AttributeError:
+            cells = self._cells()
+        cells[bisect_left(self._bounds, value)] += 1
+        cells[-1] += value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        for metric in self._metrics:
+            metric.clear()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "bot_requests_total", "Transcripts handled, by classified intent", ["intent"]))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "bot_stage_seconds",
+    "Time per processing stage: intent, entities (includes datetime), datetime, crm", ["stage"]))
+CRM_RESPONSES = REGISTRY.register(Counter(
+    "bot_crm_responses_total", "CRM calls by method and HTTP status code", ["method", "status"]))
+BUDGET_EXCEEDED = REGISTRY.register(Counter(
+    "bot_nlu_budget_exceeded_total", "Transcripts whose NLU ran past NLU_TIME_BUDGET_MS and skipped slow stages"))
+BREAKER_STATE = REGISTRY.register(Gauge(
+    "bot_crm_breaker_state", "CRM circuit breaker state: 1 for the current state, 0 for the others", ["state"]))
+BREAKER_OPENED = REGISTRY.register(Counter(
+    "bot_crm_breaker_opened_total", "Times the CRM circuit breaker opened"))
+BREAKER_REJECTED = REGISTRY.register(Counter(
+    "bot_crm_breaker_rejected_total", "CRM calls refused while the circuit breaker was open"))
+RETRIES = REGISTRY.register(Counter(
+    "bot_crm_retries_total", "CRM calls retried within the retry budget"))
+RETRY_BUDGET_EXHAUSTED = REGISTRY.register(Counter(
+    "bot_crm_retry_budget_exhausted_total", "CRM retries skipped because the retry budget was spent"))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "bot_batch_size", "Items per batch: request transcripts, CRM bulk calls, outbox drains", ["kind"],
+    buckets=SIZE_BUCKETS))
+
+# Bound once: the hot path records without a label lookup
+INTENT_SECONDS = STAGE_SECONDS.labels("intent")
+ENTITIES_SECONDS = STAGE_SECONDS.labels("entities")
+DATETIME_SECONDS = STAGE_SECONDS.labels("datetime")
+CRM_SECONDS = STAGE_SECONDS.labels("crm")
@@ -2,137 +2,427 @@
 import re
 import json
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timezone
-try:
-    import dateparser
-except ImportError:
-    dateparser = None
+import time
+from typing import Dict, Any, Callable, List, Optional, Tuple, Union
+from datetime import date, datetime, timezone
+
+from . import analytics, timeparse, tracing
+from .cache import TTLCache
+from .gazetteer import CITIES, SOURCES, load_gazetteer
+from .matcher import KeywordAutomaton
+from .metrics import BUDGET_EXCEEDED, DATETIME_SECONDS
+from .settings import settings
+from .timeparse import CLOCK_RELATIVE_RE, ISO_RE, normalize_phrase, resolve_time
 
 logger = logging.getLogger("bot_nlu")
 
-UUID_RE = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+VALID_STATUSES = {"NEW", "IN_PROGRESS", "FOLLOW_UP", "WON", "LOST"}
 
-PHONE_RE = re.compile(r"(?:\+91|0)?[\s-]*([6-9]\d[\d\s-]{8,})")
+ANALYTICS_FILE = settings.ANALYTICS_FILE
 
-VALID_STATUSES = {"NEW", "IN_PROGRESS", "FOLLOW_UP", "WON", "LOST"}
+ENTITY_KEYS = ("name", "phone", "city", "source", "lead_id", "visit_time", "notes", "status")
 
-ANALYTICS_FILE = "bot_analytics.jsonl"
+# Default intent trigger phrases, in priority order: the first intent that
+# matches is the primary one. INTENT_PHRASES_FILE can extend this table.
+INTENT_KEYWORDS = [
+    ("VISIT_SCHEDULE", ["schedule a visit", "schedule visit", "fix a site visit", "fix a visit", "site visit"]),
+    ("LEAD_UPDATE", ["update lead", "mark lead", "set lead", "change lead", "mark as won"]),
+    ("LEAD_CREATE", ["add a new lead", "add lead", "create lead", "new lead"]),
+]
+
+KEYWORD_CONFIDENCE = 0.95
+FALLBACK_CONFIDENCE = 0.7
+UNKNOWN_CONFIDENCE = 0.5
+
+# Entity patterns are compiled once at import. Each list is tried in order and
+# the first hit wins.
+#
+# re backtracks, so every pattern must stay linear in the transcript: an
+# unbounded repeat may only be followed by something that cannot fail, or
+# be bounded. A lazy name capture with an unbounded repeat rescans the rest
+# of the transcript at every "lead", which is quadratic in a transcript
+# that repeats the word. tests/test_redos.py times every pattern against
+# worst-case inputs. Transcript collapses whitespace runs, so the separators
+# before a name match a character or two and need no possessive quantifier
+# (which would also need Python 3.11).
+NAME_MAX_LEN = 60
+NAME_PATTERNS = [
+    re.compile(r'(?:lead[:\s]+)([A-Za-z\s]{1,%d}?)(?:\s+from|\s+phone|\s+,|\s+contact|$)' % NAME_MAX_LEN,
+               re.IGNORECASE),
+    re.compile(r'(?:name\s+)([A-Za-z\s]{1,%d}?)(?:\s+from|\s+phone|\s+,|\s+contact|$)' % NAME_MAX_LEN,
+               re.IGNORECASE),
+]
+
+PHONE_PATTERNS = [
+    re.compile(r'(?:phone|contact)[:\s]*([0-9\s\-+]+)', re.IGNORECASE),
+    re.compile(r'(\d{2}\s*\d{3}\s*\d{2}\s*\d{3})'),  # 98 765 43 210
+    re.compile(r'(\d{5}\-\d{5})'),  # 91234-56789
+    re.compile(r'(\d{10})'),  # 9876543210
+]
+PHONE_STRIP_RE = re.compile(r'[\s\-+]')
+
+CITY_PATTERNS = [
+    re.compile(r'from\s+([A-Za-z]+)', re.IGNORECASE),
+    re.compile(r'city\s+([A-Za-z]+)', re.IGNORECASE),
+]
+SOURCE_RE = re.compile(r'source\s+([A-Za-z]+)', re.IGNORECASE)
+
+# Known cities and lead sources with their aliases, normalized to canonical names
+CITY_GAZETTEER = load_gazetteer(CITIES, settings.CITY_GAZETTEER_FILE)
+SOURCE_GAZETTEER = load_gazetteer(SOURCES, settings.SOURCE_GAZETTEER_FILE)
+CITY_CUES = ("from", "in", "city")
+SOURCE_CUES = ("source", "via", "through")
+
+# A shortened 8-char id is also matched by the `{8,}` form, so one pattern
+# covers both full UUIDs and short ids.
+LEAD_ID_RE = re.compile(r'lead\s+([a-f0-9\-]{8,})', re.IGNORECASE)
+
+# Checked in priority order against the lowered transcript
+STATUS_KEYWORDS = [
+    (("in progress", "in_progress"), "IN_PROGRESS"),
+    (("won",), "WON"),
+    (("lost",), "LOST"),
+    (("follow_up", "follow up"), "FOLLOW_UP"),
+    (("new",), "NEW"),
+]
+
+NOTES_RE = re.compile(r'notes[:\s]+(.+)', re.IGNORECASE)
+VISIT_TIME_RE = re.compile(r'at\s+(.+?)(?:\s+notes|$)', re.IGNORECASE)
+
+
+def load_intent_keywords(path: Optional[str] = None) -> List[Tuple[str, List[str]]]:
+    """
+    Return the intent phrase table, extended by a JSON file of
+    {"INTENT": ["phrase", ...]} if given. New intents rank after the defaults,
+    in file order.
+    """
+    table = [(intent, list(phrases)) for intent, phrases in INTENT_KEYWORDS]
+    if path:
+        with open(path, encoding="utf-8") as f:
+            extra = json.load(f)
+        known = {intent: phrases for intent, phrases in table}
+        for intent, phrases in extra.items():
+            if intent in known:
+                known[intent].extend(phrases)
+            else:
+                known[intent] = list(phrases)
+                table.append((intent, known[intent]))
+    return table
+
+
+# (intent, confidence, entities) per normalized transcript; see analyze_cached
+RESULTS_CACHE = TTLCache(settings.NLU_CACHE_SIZE, settings.NLU_CACHE_TTL)
+
+
+def configure_intents(table: List[Tuple[str, List[str]]]) -> None:
+    """Rebuild the intent matcher from a phrase table"""
+    global INTENT_PRIORITY, INTENT_MATCHER
+    INTENT_PRIORITY = [intent for intent, _ in table]
+    INTENT_MATCHER = KeywordAutomaton(
+        (phrase.lower(), intent) for intent, phrases in table for phrase in phrases
+    )
+    # Cached results were classified with the old table
+    RESULTS_CACHE.clear()
+
+
+configure_intents(load_intent_keywords(settings.INTENT_PHRASES_FILE))
+
+# Optional statistical classifier for transcripts the keyword rules miss
+INTENT_MODEL = None
+
+
+def configure_model(model) -> None:
+    """Use `model` (a classifier.IntentModel, or None) for keyword misses"""
+    global INTENT_MODEL
+    INTENT_MODEL = model
+    RESULTS_CACHE.clear()
+
+
+if settings.INTENT_MODEL_FILE:
+    from .classifier import IntentModel  # needs NumPy
+    configure_model(IntentModel.load(settings.INTENT_MODEL_FILE))
+
+
+class Transcript:
+    """
+    A transcript normalized once and shared by every NLU stage.
+    Intent and per-intent entity results are memoized on the instance so the
+    classifier and the extractor never repeat each other's work.
+
+    `deadline` (a perf_counter time, None for no limit) is the NLU time
+    budget; optional slow stages check `over_budget()` and are skipped once
+    it has passed, which marks the results `degraded`.
+    """
+    __slots__ = ("raw", "text", "lower", "deadline", "degraded", "_intents", "_entities")
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self.text = " ".join(raw.split())
+        self.lower = self.text.lower()
+        self.deadline: Optional[float] = None
+        self.degraded = False
+        self._intents: Optional[List[Dict[str, Any]]] = None
+        self._entities: Dict[str, Dict[str, Any]] = {}
+
+    def start_budget(self, seconds: float) -> None:
+        """Allow NLU `seconds` from now (0 or less: no limit)"""
+        self.deadline = time.perf_counter() + seconds if seconds > 0 else None
+
+    def over_budget(self) -> bool:
+        """True once the deadline has passed; counts and marks the transcript degraded"""
+        if self.deadline is None or time.perf_counter() < self.deadline:
+            return False
+        if not self.degraded:
+            self.degraded = True
+            BUDGET_EXCEEDED.inc()
+        return True
+
+
+def prepare(transcript: Union[str, Transcript]) -> Transcript:
+    if isinstance(transcript, Transcript):
+        return transcript
+    return Transcript(transcript or "")
 
-def normalize_phone(raw: str) -> Optional[str]:
-    if not raw:
-        return None
-    digits = re.sub(r"\D", "", raw)
-    if len(digits) >= 10:
-        return digits[-10:]
-    return None
 
-def parse_datetime(text: str) -> Optional[str]:
-    if dateparser:
-        dt = dateparser.parse(text, settings={"RETURN_AS_TIMEZONE_AWARE": True, "PREFER_DATES_FROM": "future"})
-        if dt:
-            return dt.isoformat()
-    iso = re.search(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:[+-]\d{2}:\d{2})?", text)
+def parse_datetime(text: str, reference: Optional[datetime] = None) -> Optional[str]:
+    iso = ISO_RE.search(text)
     if iso:
-        return iso.group(0)
+        return resolve_time(iso.group(0), reference)
+    return resolve_time(text, reference)
+
+
+# ------------------------------
+# Entity extraction
+# ------------------------------
+def _first_group(patterns, text: str) -> Optional[str]:
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
     return None
 
-def extract_entities(transcript: str) -> Dict[str, Any]:
-    t = transcript.strip()
-    entities = {
-        "name": None, "phone": None, "city": None, "source": None,
-        "lead_id": None, "visit_time": None, "notes": None, "status": None
-    }
 
-    phone_match = PHONE_RE.search(t)
-    if phone_match:
-        entities["phone"] = normalize_phone(phone_match.group(0))
+def _extract_lead_create(doc: Transcript, entities: Dict[str, Any]) -> None:
+    # Name - handle both "lead: Name" and "lead Name" patterns
+    name = _first_group(NAME_PATTERNS, doc.text)
+    if name is not None:
+        entities["name"] = name.strip()
 
-    uid = UUID_RE.search(t)
-    if uid:
-        entities["lead_id"] = uid.group(0)
+    # Phone - handle multiple formats, then clean spaces/dashes
+    phone = _first_group(PHONE_PATTERNS, doc.text)
+    if phone is not None:
+        entities["phone"] = PHONE_STRIP_RE.sub('', phone)
 
-    m = re.search(r"source\s+([A-Za-z0-9\s]+)", t, re.IGNORECASE)
-    if m: entities["source"] = m.group(1).strip().strip(".,")
+    # City: a known city right after "from"/"in"/"city", else the word after
+    # "from"/"city". Never an uncued match: names like "Kashi" are city aliases too
+    entities["city"] = CITY_GAZETTEER.find(doc.text, CITY_CUES) or _first_group(CITY_PATTERNS, doc.text)
 
-    m = re.search(r"(?:from|in)\s+([A-Za-z\s]+?)(?:,| phone| contact|$|\.)", t, re.IGNORECASE)
-    if m: entities["city"] = m.group(1).strip()
+    # Source: a known source after "source"/"via"/"through", else the word after "source"
+    source = SOURCE_GAZETTEER.find(doc.text, SOURCE_CUES)
+    if source is None:
+        source_match = SOURCE_RE.search(doc.text)
+        source = source_match.group(1) if source_match else None
+    if source is not None:
+        entities["source"] = source
 
-    m = re.search(r"(?:lead[:]?|name[:]?|add a new lead[:]?|create lead[:]?)[\s\-]*([A-Za-z\s]{2,60}?)(?:from|,| phone| contact|$|\.)", t, re.IGNORECASE)
-    if m:
-        candidate = re.sub(r"^(a new|new)\s+", "", m.group(1).strip(), flags=re.IGNORECASE)
-        entities["name"] = candidate
 
-    if not entities["name"]:
-        m = re.search(r"name\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)", t)
-        if m: entities["name"] = m.group(1).strip()
+def _extract_lead_update(doc: Transcript, entities: Dict[str, Any]) -> None:
+    lead_id_match = LEAD_ID_RE.search(doc.text)
+    if lead_id_match:
+        entities["lead_id"] = lead_id_match.group(1)
 
-    for s in VALID_STATUSES:
-        if re.search(r"\b" + s.replace("_", " ") + r"\b", t, re.IGNORECASE) or re.search(r"\b" + s + r"\b", t, re.IGNORECASE):
-            entities["status"] = s
+    for keywords, status in STATUS_KEYWORDS:
+        if any(keyword in doc.lower for keyword in keywords):
+            entities["status"] = status
             break
 
-    vt = parse_datetime(t)
-    if vt:
-        entities["visit_time"] = vt
+    notes_match = NOTES_RE.search(doc.text)
+    if notes_match:
+        entities["notes"] = notes_match.group(1).strip()
+
+
+def _extract_visit_schedule(doc: Transcript, entities: Dict[str, Any]) -> None:
+    lead_id_match = LEAD_ID_RE.search(doc.text)
+    if lead_id_match:
+        entities["lead_id"] = lead_id_match.group(1)
 
-    m = re.search(r"notes?\s*[:\-]\s*(.+)$", t, re.IGNORECASE)
-    if m:
-        entities["notes"] = m.group(1).strip()
+    # Visit time - cheap grammar first, dateparser only as a fallback
+    time_match = VISIT_TIME_RE.search(doc.text)
+    if time_match:
+        time_str = time_match.group(1).strip()
+        # Keep the original phrase if it cannot be resolved; past the time
+        # budget only the grammar runs, never dateparser
+        started = time.perf_counter()
+        entities["visit_time"] = resolve_time(time_str, fallback=not doc.over_budget()) or time_str
+        resolved = time.perf_counter() - started
+        DATETIME_SECONDS.observe(resolved)
+        tracing.record("datetime", resolved)
 
+
+ENTITY_EXTRACTORS = {
+    "LEAD_CREATE": _extract_lead_create,
+    "LEAD_UPDATE": _extract_lead_update,
+    "VISIT_SCHEDULE": _extract_visit_schedule,
+}
+
+
+def _entities_for(doc: Transcript, intent: str) -> Dict[str, Any]:
+    entities = doc._entities.get(intent)
+    if entities is None:
+        entities = dict.fromkeys(ENTITY_KEYS)
+        extractor = ENTITY_EXTRACTORS.get(intent)
+        if extractor is not None:
+            extractor(doc, entities)
+        doc._entities[intent] = entities
     return entities
 
-def classify_intent(transcript: str) -> List[Dict[str, Any]]:
+
+def extract_entities(transcript: Union[str, Transcript], intent: Optional[str] = None) -> Dict[str, Any]:
+    """Extract entities for the given intent (defaults to the primary intent)"""
+    doc = prepare(transcript)
+    if intent is None:
+        intent = detect_intents(doc)[0]["intent"]
+    return dict(_entities_for(doc, intent))
+
+
+# ------------------------------
+# Intent classification
+# ------------------------------
+def detect_intents(transcript: Union[str, Transcript]) -> List[Dict[str, Any]]:
     """
-    Returns a list of detected intents with optional confidence scores.
+    Returns every detected intent with its confidence, primary intent first.
     """
-    t = transcript.lower()
-    intents = []
-
-    # Simple confidence scoring heuristics
-    def score(keyword_list):
-        return max([1.0 if k in t else 0.0 for k in keyword_list])
+    doc = prepare(transcript)
+    if doc._intents is not None:
+        return doc._intents
 
-    lead_keywords = ["create lead", "add a new lead", "add lead", "new lead"]
-    visit_keywords = ["schedule", "site visit", "schedule a visit", "fix a site visit"]
-    update_keywords = ["update lead", "mark lead", "set lead", "change lead", "mark as won"]
+    # One pass over the lowered text finds every trigger phrase
+    found = INTENT_MATCHER.find_labels(doc.lower)
+    intents = [
+        {"intent": intent, "confidence": KEYWORD_CONFIDENCE}
+        for intent in INTENT_PRIORITY
+        if intent in found
+    ]
 
-    if score(lead_keywords) > 0:
-        intents.append({"intent": "LEAD_CREATE", "confidence": 1.0})
-    if score(visit_keywords) > 0:
-        intents.append({"intent": "VISIT_SCHEDULE", "confidence": 1.0})
-    if score(update_keywords) > 0:
-        intents.append({"intent": "LEAD_UPDATE", "confidence": 1.0})
+    # Keyword misses go to the intent model when one is configured; its
+    # probability is the confidence
+    if not intents and INTENT_MODEL is not None:
+        intent, confidence = INTENT_MODEL.classify_intent(doc.text)
+        intents.append({"intent": intent, "confidence": confidence})
 
-    # fallback
-    ent = extract_entities(transcript)
-    if ent.get("phone") and ent.get("city") and not any(i["intent"]=="LEAD_CREATE" for i in intents):
-        intents.append({"intent": "LEAD_CREATE", "confidence": 0.7})
+    # fallback: a phone and a city without trigger words still reads as a new lead
+    if not intents:
+        ent = _entities_for(doc, "LEAD_CREATE")
+        if ent.get("phone") and ent.get("city"):
+            intents.append({"intent": "LEAD_CREATE", "confidence": FALLBACK_CONFIDENCE})
 
     if not intents:
-        intents.append({"intent": "UNKNOWN", "confidence": 0.0})
+        intents.append({"intent": "UNKNOWN", "confidence": UNKNOWN_CONFIDENCE})
 
+    doc._intents = intents
     return intents
 
+
+def classify_intent(transcript: Union[str, Transcript]) -> Tuple[str, float]:
+    """Classify the primary intent of a transcript"""
+    primary = detect_intents(transcript)[0]
+    return primary["intent"], primary["confidence"]
+
+
+def prepare_batch(transcripts: List[Union[str, Transcript]]) -> List[Transcript]:
+    """
+    Prepare a batch of transcripts. With an intent model configured, the ones
+    the keyword rules miss are scored together in one model call and the
+    result is memoized on each Transcript.
+    """
+    docs = [prepare(t) for t in transcripts]
+    if INTENT_MODEL is not None:
+        misses = [doc for doc in docs if doc._intents is None and not INTENT_MATCHER.find_labels(doc.lower)]
+        for doc, (intent, confidence) in zip(misses, INTENT_MODEL.predict([doc.text for doc in misses])):
+            doc._intents = [{"intent": intent, "confidence": confidence}]
+    return docs
+
+
+def classify_batch(transcripts: List[Union[str, Transcript]]) -> List[Tuple[str, float]]:
+    """classify_intent for a whole batch, with one model call for the keyword misses"""
+    return [classify_intent(doc) for doc in prepare_batch(transcripts)]
+
+
+# ------------------------------
+# Results cache
+# ------------------------------
+def _reference_day() -> date:
+    return datetime.now().date()
+
+
+def _clock_relative_visit(doc: Transcript) -> bool:
+    time_match = VISIT_TIME_RE.search(doc.text)
+    return bool(time_match and CLOCK_RELATIVE_RE.search(normalize_phrase(time_match.group(1))))
+
+
+def analyze_cached(
+    transcript: Union[str, Transcript],
+    analyze: Callable[[Transcript], Tuple[str, float, Dict[str, Any]]],
+) -> Tuple[str, float, Dict[str, Any]]:
+    """
+    Return `analyze(doc)` for the transcript, reusing an earlier result for
+    the same normalized text. Results with a resolved visit_time are tied to
+    the reference date they were resolved against and dropped when it
+    changes; clock-relative times ("in 2 hours") are never cached. Analysis
+    runs under NLU_TIME_BUDGET_MS, and results degraded by the budget are
+    not cached either.
+    """
+    doc = prepare(transcript)
+    day = _reference_day()
+    cached = RESULTS_CACHE.get(doc.text, valid=lambda entry: entry[0] is None or entry[0] == day)
+    if cached is not None:
+        _, intent, confidence, entities = cached
+        return intent, confidence, dict(entities)
+
+    doc.start_budget(settings.NLU_TIME_BUDGET_MS / 1000)
+    intent, confidence, entities = analyze(doc)
+    if doc.degraded:
+        return intent, confidence, entities
+    if entities.get("visit_time"):
+        if not _clock_relative_visit(doc):
+            RESULTS_CACHE.put(doc.text, (day, intent, confidence, dict(entities)))
+    else:
+        RESULTS_CACHE.put(doc.text, (None, intent, confidence, dict(entities)))
+    return intent, confidence, entities
+
+
+def cache_stats() -> Dict[str, int]:
+    return RESULTS_CACHE.stats()
+
+
+def warm_up() -> None:
+    """Load lazily imported parsers and exercise every extractor once"""
+    timeparse.warm_up()
+    for sample in (
+        "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210, source Instagram",
+        "Schedule a visit for lead 65ce1c14 at 3 pm tomorrow",
+        "Update lead 65ce1c14 to WON notes booked unit A2",
+    ):
+        doc = prepare(sample)
+        extract_entities(doc, classify_intent(doc)[0])
+
+
 def extract(transcript: str) -> Dict[str, Any]:
-    entities = extract_entities(transcript)
-    intents = classify_intent(transcript)
+    doc = prepare(transcript)
+    intents = detect_intents(doc)
+    entities = extract_entities(doc, intents[0]["intent"])
     result = {
         "intents": intents,      # list of intents (supports multi-action)
         "intent": intents[0]["intent"],  # primary intent for backward compatibility
         "entities": entities
     }
 
-    # Analytics logging
-    try:
-        with open(ANALYTICS_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps({
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "transcript": transcript,
-                "intents": intents,
-                "entities": entities
-            }) + "\n")
-    except Exception as e:
-        logger.warning("Failed to log analytics: %s", e)
+    # Analytics logging - queued for the background writer, never blocks
+    analytics.default_writer(ANALYTICS_FILE).submit({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "transcript": transcript,
+        "intents": intents,
+        "entities": entities
+    })
 
     return result
@@ -0,0 +1,273 @@
+# bot/outbox.py
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .metrics import BATCH_SIZE
+
+logger = logging.getLogger("bot_outbox")
+
+PENDING, INFLIGHT, DONE, FAILED = "PENDING", "INFLIGHT", "DONE", "FAILED"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tracking_id TEXT NOT NULL UNIQUE,
+    lead_key TEXT,
+    method TEXT NOT NULL,
+    kwargs TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    lease_until REAL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_status_id ON outbox (status, id);
+CREATE INDEX IF NOT EXISTS outbox_lead_status ON outbox (lead_key, status);
+"""
+
+# The next batch: pending actions, and in-flight ones whose claim lapsed, skipping
+# leads another worker still holds a live claim on so their actions stay in order
+SELECT_CLAIMABLE = f"""
+SELECT id, lead_key, method, kwargs FROM outbox AS o
+WHERE (status = '{PENDING}' OR (status = '{INFLIGHT}' AND lease_until < :now))
+  AND (lead_key IS NULL OR NOT EXISTS (
+      SELECT 1 FROM outbox AS held
+      WHERE held.lead_key = o.lead_key AND held.status = '{INFLIGHT}' AND held.lease_until >= :now))
+ORDER BY id LIMIT :limit
+"""
+
+Perform = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+class Outbox:
+    """
+    Durable write-behind queue of CRM actions, stored in SQLite (WAL).
+
+    `enqueue` persists an action and returns its tracking id. A worker thread
+    delivers pending actions in batches of `batch_size` through `perform`,
+    running up to `concurrency` leads at once while each lead's actions go
+    out one at a time in the order they were queued. A transient failure
+    (`is_transient`) leaves the action pending and holds back the rest of
+    that lead until a later round; any other failure marks it FAILED.
+    Delivery is at-least-once. Finished entries are kept for `retention`
+    seconds so their status can still be looked up.
+
+    Several processes may share one database: each batch is claimed
+    (INFLIGHT, with this outbox as owner) in one write transaction, so an
+    action goes to one worker, and a lead with claimed actions is left to
+    the worker holding them. A claim lapses after `lease` seconds, so the
+    actions of a worker that died are picked up again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        perform: Perform,
+        is_transient: Callable[[Exception], bool],
+        batch_size: int = 100,
+        concurrency: int = 4,
+        poll_interval: float = 1.0,
+        retention: float = 86400.0,
+        lease: float = 300.0,
+    ):
+        self.path = path
+        self.perform = perform
+        self.is_transient = is_transient
+        self.batch_size = max(1, batch_size)
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lease = lease
+        self.owner = uuid.uuid4().hex
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="outbox")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pruned = 0.0
+        self.delivered = 0
+        self.failed = 0
+        self.deferred = 0
+
+    # ------------------------------
+    # Producer side
+    # ------------------------------
+    def enqueue(self, method: str, kwargs: Dict[str, Any], lead_key: Optional[str] = None) -> str:
+        """Persist an action and return its tracking id; starts the worker on first use"""
+        tracking_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO outbox (tracking_id, lead_key, method, kwargs, status, created, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (tracking_id, lead_key, method, json.dumps(kwargs), PENDING, now, now),
+            )
+        self.start()
+        self._wake.set()
+        return tracking_id
+
+    def pending_for(self, lead_key: Optional[str]) -> int:
+        """Undelivered actions on the lead, queued by any process sharing the database"""
+        if not lead_key:
+            return 0
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE lead_key = ? AND status IN (?, ?)", (lead_key, PENDING, INFLIGHT)
+            ).fetchone()[0]
+
+    def get(self, tracking_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tracking_id, method, status, attempts, result, error, created, updated "
+                "FROM outbox WHERE tracking_id = ?", (tracking_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(("tracking_id", "method", "status", "attempts", "result", "error", "created", "updated"), row))
+        entry["result"] = json.loads(entry["result"]) if entry["result"] else None
+        return entry
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            return {
+                "pending": counts.get(PENDING, 0),
+                "in_flight": counts.get(INFLIGHT, 0),
+                "done": counts.get(DONE, 0),
+                "failed": counts.get(FAILED, 0),
+                "delivered": self.delivered,
+                "deferred": self.deferred,
+            }
+
+    # ------------------------------
+    # Worker side
+    # ------------------------------
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="outbox-worker", daemon=True)
+            self._thread.start()
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the worker; undelivered actions stay queued for the next start."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            self._wake.set()
+            thread.join(timeout)
+        self._pool.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    def drain_once(self) -> Tuple[int, int]:
+        """Claim and deliver one batch; returns (actions delivered or failed, actions deferred)."""
+        rows = self._claim()
+        if rows:
+            BATCH_SIZE.observe(len(rows), "outbox")
+        chains: Dict[Any, List[tuple]] = {}
+        for row in rows:
+            chains.setdefault(row[1] or ("entry", row[0]), []).append(row)
+        results = list(self._pool.map(self._run_chain, chains.values()))
+        finished = sum(done for done, _ in results)
+        deferred = sum(held for _, held in results)
+        self._prune()
+        return finished, deferred
+
+    def _claim(self) -> List[tuple]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(SELECT_CLAIMABLE, {"now": now, "limit": self.batch_size}).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, owner = ?, lease_until = ? WHERE id = ?",
+                    [(INFLIGHT, self.owner, now + self.lease, row[0]) for row in rows],
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def _run_chain(self, entries: List[tuple]) -> Tuple[int, int]:
+        finished = 0
+        for position, (entry_id, lead_key, method, kwargs) in enumerate(entries):
+            try:
+                result = self.perform(method, json.loads(kwargs))
+            except Exception as e:
+                if self.is_transient(e):
+                    # Keep it (and everything after it for this lead) for a later round
+                    self._record(entry_id, PENDING, error=str(e))
+                    self._release([entry[0] for entry in entries[position + 1:]])
+                    self._count("deferred")
+                    return finished, len(entries) - position
+                logger.warning("Outbox action %s failed permanently: %s", method, e)
+                self._record(entry_id, FAILED, error=str(e))
+                self._count("failed")
+            else:
+                self._record(entry_id, DONE, result=result)
+                self._count("delivered")
+            finished += 1
+        return finished, 0
+
+    def _count(self, counter: str) -> None:
+        # Chains run on pool threads
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _record(self, entry_id: int, status: str, result=None, error=None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = attempts + 1, result = ?, error = ?, owner = NULL, "
+                "lease_until = NULL, updated = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), entry_id),
+            )
+
+    def _release(self, entry_ids: List[int]) -> None:
+        """Hand claimed actions that were not attempted back to the queue"""
+        if not entry_ids:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE outbox SET status = ?, owner = NULL, lease_until = NULL WHERE id = ? AND owner = ?",
+                [(PENDING, entry_id, self.owner) for entry_id in entry_ids],
+            )
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now - self._pruned < 60:
+            return
+        self._pruned = now
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM outbox WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, now - self.retention)
+            )
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                finished, deferred = self.drain_once()
+            except Exception as e:
+                logger.warning("Outbox drain failed: %s", e)
+                finished, deferred = 0, 1
+            if finished and not deferred:
+                continue
+            # Idle, or the CRM is failing: wait for new work or the next retry round
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
@@ -0,0 +1,51 @@
+# bot/ratelimit.py
+import math
+import time
+from typing import Callable, Dict, Tuple
+
+from .shared_state import SharedState
+
+
+class RateLimiter:
+    """
+    Sliding-window limit of `limit` units per `window` seconds per client,
+    counted in a SharedState so every worker on the node enforces the same
+    budget.
+
+    Each client has one counter per fixed window. The sliding count is the
+    current window's counter plus the previous window's, weighted by how
+    much of it still overlaps the sliding window, which takes two counter
+    operations per check instead of a log of timestamps. Rejected attempts
+    count too, so a client that keeps retrying stays limited. `limit=0`
+    disables limiting.
+    """
+
+    def __init__(self, state: SharedState, limit: int, window: float, clock: Callable[[], float] = time.time):
+        self.state = state
+        self.limit = limit
+        self.window = window
+        self._clock = clock
+        self.rejected = 0
+
+    def check(self, client: str, cost: int = 1) -> Tuple[bool, float]:
+        """Spend `cost` units for the client; returns (allowed, seconds until it may retry)"""
+        if self.limit <= 0:
+            return True, 0.0
+        position = self._clock() / self.window
+        index = math.floor(position)
+        current = self.state.incr(f"rl:{client}:{index}", cost, ttl=2 * self.window)
+        previous = self.state.counter(f"rl:{client}:{index - 1}")
+        overlap = 1 - (position - index)
+        if previous * overlap + current <= self.limit:
+            return True, 0.0
+        self.rejected += 1
+        # The previous window's share fades linearly as the window slides; once this
+        # window is over, its own count becomes the one fading
+        if current <= self.limit:
+            wait = (previous * overlap + current - self.limit) / previous
+        else:
+            wait = overlap + 1 - self.limit / current
+        return False, wait * self.window
+
+    def stats(self) -> Dict[str, float]:
+        return {"limit": self.limit, "window": self.window, "rejected": self.rejected}
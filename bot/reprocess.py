@@ -0,0 +1,138 @@
+# bot/reprocess.py
+"""
+Offline reprocessing of transcript archives.
+
+Runs the NLU pipeline over a JSONL or plain-text file on a process pool, in
+chunks, and streams one JSON result per non-blank input line to the output in
+input order. Lines use the streaming endpoint's format: a JSON object with a
+"transcript" field, a JSON string, or plain text.
+
+CRM actions run in the parent process, chunk by chunk, through the same code
+as batch requests, so each lead's actions keep their input order. --dry-run
+validates and plans them without calling the CRM.
+
+    python -m bot.reprocess transcripts.jsonl -o results.jsonl [--workers 8] [--chunk-size 500] [--dry-run]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, IO, Iterable, Iterator, List, Tuple
+
+from . import app as bot_app
+from . import nlu
+
+
+def read_chunks(lines: Iterable[bytes], chunk_size: int) -> Iterator[List[Tuple[int, bytes]]]:
+    """Group non-blank lines into chunks of (line number, line)"""
+    numbered = ((line_no, line) for line_no, line in enumerate(lines, 1) if line.strip())
+    while True:
+        chunk = list(itertools.islice(numbered, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def analyze_chunk(chunk: List[Tuple[int, bytes]]):
+    """Run NLU over one chunk (in a worker); returns (results, CPU seconds used)"""
+    cpu_start = time.process_time()
+    # With an intent model, the chunk's keyword misses are scored in one call
+    docs = nlu.prepare_batch([bot_app.parse_stream_line(line) for _, line in chunk])
+    results = []
+    for (line_no, _), doc in zip(chunk, docs):
+        start = time.perf_counter()
+        analyzed = bot_app.analyze_transcript(doc)
+        results.append((line_no, analyzed, time.perf_counter() - start))
+    return results, time.process_time() - cpu_start
+
+def plan_only(intent: str, confidence: float, entities: Dict) -> Dict:
+    """Dry-run result: the validation outcome and the CRM call that would be made"""
+    early = bot_app.check_transcript(intent, confidence, entities)
+    if early is not None:
+        return bot_app.batch_item(early)
+    action = bot_app.plan_crm_action(intent, entities)
+    crm_call = {**action[2], "dry_run": True} if action is not None else {}
+    return {"intent": intent, "entities": entities, "result": {}, "crm_call": crm_call}
+
+async def finish_chunk(results, dry_run: bool) -> List[Dict]:
+    if dry_run:
+        items = [{**plan_only(*analyzed), "elapsed_ms": round(seconds * 1000, 3)} for _, analyzed, seconds in results]
+    else:
+        items = await bot_app.finish_batch([(analyzed, seconds) for _, analyzed, seconds in results])
+    return [{"line": line_no, "confidence": analyzed[1], **item} for (line_no, analyzed, _), item in zip(results, items)]
+
+async def reprocess(lines: Iterable[bytes], out: IO[str], workers: int, chunk_size: int, dry_run: bool) -> Dict:
+    """
+    Process `lines` and write JSONL results to `out`. At most two chunks per
+    worker are in flight, so memory does not grow with the input. With
+    `workers=0` everything runs in this process.
+    """
+    chunks = read_chunks(lines, max(1, chunk_size))
+    pool = ProcessPoolExecutor(workers) if workers > 0 else None
+    loop = asyncio.get_running_loop()
+    pending: deque = deque()
+    stats = {"lines": 0, "cpu_seconds": 0.0}
+
+    def submit() -> None:
+        chunk = next(chunks, None)
+        if chunk is None:
+            return
+        if pool is not None:
+            pending.append(asyncio.wrap_future(pool.submit(analyze_chunk, chunk)))
+        else:
+            future = loop.create_future()
+            future.set_result(analyze_chunk(chunk))
+            pending.append(future)
+
+    try:
+        for _ in range(max(1, workers) * 2):
+            submit()
+        while pending:
+            results, cpu_seconds = await pending.popleft()
+            submit()
+            for item in await finish_chunk(results, dry_run):
+                out.write(json.dumps(item) + "\n")
+            out.flush()
+            stats["lines"] += len(results)
+            stats["cpu_seconds"] += cpu_seconds
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL or text file of transcripts, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="NLU processes (0 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="transcripts per work unit")
+    parser.add_argument("--dry-run", action="store_true", help="validate and plan CRM calls without making them")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin.buffer if args.input == "-" else open(args.input, "rb")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        stats = asyncio.run(reprocess(source, out, args.workers, args.chunk_size, args.dry_run))
+    finally:
+        if source is not sys.stdin.buffer:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+
+    lines, cores = stats["lines"], min(max(1, args.workers), os.cpu_count() or 1)
+    rate = lines / elapsed if elapsed else 0.0
+    per_cpu_second = lines / stats["cpu_seconds"] if stats["cpu_seconds"] else 0.0
+    print(f"{lines} transcripts in {elapsed:.2f}s with {args.workers} worker(s): {rate:,.0f}/s total, "
+          f"{rate / cores:,.0f}/s per core, {per_cpu_second:,.0f} per NLU CPU-second", file=sys.stderr)
+    return stats
+
+
+if __name__ == "__main__":
+    main()
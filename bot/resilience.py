@@ -0,0 +1,276 @@
+# bot/resilience.py
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict
+
+from . import metrics
+
+logger = logging.getLogger("bot_resilience")
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATES = (CLOSED, OPEN, HALF_OPEN)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency while its circuit is open."""
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker.
+
+    Outcomes are counted in one-second buckets over the last `window`
+    seconds. Once at least `min_calls` were seen and the failure share
+    reaches `failure_rate`, the circuit opens and calls are refused for
+    `open_seconds`. It then goes half-open and lets `half_open_calls` trial
+    calls through: a success closes it, a failure opens it again.
+    Thread-safe. The state, openings and refusals are also exported on
+    /metrics, which assumes one breaker per process, as the CRM clients share.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        window: float = 30.0,
+        open_seconds: float = 5.0,
+        half_open_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: deque = deque()  # [second, successes, failures]
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trials = 0
+        self.opened = 0
+        self.rejected = 0
+        _export_state(CLOSED)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now; refusals are counted"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            metrics.BREAKER_REJECTED.inc()
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._transition(CLOSED)
+                self._buckets.clear()
+            self._count(failed=False)
+
+    def release(self) -> None:
+        """Give back a trial slot taken by a call that ended without an outcome (e.g. cancelled)"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open()
+                return
+            self._count(failed=True)
+            if self._state == CLOSED:
+                calls, failures = self._totals()
+                if calls >= self.min_calls and failures / calls >= self.failure_rate:
+                    self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_half_open()
+            calls, failures = self._totals()
+            return {
+                "state": self._state,
+                "window_calls": calls,
+                "window_failures": failures,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+    # Caller holds the lock for everything below
+    def _count(self, failed: bool) -> None:
+        second = int(self._clock())
+        if not self._buckets or self._buckets[-1][0] != second:
+            self._buckets.append([second, 0, 0])
+        self._buckets[-1][2 if failed else 1] += 1
+
+    def _totals(self):
+        horizon = self._clock() - self.window
+        while self._buckets and self._buckets[0][0] < horizon:
+            self._buckets.popleft()
+        successes = sum(bucket[1] for bucket in self._buckets)
+        failures = sum(bucket[2] for bucket in self._buckets)
+        return successes + failures, failures
+
+    def _open(self) -> None:
+        self._transition(OPEN)
+        self._opened_at = self._clock()
+        self.opened += 1
+        metrics.BREAKER_OPENED.inc()
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(HALF_OPEN)
+            self._trials = 0
+
+    def _transition(self, state: str) -> None:
+        if state != self._state:
+            logger.warning("Circuit breaker %s -> %s", self._state, state)
+            self._state = state
+            _export_state(state)
+
+
+def _export_state(state: str) -> None:
+    for name in STATES:
+        metrics.BREAKER_STATE.set(1 if name == state else 0, name)
+
+
+class RetryBudget:
+    """
+    Caps retries to a share of recent traffic so retries cannot multiply load
+    during an outage: every request earns `ratio` of a retry, plus
+    `min_per_second` retries per second for low traffic, up to a reserve of
+    `ratio * max_requests` tokens. Thread-safe.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_second: float = 1.0, max_requests: int = 1000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.capacity = max(1.0, ratio * max_requests)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._refilled = clock()
+        self.retries = 0
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_retry(self) -> bool:
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._refilled) * self.min_per_second)
+            self._refilled = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                metrics.RETRIES.inc()
+                return True
+            self.exhausted += 1
+            metrics.RETRY_BUDGET_EXHAUSTED.inc()
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"tokens": round(self._tokens, 2), "retries": self.retries, "exhausted": self.exhausted}
+
+
+def backoff_delay(attempt: int, base: float, cap: float, rand: Callable[[], float] = random.random) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt))"""
+    return rand() * min(cap, base * (2 ** attempt))
+
+
+class ResiliencePolicy:
+    """
+    Runs calls to a dependency through a circuit breaker, retrying
+    `is_retryable` errors with jittered exponential backoff while the retry
+    budget allows. `is_failure` decides which errors count against the
+    breaker (e.g. 5xx but not 404). Raises CircuitOpenError when the circuit
+    refuses the call.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        budget: RetryBudget,
+        is_failure: Callable[[BaseException], bool],
+        is_retryable: Callable[[BaseException], bool],
+        max_retries: int = 2,
+        backoff_base: float = 0.05,
+        backoff_max: float = 1.0,
+    ):
+        self.breaker = breaker
+        self.budget = budget
+        self.is_failure = is_failure
+        self.is_retryable = is_retryable
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def call(self, fn: Callable[[], Any]) -> Any:
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError()
+            try:
+                result = fn()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                attempt += 1
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError()
+            try:
+                result = await fn()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(backoff_delay(attempt, self.backoff_base, self.backoff_max))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled mid-call: no outcome to record, but a half-open trial must not stay taken
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if self.is_failure(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return attempt < self.max_retries and self.is_retryable(error) and self.budget.try_retry()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"breaker": self.breaker.stats(), "retry_budget": self.budget.stats()}
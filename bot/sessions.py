@@ -0,0 +1,162 @@
+# bot/sessions.py
+import json
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from . import nlu
+from .cache import TTLCache
+from .shared_state import SharedState
+
+Analyzed = Tuple[str, float, Dict[str, Any]]
+
+# Follow-ups below this confidence (or UNKNOWN) may complete a pending turn
+FOLLOW_UP_CONFIDENCE = 0.7
+
+
+class SessionState:
+    """
+    What a conversation carries between turns: the last lead it acted on, and
+    the turn that failed validation for missing entities, if any. `pending`
+    is (intent, confidence, ((entity, value), ...)) with only the entities
+    that were found, so an idle session costs two slots.
+    """
+    __slots__ = ("lead_id", "pending")
+
+    def __init__(self, lead_id: Optional[str] = None,
+                 pending: Optional[Tuple[str, float, Tuple[Tuple[str, Any], ...]]] = None):
+        self.lead_id = lead_id
+        self.pending = pending
+
+    def __repr__(self) -> str:
+        return f"SessionState(lead_id={self.lead_id!r}, pending={self.pending and self.pending[0]!r})"
+
+
+class SessionStore:
+    """
+    Per-session conversation state for multi-turn requests, keyed by the
+    caller's session id. Sessions expire `ttl` seconds after their last turn
+    and at most `max_sessions` are kept (least recently used go first), which
+    bounds memory; `max_sessions=0` disables sessions. Safe to call from
+    several threads; concurrent turns of one session are last-write-wins.
+
+    `required` maps an intent to the entities it cannot run without, as in
+    app.REQUIRED_ENTITIES.
+
+    With a `shared` state, sessions live there instead, so consecutive turns
+    may land on different workers; the shared table's size bounds them, and
+    a pending turn too large for one of its values is dropped (the lead_id
+    is kept).
+
+    `budget` is the time in seconds (0: no limit) allowed for re-extracting
+    a follow-up's entities, as NLU_TIME_BUDGET_MS is for the main analysis.
+    """
+
+    def __init__(self, max_sessions: int, ttl: float, required: Mapping[str, Sequence[str]],
+                 clock: Callable[[], float] = time.monotonic, shared: Optional[SharedState] = None,
+                 budget: float = 0.0):
+        self.required = required
+        self.budget = budget
+        self._cache = TTLCache(max_sessions, ttl, clock)
+        self.shared = shared
+        self.resumed = 0
+        self.carried = 0
+
+    def get(self, session_id: str) -> Optional[SessionState]:
+        if self.shared is None:
+            return self._cache.get(session_id)
+        value = self.shared.get("session:" + session_id)
+        if value is None:
+            return None
+        lead_id, pending = json.loads(value)
+        if pending is not None:
+            intent, confidence, found = pending
+            pending = (intent, confidence, tuple((key, entity) for key, entity in found))
+        return SessionState(lead_id, pending)
+
+    def _put(self, session_id: str, state: SessionState) -> None:
+        if self.shared is None:
+            self._cache.put(session_id, state)
+            return
+        if self._cache.max_size <= 0:
+            return
+        key = "session:" + session_id
+        value = json.dumps([state.lead_id, state.pending], separators=(",", ":")).encode("utf-8")
+        if len(value) > self.shared.value_bytes:
+            value = json.dumps([state.lead_id, None]).encode("utf-8")
+        self.shared.set(key, value, self._cache.ttl)
+
+    def resume(self, session_id: str, transcript: str, intent: str, confidence: float,
+               entities: Dict[str, Any]) -> Tuple[Analyzed, List[str]]:
+        """
+        Fold the session into a freshly analyzed turn. Returns the analysis
+        to act on and the entities taken from the session.
+
+        A turn with no clear intent of its own, or the pending intent still
+        missing entities, completes the pending turn: its entities are
+        re-extracted for the pending intent and fill the gaps. An intent that
+        needs a lead_id but names none gets the session's last lead.
+        """
+        state = self.get(session_id)
+        if state is None:
+            return (intent, confidence, entities), []
+        filled: List[str] = []
+        pending = state.pending
+        if pending is not None and (
+            intent == "UNKNOWN" or confidence < FOLLOW_UP_CONFIDENCE
+            or (intent == pending[0] and self.missing(intent, entities))
+        ):
+            fresh = entities if intent == pending[0] else self._extract(transcript, pending[0])
+            intent, confidence, found = pending
+            entities = dict.fromkeys(nlu.ENTITY_KEYS)
+            entities.update(found)
+            entities.update((key, value) for key, value in fresh.items() if value is not None)
+            filled = [key for key, _ in found if fresh.get(key) is None]
+            self.resumed += 1
+        if not entities.get("lead_id") and state.lead_id and "lead_id" in self.required.get(intent, ()):
+            entities = {**entities, "lead_id": state.lead_id}
+            filled.append("lead_id")
+            self.carried += 1
+        return (intent, confidence, entities), filled
+
+    def _extract(self, transcript: str, intent: str) -> Dict[str, Any]:
+        doc = nlu.prepare(transcript)
+        doc.start_budget(self.budget)
+        return nlu.extract_entities(doc, intent)
+
+    def missing(self, intent: str, entities: Dict[str, Any]) -> List[str]:
+        return [field for field in self.required.get(intent, ()) if not entities.get(field)]
+
+    def end_turn(self, session_id: str, intent: str, confidence: float, entities: Dict[str, Any],
+                 lead_id: Optional[str] = None) -> List[str]:
+        """
+        Record a finished turn: the lead it acted on (kept from earlier turns
+        when None), and the turn itself as pending when it has a clear intent
+        but lacks required entities. Any other outcome clears the pending
+        turn. Returns the entities still awaited.
+        """
+        state = self.get(session_id) or SessionState()
+        missing, pending = [], None
+        if intent != "UNKNOWN" and confidence >= FOLLOW_UP_CONFIDENCE:
+            missing = self.missing(intent, entities)
+        if missing:
+            found = tuple((key, value) for key, value in entities.items() if value is not None)
+            pending = (intent, confidence, found)
+        self._put(session_id, SessionState(lead_id or state.lead_id, pending))
+        return missing
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def __len__(self) -> int:
+        """Sessions held by this process; shared sessions are not counted"""
+        return len(self._cache)
+
+    def stats(self) -> Dict[str, int]:
+        cache = self._cache.stats()
+        return {
+            "sessions": cache["size"],
+            "evictions": cache["evictions"],
+            "expirations": cache["expirations"],
+            "resumed": self.resumed,
+            "carried_lead_ids": self.carried,
+        }
@@ -1,11 +1,110 @@
 # bot/settings.py
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     CRM_BASE_URL: str = os.getenv("CRM_BASE_URL", "http://localhost:8001")
+    # "memory" keeps the built-in test CRM; "http" talks to CRM_BASE_URL
+    CRM_MODE: str = os.getenv("CRM_MODE", "memory")
+    CRM_TIMEOUT: float = float(os.getenv("CRM_TIMEOUT", "5.0"))
+    CRM_POOL_SIZE: int = int(os.getenv("CRM_POOL_SIZE", "100"))
+    CRM_POOL_KEEPALIVE: int = int(os.getenv("CRM_POOL_KEEPALIVE", "20"))
+    # Threads running NLU off the event loop; 0 runs it inline
+    NLU_WORKERS: int = int(os.getenv("NLU_WORKERS", "4"))
+    # Transcripts of one "transcripts" batch processed concurrently
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "10"))
+    # Coalesce a batch's CRM actions into bulk calls when the client supports it
+    CRM_BULK: bool = os.getenv("CRM_BULK", "true").lower() in ("1", "true", "yes")
+    CRM_BULK_MAX_ITEMS: int = int(os.getenv("CRM_BULK_MAX_ITEMS", "100"))
+    # Circuit breaker: open when FAILURE_RATE of at least MIN_CALLS calls in WINDOW seconds
+    # failed, refuse calls for OPEN_SECONDS, then let a trial call through
+    CRM_BREAKER: bool = os.getenv("CRM_BREAKER", "true").lower() in ("1", "true", "yes")
+    CRM_BREAKER_FAILURE_RATE: float = float(os.getenv("CRM_BREAKER_FAILURE_RATE", "0.5"))
+    CRM_BREAKER_MIN_CALLS: int = int(os.getenv("CRM_BREAKER_MIN_CALLS", "20"))
+    CRM_BREAKER_WINDOW: float = float(os.getenv("CRM_BREAKER_WINDOW", "30"))
+    CRM_BREAKER_OPEN_SECONDS: float = float(os.getenv("CRM_BREAKER_OPEN_SECONDS", "5"))
+    # Retries of safe-to-resend failures: attempts, jittered backoff base/cap (s), and
+    # the share of traffic that may be retries
+    CRM_RETRIES: int = int(os.getenv("CRM_RETRIES", "2"))
+    CRM_RETRY_BACKOFF: float = float(os.getenv("CRM_RETRY_BACKOFF", "0.05"))
+    CRM_RETRY_BACKOFF_MAX: float = float(os.getenv("CRM_RETRY_BACKOFF_MAX", "1.0"))
+    CRM_RETRY_BUDGET: float = float(os.getenv("CRM_RETRY_BUDGET", "0.1"))
+    # NDJSON streaming: transcripts read ahead of the client, and the longest accepted line
+    STREAM_WINDOW: int = int(os.getenv("STREAM_WINDOW", "100"))
+    STREAM_MAX_LINE_BYTES: int = int(os.getenv("STREAM_MAX_LINE_BYTES", "65536"))
+    # Dedupe window (s) and bound on remembered keys for Idempotency-Key requests
+    IDEMPOTENCY_TTL: float = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+    IDEMPOTENCY_MAX_KEYS: int = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+    # Multi-turn sessions (metadata.session_id): idle lifetime in seconds, and the most
+    # kept per worker (least recently used go first; 0 disables)
+    SESSION_TTL: float = float(os.getenv("SESSION_TTL", "1800"))
+    SESSION_MAX: int = int(os.getenv("SESSION_MAX", "100000"))
+    # Node-local state shared by the workers (rate limits, idempotency keys, sessions): a
+    # memory-mapped file, best on tmpfs such as /dev/shm; unset keeps it per worker
+    SHARED_STATE_FILE: Optional[str] = os.getenv("SHARED_STATE_FILE")
+    # Shared table size: slots, and value bytes per slot (a slot is value bytes + 40)
+    SHARED_STATE_SLOTS: int = int(os.getenv("SHARED_STATE_SLOTS", "131072"))
+    SHARED_STATE_VALUE_BYTES: int = int(os.getenv("SHARED_STATE_VALUE_BYTES", "472"))
+    # Transcripts accepted per client per sliding window of RATE_LIMIT_WINDOW seconds (0 = no limit)
+    RATE_LIMIT: int = int(os.getenv("RATE_LIMIT", "0"))
+    RATE_LIMIT_WINDOW: float = float(os.getenv("RATE_LIMIT_WINDOW", "60"))
+    # Header naming the client, set by a trusted proxy in front of the service (e.g. X-Client-Id);
+    # unset limits by peer address, since clients could forge any header
+    RATE_LIMIT_CLIENT_HEADER: Optional[str] = os.getenv("RATE_LIMIT_CLIENT_HEADER")
+    # mock_crm storage: "memory" or "sqlite" (WAL file at MOCK_CRM_DB, group commits)
+    MOCK_CRM_STORAGE: str = os.getenv("MOCK_CRM_STORAGE", "memory")
+    MOCK_CRM_DB: str = os.getenv("MOCK_CRM_DB", "mock_crm.db")
+    MOCK_CRM_COMMIT_BATCH: int = int(os.getenv("MOCK_CRM_COMMIT_BATCH", "100"))
+    MOCK_CRM_COMMIT_INTERVAL: float = float(os.getenv("MOCK_CRM_COMMIT_INTERVAL", "0.05"))
+    # Write-behind outbox for CRM actions: "off", "fallback" (queue when the CRM is
+    # unavailable) or "always" (queue every action); SQLite file and worker tuning
+    OUTBOX_MODE: str = os.getenv("OUTBOX_MODE", "off")
+    OUTBOX_DB: str = os.getenv("OUTBOX_DB", "bot_outbox.db")
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+    OUTBOX_CONCURRENCY: int = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "1.0"))
+    OUTBOX_RETENTION: float = float(os.getenv("OUTBOX_RETENTION", "86400"))
+    # Seconds a worker may hold a claimed batch; a dead worker's actions are redelivered after it
+    OUTBOX_LEASE: float = float(os.getenv("OUTBOX_LEASE", "300"))
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    TRANSCRIPT_MAX_LEN: int = 1000
+    # Longest transcript accepted, in characters; longer ones are rejected with 413
+    TRANSCRIPT_MAX_LEN: int = int(os.getenv("TRANSCRIPT_MAX_LEN", "1000"))
+    # NLU time per transcript (ms, 0 = unlimited); past it, optional slow stages such as
+    # the dateparser fallback are skipped and the result is not cached
+    NLU_TIME_BUDGET_MS: float = float(os.getenv("NLU_TIME_BUDGET_MS", "50"))
+    # JSON file of {"INTENT": ["phrase", ...]} extending the built-in triggers
+    INTENT_PHRASES_FILE: Optional[str] = os.getenv("INTENT_PHRASES_FILE")
+    # Hashed n-gram intent model (python -m bot.classifier train) for keyword misses; needs NumPy
+    INTENT_MODEL_FILE: Optional[str] = os.getenv("INTENT_MODEL_FILE")
+    # JSON files of {"Canonical": ["alias", ...]} extending the built-in city and lead-source gazetteers
+    CITY_GAZETTEER_FILE: Optional[str] = os.getenv("CITY_GAZETTEER_FILE")
+    SOURCE_GAZETTEER_FILE: Optional[str] = os.getenv("SOURCE_GAZETTEER_FILE")
+    # Resolved visit-time phrases kept per reference date
+    TIME_CACHE_SIZE: int = int(os.getenv("TIME_CACHE_SIZE", "4096"))
+    # Languages dateparser tries for visit times it falls back to (comma-separated); each
+    # extra language adds detection work to every fallback parse
+    VISIT_TIME_LANGUAGES: str = os.getenv("VISIT_TIME_LANGUAGES", "en")
+    # NLU results cached by normalized transcript (0 disables), and their lifetime in seconds
+    NLU_CACHE_SIZE: int = int(os.getenv("NLU_CACHE_SIZE", "10000"))
+    NLU_CACHE_TTL: float = float(os.getenv("NLU_CACHE_TTL", "3600"))
+    # Load dateparser and friends at startup instead of on the first request
+    NLU_WARMUP: bool = os.getenv("NLU_WARMUP", "false").lower() in ("1", "true", "yes")
+    # Buffered analytics sink used by nlu.extract
+    ANALYTICS_FILE: str = os.getenv("ANALYTICS_FILE", "bot_analytics.jsonl")
+    ANALYTICS_QUEUE_SIZE: int = int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000"))
+    ANALYTICS_BATCH_SIZE: int = int(os.getenv("ANALYTICS_BATCH_SIZE", "256"))
+    ANALYTICS_FLUSH_INTERVAL: float = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1.0"))
+    ANALYTICS_MAX_BYTES: int = int(os.getenv("ANALYTICS_MAX_BYTES", str(50 * 1024 * 1024)))
+    ANALYTICS_BACKUP_COUNT: int = int(os.getenv("ANALYTICS_BACKUP_COUNT", "5"))
+    # Per-transcript stage tracing; transcripts slower than TRACE_SLOW_MS are sampled
+    # (TRACE_SAMPLE_RATE) into a rotating JSONL log with their stage breakdown
+    TRACING: bool = os.getenv("TRACING", "false").lower() in ("1", "true", "yes")
+    TRACE_SLOW_MS: float = float(os.getenv("TRACE_SLOW_MS", "100"))
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+    TRACE_LOG_FILE: str = os.getenv("TRACE_LOG_FILE", "bot_slow_transcripts.jsonl")
+    TRACE_LOG_MAX_BYTES: int = int(os.getenv("TRACE_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    TRACE_LOG_BACKUP_COUNT: int = int(os.getenv("TRACE_LOG_BACKUP_COUNT", "3"))
 
 settings = Settings()
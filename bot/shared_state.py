@@ -0,0 +1,242 @@
+# bot/shared_state.py
+"""
+Node-local state shared by every worker process: atomic counters and a
+bounded key-value store in one memory-mapped file.
+
+The file is a fixed table of `slots` slots in sets of WAYS. A key (hashed
+to 16 bytes) lives in one set and may take any slot of it, so a lookup
+reads at most WAYS slots. Inserting into a full set evicts the entry that
+expires soonest, which bounds the table; with one TTL per kind of entry
+that is the least recently written. Each operation holds its set's lock: a
+POSIX byte-range lock on the file between processes, and a thread lock
+within one.
+
+Without a path the table is an anonymous map private to the process, with
+the same behaviour, which is the default when workers share nothing.
+"""
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+MAGIC = b"BOTSTATE1\x00\x00\x00"
+# magic, slot count, ways per set, value bytes per slot
+HEADER = struct.Struct("<12sIII")
+HEADER_SIZE = 64
+# key digest, expiry (wall clock, 0 = never), counter, value length
+SLOT = struct.Struct("<16sdqI4x")
+COUNTER = struct.Struct("<q")
+WAYS = 8
+EMPTY = bytes(16)
+
+# Thread locks per map; sets share them round-robin
+LOCK_STRIPES = 64
+
+
+class SharedState:
+    """
+    Counters and byte values keyed by string, shared by every process that
+    opens the same `path`. Values are at most `value_bytes` long. Entries
+    with a `ttl` expire that many seconds after they were written; entries
+    without one stay until evicted or deleted. Open a file once per process:
+    closing any descriptor drops the process's locks on it.
+    """
+
+    def __init__(self, path: Optional[str] = None, slots: int = 131072, value_bytes: int = 472,
+                 clock: Callable[[], float] = time.time):
+        self.path = path
+        self.sets = max(1, slots // WAYS)
+        self.slots = self.sets * WAYS
+        self.value_bytes = value_bytes
+        self.slot_size = SLOT.size + value_bytes
+        self._set_size = self.slot_size * WAYS
+        self._clock = clock
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.evictions = 0
+        size = HEADER_SIZE + self.slots * self.slot_size
+        self._fd: Optional[int] = None
+        if path is None:
+            self._map = mmap.mmap(-1, size)
+        else:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                self._open_file(size)
+                self._map = mmap.mmap(self._fd, size)
+            except BaseException:
+                os.close(self._fd)
+                raise
+
+    def _open_file(self, size: int) -> None:
+        # The first process to get here lays the table out; the rest check it matches
+        header = HEADER.pack(MAGIC, self.slots, WAYS, self.value_bytes)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, 0)
+        try:
+            existing = os.pread(self._fd, HEADER.size, 0)
+            if existing[:len(MAGIC)] != MAGIC:
+                os.ftruncate(self._fd, 0)
+                os.ftruncate(self._fd, size)
+                os.pwrite(self._fd, header, 0)
+            elif existing != header:
+                raise ValueError(f"{self.path} holds a table of another shape; remove it or match its settings")
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, 0)
+
+    # ------------------------------
+    # Locking and lookup
+    # ------------------------------
+    def _locate(self, key: str) -> Tuple[bytes, int, int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        index = int.from_bytes(digest[:8], "little") % self.sets
+        return digest, index, HEADER_SIZE + index * self._set_size
+
+    def _lock(self, index: int, base: int) -> threading.Lock:
+        lock = self._locks[index % LOCK_STRIPES]
+        lock.acquire()
+        if self._fd is not None:
+            try:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, base)
+            except BaseException:
+                lock.release()
+                raise
+        return lock
+
+    def _unlock(self, lock: threading.Lock, base: int) -> None:
+        if self._fd is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, base)
+        lock.release()
+
+    def _find(self, base: int, digest: bytes, now: float) -> Tuple[Optional[int], int, bool]:
+        """
+        (offset of the key's live slot or None, offset to write a new entry
+        at, whether writing there evicts a live entry). The write offset is
+        the key's expired slot, a free slot, or else the slot that expires
+        soonest.
+        """
+        target, target_expires = base, float("inf")
+        for offset in range(base, base + self._set_size, self.slot_size):
+            slot_digest, expires = SLOT.unpack_from(self._map, offset)[:2]
+            dead = slot_digest == EMPTY or 0 < expires <= now
+            if slot_digest == digest:
+                return (None if dead else offset), offset, False
+            if dead:
+                if target_expires >= 0:
+                    target, target_expires = offset, -1.0
+            elif 0 < expires < target_expires:
+                target, target_expires = offset, expires
+        return None, target, target_expires >= 0
+
+    def _expiry(self, ttl: float, now: float) -> float:
+        return now + ttl if ttl > 0 else 0.0
+
+    # ------------------------------
+    # Counters
+    # ------------------------------
+    def incr(self, key: str, amount: int = 1, ttl: float = 0) -> int:
+        """Add `amount` to the counter and return the new value; a new counter starts at 0 and expires after `ttl`"""
+        digest, index, base = self._locate(key)
+        lock = self._lock(index, base)
+        try:
+            now = self._clock()
+            live, offset, evicts = self._find(base, digest, now)
+            if live is not None:
+                value = COUNTER.unpack_from(self._map, live + 24)[0] + amount
+                COUNTER.pack_into(self._map, live + 24, value)
+                return value
+            self.evictions += evicts
+            SLOT.pack_into(self._map, offset, digest, self._expiry(ttl, now), amount, 0)
+            return amount
+        finally:
+            self._unlock(lock, base)
+
+    def counter(self, key: str) -> int:
+        """Current value of a counter, 0 if it does not exist"""
+        digest, index, base = self._locate(key)
+        lock = self._lock(index, base)
+        try:
+            live = self._find(base, digest, self._clock())[0]
+            return COUNTER.unpack_from(self._map, live + 24)[0] if live is not None else 0
+        finally:
+            self._unlock(lock, base)
+
+    # ------------------------------
+    # Key-value
+    # ------------------------------
+    def get(self, key: str) -> Optional[bytes]:
+        digest, index, base = self._locate(key)
+        lock = self._lock(index, base)
+        try:
+            live = self._find(base, digest, self._clock())[0]
+            if live is None:
+                return None
+            length = SLOT.unpack_from(self._map, live)[3]
+            return self._map[live + SLOT.size:live + SLOT.size + length]
+        finally:
+            self._unlock(lock, base)
+
+    def set(self, key: str, value: bytes, ttl: float = 0) -> None:
+        self._write(key, value, ttl, only_new=False)
+
+    def add(self, key: str, value: bytes, ttl: float = 0) -> bool:
+        """Store the value only if the key is absent (or expired); returns whether it was stored"""
+        return self._write(key, value, ttl, only_new=True)
+
+    def _write(self, key: str, value: bytes, ttl: float, only_new: bool) -> bool:
+        if len(value) > self.value_bytes:
+            raise ValueError(f"Value of {len(value)} bytes exceeds {self.value_bytes}")
+        digest, index, base = self._locate(key)
+        lock = self._lock(index, base)
+        try:
+            now = self._clock()
+            live, offset, evicts = self._find(base, digest, now)
+            if live is not None and only_new:
+                return False
+            if live is None:
+                self.evictions += evicts
+            self._map[offset + SLOT.size:offset + SLOT.size + len(value)] = value
+            SLOT.pack_into(self._map, offset, digest, self._expiry(ttl, now), 0, len(value))
+            return True
+        finally:
+            self._unlock(lock, base)
+
+    def delete(self, key: str) -> bool:
+        digest, index, base = self._locate(key)
+        lock = self._lock(index, base)
+        try:
+            live = self._find(base, digest, self._clock())[0]
+            if live is None:
+                return False
+            SLOT.pack_into(self._map, live, EMPTY, 0.0, 0, 0)
+            return True
+        finally:
+            self._unlock(lock, base)
+
+    # ------------------------------
+    # Housekeeping
+    # ------------------------------
+    def used(self) -> int:
+        """Live entries, by an unlocked scan of the whole table (approximate under writes)"""
+        now = self._clock()
+        used = 0
+        for offset in range(HEADER_SIZE, HEADER_SIZE + self.slots * self.slot_size, self.slot_size):
+            slot_digest, expires = SLOT.unpack_from(self._map, offset)[:2]
+            used += slot_digest != EMPTY and not 0 < expires <= now
+        return used
+
+    def stats(self) -> Dict[str, object]:
+        """Table shape, and live entries this process evicted"""
+        return {
+            "path": self.path,
+            "slots": self.slots,
+            "value_bytes": self.value_bytes,
+            "evictions": self.evictions,
+        }
+
+    def close(self) -> None:
+        self._map.close()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
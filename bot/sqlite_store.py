@@ -0,0 +1,244 @@
+# bot/sqlite_store.py
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .lead_store import LEAD_FIELDS, LeadRecord, city_key, phone_key, status_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leads (
+    lead_id TEXT PRIMARY KEY,
+    name TEXT,
+    phone TEXT,
+    phone_key TEXT,
+    city TEXT,
+    city_key TEXT,
+    source TEXT,
+    status TEXT NOT NULL,
+    status_key TEXT,
+    notes TEXT,
+    visit_time TEXT
+);
+CREATE INDEX IF NOT EXISTS leads_phone_key ON leads (phone_key);
+CREATE INDEX IF NOT EXISTS leads_status_key ON leads (status_key);
+CREATE INDEX IF NOT EXISTS leads_city_status_key ON leads (city_key, status_key);
+CREATE TABLE IF NOT EXISTS visits (
+    visit_id TEXT PRIMARY KEY,
+    lead_id TEXT NOT NULL,
+    visit_time TEXT,
+    notes TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS visits_lead_id ON visits (lead_id);
+"""
+
+# Statements are constant strings, so sqlite3's per-connection statement
+# cache keeps them prepared after first use.
+INSERT_LEAD = (
+    "INSERT OR REPLACE INTO leads "
+    "(lead_id, name, phone, phone_key, city, city_key, source, status, status_key, notes, visit_time) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+SELECT_LEAD = "SELECT " + ", ".join(LEAD_FIELDS) + " FROM leads"
+INSERT_VISIT = "INSERT OR REPLACE INTO visits (visit_id, lead_id, visit_time, notes, status) VALUES (?, ?, ?, ?, ?)"
+SELECT_VISIT = "SELECT visit_id, lead_id, visit_time, notes, status FROM visits WHERE visit_id = ?"
+
+# Columns derived from a field, kept in step by update()
+_KEY_COLUMNS = {
+    "phone": ("phone_key", phone_key),
+    "city": ("city_key", city_key),
+    "status": ("status_key", status_key),
+}
+
+
+class SQLiteLeadStore:
+    """
+    LeadStore with the same interface, persisted in SQLite (WAL mode).
+
+    Writes are grouped into transactions that commit every `commit_batch`
+    writes or `commit_interval` seconds, whichever comes first; reads in this
+    process see uncommitted writes, other processes see them after the
+    commit. One connection is shared by all threads behind a lock, and WAL
+    lets other processes read while this one writes.
+    """
+
+    def __init__(self, path: str, commit_batch: int = 100, commit_interval: float = 0.05):
+        self.path = path
+        self.commit_batch = max(1, commit_batch)
+        self.commit_interval = commit_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, cached_statements=256)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.executescript(SCHEMA)
+        self._pending = 0
+        self._first_pending = 0.0
+        self.commits = 0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="sqlite-flusher", daemon=True)
+        self._flusher.start()
+        self.visits = SQLiteVisits(self)
+
+    # ------------------------------
+    # Writes
+    # ------------------------------
+    def add(self, name: Optional[str], phone: Optional[str], city: Optional[str] = None, source: Optional[str] = None,
+            status: str = "NEW", lead_id: Optional[str] = None, **extra: Any) -> LeadRecord:
+        record = LeadRecord(lead_id or str(uuid.uuid4()), name, phone, city, source, status, **extra)
+        with self._lock:
+            self._write(INSERT_LEAD, (
+                record.lead_id, name, phone, phone_key(phone), city, city_key(city), source, status,
+                status_key(status), record.notes, record.visit_time,
+            ))
+        return record
+
+    def update(self, lead_id: str, **fields: Any) -> LeadRecord:
+        """Set fields on a lead; raises KeyError for unknown leads"""
+        unknown = set(fields) - set(LEAD_FIELDS[1:])
+        if unknown:
+            raise TypeError(f"Unknown lead fields: {', '.join(sorted(unknown))}")
+        columns = dict(fields)
+        for field, (column, key) in _KEY_COLUMNS.items():
+            if field in fields:
+                columns[column] = key(fields[field])
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        with self._lock:
+            cursor = self._write(f"UPDATE leads SET {assignments} WHERE lead_id = ?", (*columns.values(), lead_id))
+            if cursor.rowcount == 0:
+                raise KeyError(lead_id)
+            return self._get(lead_id)
+
+    def remove(self, lead_id: str) -> Optional[LeadRecord]:
+        with self._lock:
+            record = self._get(lead_id)
+            if record is not None:
+                self._write("DELETE FROM leads WHERE lead_id = ?", (lead_id,))
+        return record
+
+    def clear(self) -> None:
+        with self._lock:
+            self._write("DELETE FROM leads", ())
+            self._write("DELETE FROM visits", ())
+
+    # ------------------------------
+    # Reads
+    # ------------------------------
+    def get(self, lead_id: str) -> Optional[LeadRecord]:
+        with self._lock:
+            return self._get(lead_id)
+
+    def __getitem__(self, lead_id: str) -> LeadRecord:
+        record = self.get(lead_id)
+        if record is None:
+            raise KeyError(lead_id)
+        return record
+
+    def __contains__(self, lead_id: object) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM leads WHERE lead_id = ?", (lead_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+
+    def find_by_phone(self, phone: str) -> List[LeadRecord]:
+        return self.find(phone=phone)
+
+    def find_by_city(self, city: str) -> List[LeadRecord]:
+        return self.find(city=city)
+
+    def find_by_status(self, status: str) -> List[LeadRecord]:
+        return self.find(status=status)
+
+    def find(self, phone: Optional[str] = None, city: Optional[str] = None, status: Optional[str] = None,
+             limit: Optional[int] = None) -> List[LeadRecord]:
+        """Leads matching every given filter, oldest first"""
+        clauses, params = [], []
+        for column, value in (("phone_key", phone_key(phone)), ("city_key", city_key(city)), ("status_key", status_key(status))):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = SELECT_LEAD
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY rowid"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(max(0, limit))
+        with self._lock:
+            return [LeadRecord(*row) for row in self._conn.execute(sql, params)]
+
+    # ------------------------------
+    # Transactions
+    # ------------------------------
+    def flush(self) -> None:
+        """Commit pending writes now"""
+        with self._lock:
+            self._commit()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._flusher.join(timeout=1)
+        with self._lock:
+            self._commit()
+            self._conn.close()
+
+    def _get(self, lead_id: str) -> Optional[LeadRecord]:
+        row = self._conn.execute(SELECT_LEAD + " WHERE lead_id = ?", (lead_id,)).fetchone()
+        return LeadRecord(*row) if row else None
+
+    def _write(self, sql: str, params) -> sqlite3.Cursor:
+        # Caller holds the lock
+        if self._pending == 0:
+            self._conn.execute("BEGIN")
+            self._first_pending = time.monotonic()
+        cursor = self._conn.execute(sql, params)
+        self._pending += 1
+        if self._pending >= self.commit_batch:
+            self._commit()
+        return cursor
+
+    def _commit(self) -> None:
+        if self._pending:
+            self._conn.execute("COMMIT")
+            self._pending = 0
+            self.commits += 1
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.commit_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._first_pending >= self.commit_interval:
+                    self._commit()
+
+
+class SQLiteVisits:
+    """Dict-style access to the visits table (`visits[visit_id] = {...}`)"""
+
+    def __init__(self, store: SQLiteLeadStore):
+        self._store = store
+
+    def __setitem__(self, visit_id: str, visit: Dict[str, Any]) -> None:
+        visit_time = visit.get("visit_time")
+        with self._store._lock:
+            self._store._write(INSERT_VISIT, (
+                visit_id, visit["lead_id"], visit_time.isoformat() if hasattr(visit_time, "isoformat") else visit_time,
+                visit.get("notes"), visit.get("status"),
+            ))
+
+    def __getitem__(self, visit_id: str) -> Dict[str, Any]:
+        with self._store._lock:
+            row = self._store._conn.execute(SELECT_VISIT, (visit_id,)).fetchone()
+        if row is None:
+            raise KeyError(visit_id)
+        return dict(zip(("visit_id", "lead_id", "visit_time", "notes", "status"), row))
+
+    def __contains__(self, visit_id: object) -> bool:
+        with self._store._lock:
+            return self._store._conn.execute("SELECT 1 FROM visits WHERE visit_id = ?", (visit_id,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._store._lock:
+            return self._store._conn.execute("SELECT COUNT(*) FROM visits").fetchone()[0]
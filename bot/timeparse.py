@@ -0,0 +1,190 @@
+# bot/timeparse.py
+"""
+Tiered resolver for visit-time phrases.
+
+1. ISO-8601 strings go straight to datetime.fromisoformat.
+2. Common relative forms ("3 pm tomorrow", "next Monday 5pm", "today at
+   17:30") are handled by a small precompiled grammar.
+3. Anything else falls back to dateparser, and only when the phrase has
+   something that looks like a date or time in it and is at most
+   FALLBACK_MAX_LEN characters. dateparser only tries VISIT_TIME_LANGUAGES:
+   with language detection on, a phrase of bare numbers ("1 1 1") takes
+   seconds.
+
+Results are cached on (normalized phrase, reference date). dateparser is
+imported on first use; call warm_up() at startup to pay that cost up front.
+"""
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from .settings import settings
+
+# None until first use, False if dateparser is not installed
+_dateparser = None
+
+ISO_RE = re.compile(
+    r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?(?:Z|[+-]\d{2}:?\d{2})?"
+)
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0, "tuesday": 1, "tue": 1, "tues": 1, "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thurs": 3, "friday": 4, "fri": 4, "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+}
+DAY_OFFSETS = {"today": 0, "tonight": 0, "tomorrow": 1, "day after tomorrow": 2}
+
+_TIME = (
+    r"(?:(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*(?P<ampm>a\.?m\.?|p\.?m\.?)"
+    r"|(?P<hour24>\d{1,2}):(?P<minute24>\d{2})"
+    r"|(?P<named>noon|midnight))"
+)
+_DAY = (
+    r"(?:(?P<offset>day after tomorrow|today|tonight|tomorrow)"
+    r"|(?:(?P<which>this|next)\s+)?(?P<weekday>" + "|".join(sorted(WEEKDAYS, key=len, reverse=True)) + r"))"
+)
+RELATIVE_PATTERNS = [
+    re.compile(r"(?:on\s+)?" + _DAY + r"(?:\s+at)?\s+" + _TIME),
+    re.compile(r"(?:at\s+)?" + _TIME + r"(?:\s+on)?\s+" + _DAY),
+    re.compile(r"(?:at\s+)?" + _TIME),
+]
+
+# Words without which dateparser is never tried
+TIME_HINT_RE = re.compile(
+    r"\d|\b(?:today|tonight|tomorrow|yesterday|now|noon|midnight|morning|afternoon|evening|night"
+    r"|day|days|week|weeks|month|months|year|years|hour|hours|minute|minutes"
+    r"|jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec|january|february|march|april|june"
+    r"|july|august|september|october|november|december|" + "|".join(WEEKDAYS) + r")\b"
+)
+# Phrases relative to the current clock time are never cached
+CLOCK_RELATIVE_RE = re.compile(r"\b(?:now|ago|hours?|hrs?|minutes?|mins?|seconds?|secs?)\b")
+
+_TRAILING_PUNCT = " .,;!?"
+
+# Longer phrases are not sent to dateparser; its cost grows with the phrase
+FALLBACK_MAX_LEN = 100
+LANGUAGES = [language.strip() for language in settings.VISIT_TIME_LANGUAGES.split(",") if language.strip()]
+
+
+def normalize_phrase(phrase: str) -> str:
+    return " ".join(phrase.lower().split()).strip(_TRAILING_PUNCT)
+
+
+def _parse_iso(key: str) -> Optional[str]:
+    if not ISO_RE.fullmatch(key.upper()):
+        return None
+    try:
+        return datetime.fromisoformat(key.upper()).isoformat()
+    except ValueError:
+        return None
+
+
+def _clock(match: re.Match) -> Optional[time]:
+    if match.group("named"):
+        return time(12) if match.group("named") == "noon" else time(0)
+    if match.group("hour24") is not None:
+        hour, minute = int(match.group("hour24")), int(match.group("minute24"))
+    else:
+        hour, minute = int(match.group("hour")), int(match.group("minute") or 0)
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if match.group("ampm").startswith("p") else 0)
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def _day(match: re.Match, reference: date) -> date:
+    if "offset" not in match.re.groupindex:
+        return reference
+    if match.group("offset"):
+        return reference + timedelta(days=DAY_OFFSETS[match.group("offset")])
+    weekday = WEEKDAYS[match.group("weekday")]
+    if match.group("which") == "next":
+        # "next monday": the first one strictly after today
+        ahead = (weekday - reference.weekday() - 1) % 7 + 1
+    else:
+        # "monday" / "this monday": today or the next one coming up
+        ahead = (weekday - reference.weekday()) % 7
+    return reference + timedelta(days=ahead)
+
+
+def _parse_relative(key: str, reference: date) -> Optional[str]:
+    for pattern in RELATIVE_PATTERNS:
+        match = pattern.fullmatch(key)
+        if match:
+            clock = _clock(match)
+            if clock is None:
+                return None
+            return datetime.combine(_day(match, reference), clock).isoformat()
+    return None
+
+
+def _load_dateparser():
+    global _dateparser
+    if _dateparser is None:
+        try:
+            import dateparser
+            _dateparser = dateparser
+        except ImportError:
+            _dateparser = False
+    return _dateparser or None
+
+
+def _parse_fallback(key: str, base: datetime) -> Optional[str]:
+    if len(key) > FALLBACK_MAX_LEN or not TIME_HINT_RE.search(key):
+        return None
+    dateparser = _load_dateparser()
+    if dateparser is None:
+        return None
+    try:
+        parsed = dateparser.parse(
+            key, languages=LANGUAGES or None,
+            settings={"RELATIVE_BASE": base, "PREFER_DATES_FROM": "future"},
+        )
+    except Exception:
+        return None
+    return parsed.isoformat() if parsed else None
+
+
+def _resolve(key: str, base: datetime) -> Optional[str]:
+    return (
+        _parse_iso(key)
+        or _parse_relative(key, base.date())
+        or _parse_fallback(key, base)
+    )
+
+
+@lru_cache(maxsize=settings.TIME_CACHE_SIZE)
+def _resolve_for_day(key: str, day: date) -> Optional[str]:
+    return _resolve(key, datetime.combine(day, time()))
+
+
+def resolve_time(phrase: str, reference: Optional[datetime] = None, fallback: bool = True) -> Optional[str]:
+    """
+    Resolve a time phrase to an ISO-8601 string, or None if it cannot be
+    understood. Relative phrases resolve against `reference` (default: now).
+    With `fallback` off only the ISO and grammar tiers run, so the call
+    never reaches dateparser.
+    """
+    key = normalize_phrase(phrase or "")
+    if not key:
+        return None
+    reference = reference or datetime.now()
+    if not fallback:
+        return _parse_iso(key) or _parse_relative(key, reference.date())
+    if CLOCK_RELATIVE_RE.search(key):
+        return _resolve(key, reference)
+    return _resolve_for_day(key, reference.date())
+
+
+def warm_up() -> None:
+    """Import dateparser and load its language data ahead of the first request"""
+    dateparser = _load_dateparser()
+    if dateparser is not None:
+        dateparser.parse("tomorrow at 5pm", languages=LANGUAGES or None)
+
+
+def cache_info():
+    return _resolve_for_day.cache_info()
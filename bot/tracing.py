@@ -0,0 +1,111 @@
+# bot/tracing.py
+import atexit
+import functools
+import inspect
+import random
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from . import analytics
+from .settings import settings
+
+# The trace of the transcript being processed in this context, if tracing is on
+_current: ContextVar[Optional["Trace"]] = ContextVar("bot_trace", default=None)
+
+_slow_log: Optional[analytics.AnalyticsWriter] = None
+_slow_log_lock = threading.Lock()
+
+
+class Trace:
+    __slots__ = ("transcript", "started", "stages")
+
+    def __init__(self, transcript: str):
+        self.transcript = transcript
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def to_record(self, total: float) -> Dict[str, Any]:
+        return {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "transcript": self.transcript,
+            "total_ms": round(total * 1000, 3),
+            "stages": {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()},
+        }
+
+
+def record(stage: str, seconds: float) -> None:
+    """Add a stage timing to the current trace; a no-op when none is active."""
+    trace = _current.get()
+    if trace is not None:
+        trace.stages[stage] = trace.stages.get(stage, 0.0) + seconds
+
+
+def traced(fn):
+    """
+    Trace each call of `fn(transcript, ...)` when TRACING is on. Stages
+    recorded during the call are collected, and calls slower than
+    TRACE_SLOW_MS are sampled (TRACE_SAMPLE_RATE) into the slow log. With
+    tracing off, the wrapper only checks the setting.
+    """
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(transcript, *args, **kwargs):
+            if not settings.TRACING:
+                return await fn(transcript, *args, **kwargs)
+            token = _current.set(Trace(transcript))
+            try:
+                return await fn(transcript, *args, **kwargs)
+            finally:
+                _finish(token)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(transcript, *args, **kwargs):
+        if not settings.TRACING:
+            return fn(transcript, *args, **kwargs)
+        token = _current.set(Trace(transcript))
+        try:
+            return fn(transcript, *args, **kwargs)
+        finally:
+            _finish(token)
+    return wrapper
+
+
+def _finish(token) -> None:
+    trace = _current.get()
+    _current.reset(token)
+    total = time.perf_counter() - trace.started
+    if total * 1000 < settings.TRACE_SLOW_MS:
+        return
+    if settings.TRACE_SAMPLE_RATE < 1 and random.random() >= settings.TRACE_SAMPLE_RATE:
+        return
+    slow_log().submit(trace.to_record(total))
+
+
+def slow_log() -> analytics.AnalyticsWriter:
+    """The rotating JSONL log of slow transcripts, started on first use."""
+    global _slow_log
+    if _slow_log is None:
+        with _slow_log_lock:
+            if _slow_log is None:
+                _slow_log = analytics.AnalyticsWriter(
+                    settings.TRACE_LOG_FILE,
+                    max_queue=settings.ANALYTICS_QUEUE_SIZE,
+                    flush_interval=settings.ANALYTICS_FLUSH_INTERVAL,
+                    max_bytes=settings.TRACE_LOG_MAX_BYTES,
+                    backup_count=settings.TRACE_LOG_BACKUP_COUNT,
+                )
+                atexit.register(_slow_log.close)
+    return _slow_log
+
+
+def shutdown() -> None:
+    """Drain and close the slow log, if one was started."""
+    global _slow_log
+    with _slow_log_lock:
+        writer, _slow_log = _slow_log, None
+    if writer is not None:
+        writer.close()
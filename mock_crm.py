@@ -1,16 +1,30 @@
 # mock_crm.py
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from bot.lead_store import LeadStore
+from bot.settings import settings
+from bot.sqlite_store import SQLiteLeadStore
+from pydantic import BaseModel, Field, ValidationError
 from uuid import uuid4
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
+from contextlib import asynccontextmanager
+import socket
+import threading
+import time
 
-app = FastAPI(title="Mock CRM")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Commit anything still batched in the SQLite backend
+    if isinstance(LEADS, SQLiteLeadStore):
+        LEADS.flush()
+
+app = FastAPI(title="Mock CRM", lifespan=lifespan)
 
 class LeadCreate(BaseModel):
     name: str
     phone: str
-    city: str
+    city: Optional[str] = None
     source: Optional[str] = None
 
 class VisitCreate(BaseModel):
@@ -23,26 +37,112 @@ class LeadStatusUpdate(BaseModel):
 
     notes: Optional[str] = None
 
-LEADS = {}
-VISITS = {}
+def use_storage(kind: str = "memory", path: str = None):
+    """Point LEADS/VISITS at a fresh in-memory store or at a SQLite database"""
+    global LEADS, VISITS
+    if isinstance(globals().get("LEADS"), SQLiteLeadStore):
+        LEADS.close()
+    if kind == "sqlite":
+        LEADS = SQLiteLeadStore(
+            path or settings.MOCK_CRM_DB,
+            commit_batch=settings.MOCK_CRM_COMMIT_BATCH,
+            commit_interval=settings.MOCK_CRM_COMMIT_INTERVAL,
+        )
+        VISITS = LEADS.visits
+    else:
+        LEADS = LeadStore()
+        VISITS = {}
 
-@app.post("/crm/leads")
-def create_lead(payload: LeadCreate):
-    lead_id = str(uuid4())
-    LEADS[lead_id] = {**payload.dict(), "lead_id": lead_id, "status": "NEW"}
-    return {"lead_id": lead_id, "status": "NEW"}
+use_storage(settings.MOCK_CRM_STORAGE)
 
-@app.post("/crm/visits")
-def create_visit(payload: VisitCreate):
+class BatchRequest(BaseModel):
+    items: List[Dict[str, Any]]
+
+def _create_lead(payload: LeadCreate):
+    lead = LEADS.add(**payload.model_dump())
+    return {"lead_id": lead.lead_id, "status": lead.status}
+
+def _create_visit(payload: VisitCreate):
     if payload.lead_id not in LEADS:
         raise HTTPException(status_code=404, detail="Lead not found")
     visit_id = str(uuid4())
-    VISITS[visit_id] = {**payload.dict(), "visit_id": visit_id, "status": "SCHEDULED"}
+    VISITS[visit_id] = {**payload.model_dump(), "visit_id": visit_id, "status": "SCHEDULED"}
     return {"visit_id": visit_id, "status": "SCHEDULED"}
 
-@app.post("/crm/leads/{lead_id}/status")
-def update_lead_status(lead_id: str, payload: LeadStatusUpdate):
-    if lead_id not in LEADS:
+def _update_lead_status(lead_id: str, payload: LeadStatusUpdate):
+    try:
+        LEADS.update(lead_id, status=payload.status)
+    except KeyError:
         raise HTTPException(status_code=404, detail="Lead not found")
-    LEADS[lead_id]["status"] = payload.status
     return {"lead_id": lead_id, "status": payload.status}
+
+def _run_batch(items: List[Dict[str, Any]], handler):
+    """Apply handler to each item in order; one item failing does not fail the rest"""
+    results = []
+    for item in items:
+        try:
+            results.append({"ok": True, "status_code": 200, "result": handler(item)})
+        except ValidationError as e:
+            results.append({"ok": False, "status_code": 422, "error": e.errors(include_url=False, include_context=False)})
+        except HTTPException as e:
+            results.append({"ok": False, "status_code": e.status_code, "error": e.detail})
+    return {"results": results}
+
+@app.post("/crm/leads")
+def create_lead(payload: LeadCreate):
+    return _create_lead(payload)
+
+@app.get("/crm/leads")
+def find_leads(phone: Optional[str] = None, city: Optional[str] = None, status: Optional[str] = None, limit: int = 100):
+    """Leads matching every given filter (phone digits, city case-insensitive, status)"""
+    return {"leads": [lead.to_dict() for lead in LEADS.find(phone=phone, city=city, status=status, limit=limit)]}
+
+@app.get("/crm/leads/{lead_id}")
+def get_lead(lead_id: str):
+    lead = LEADS.get(lead_id)
+    if lead is None:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return lead.to_dict()
+
+@app.post("/crm/visits")
+def create_visit(payload: VisitCreate):
+    return _create_visit(payload)
+
+@app.post("/crm/leads/{lead_id}/status")
+def update_lead_status(lead_id: str, payload: LeadStatusUpdate):
+    return _update_lead_status(lead_id, payload)
+
+# ------------------------------
+# Bulk endpoints - partial success per item
+# ------------------------------
+@app.post("/crm/leads:batch")
+def create_leads_batch(payload: BatchRequest):
+    return _run_batch(payload.items, lambda item: _create_lead(LeadCreate.model_validate(item)))
+
+@app.post("/crm/visits:batch")
+def create_visits_batch(payload: BatchRequest):
+    return _run_batch(payload.items, lambda item: _create_visit(VisitCreate.model_validate(item)))
+
+@app.post("/crm/leads/status:batch")
+def update_lead_status_batch(payload: BatchRequest):
+    return _run_batch(
+        payload.items,
+        lambda item: _update_lead_status(str(item.get("lead_id")), LeadStatusUpdate.model_validate(item)),
+    )
+
+def serve_in_background(host: str = "127.0.0.1", port: int = 0):
+    """
+    Run the mock CRM with uvicorn on a daemon thread (for tests and benchmarks).
+    Returns (server, base_url); set `server.should_exit = True` to stop it.
+    """
+    import uvicorn
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning", access_log=False))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://{host}:{sock.getsockname()[1]}"
@@ -0,0 +1,20 @@
+# tests/conftest.py
+import pytest
+
+import mock_crm
+from bot import nlu
+
+
+@pytest.fixture(scope="session")
+def crm_server():
+    """The mock CRM served over real HTTP on a free local port."""
+    server, base_url = mock_crm.serve_in_background()
+    yield base_url
+    server.should_exit = True
+
+
+@pytest.fixture(autouse=True)
+def clear_nlu_cache():
+    """Tests that patch the NLU must not see results cached by earlier tests."""
+    nlu.RESULTS_CACHE.clear()
+    yield
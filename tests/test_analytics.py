@@ -0,0 +1,94 @@
+# tests/test_analytics.py
+import json
+import threading
+import time
+
+from bot.analytics import AnalyticsWriter
+
+
+def read_lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+# --- Test batching and drain ---
+def test_close_drains_queue(tmp_path):
+    path = tmp_path / "a.jsonl"
+    writer = AnalyticsWriter(str(path), batch_size=1000, flush_interval=60)
+    for i in range(50):
+        assert writer.submit({"i": i})
+    writer.close()
+    assert [r["i"] for r in read_lines(path)] == list(range(50))
+    assert writer.stats() == {"queued": 0, "written": 50, "dropped": 0}
+
+def test_flushes_on_batch_size(tmp_path):
+    path = tmp_path / "a.jsonl"
+    writer = AnalyticsWriter(str(path), batch_size=10, flush_interval=60)
+    for i in range(10):
+        writer.submit({"i": i})
+    deadline = time.monotonic() + 2
+    while writer.written < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(read_lines(path)) == 10
+    writer.close()
+
+def test_flushes_on_interval(tmp_path):
+    path = tmp_path / "a.jsonl"
+    writer = AnalyticsWriter(str(path), batch_size=1000, flush_interval=0.05)
+    writer.submit({"i": 1})
+    deadline = time.monotonic() + 2
+    while writer.written < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert read_lines(path) == [{"i": 1}]
+    writer.close()
+
+def test_close_timeout_leaves_file_to_the_worker(tmp_path):
+    path = tmp_path / "a.jsonl"
+    writer = AnalyticsWriter(str(path), batch_size=1, flush_interval=60)
+    writer.submit({"i": 0})
+    while writer.written < 1:
+        time.sleep(0.01)
+    release = threading.Event()
+    original_write = writer._write
+
+    def slow_write(batch):
+        release.wait(5)
+        original_write(batch)
+
+    writer._write = slow_write
+    thread = writer._thread
+    writer.submit({"i": 1})
+    writer.close(timeout=0.05)
+    assert thread.is_alive()
+    release.set()
+    thread.join(5)
+    assert [r["i"] for r in read_lines(path)] == [0, 1]
+    assert writer.written == 2 and writer._file is None
+
+# --- Test overflow ---
+def test_overflow_drops_instead_of_blocking(tmp_path):
+    writer = AnalyticsWriter(str(tmp_path / "a.jsonl"), max_queue=5, batch_size=1, flush_interval=60)
+    release = threading.Event()
+    original_write = writer._write
+
+    def slow_write(batch):
+        release.wait(5)
+        original_write(batch)
+
+    writer._write = slow_write
+    results = [writer.submit({"i": i}) for i in range(20)]
+    assert results.count(False) == writer.dropped
+    assert writer.dropped >= 20 - 5 - 1
+    release.set()
+    writer.close()
+    assert writer.written + writer.dropped == 20
+
+# --- Test rotation ---
+def test_rotates_by_size(tmp_path):
+    path = tmp_path / "a.jsonl"
+    writer = AnalyticsWriter(str(path), batch_size=1, flush_interval=60, max_bytes=200, backup_count=2)
+    for i in range(30):
+        writer.submit({"payload": "x" * 40, "i": i})
+    writer.close()
+    assert path.exists() and (tmp_path / "a.jsonl.1").exists() and (tmp_path / "a.jsonl.2").exists()
+    assert not (tmp_path / "a.jsonl.3").exists()
+    assert path.stat().st_size <= 200
+    assert read_lines(path)[-1]["i"] == 29
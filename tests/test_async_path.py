@@ -0,0 +1,102 @@
+# tests/test_async_path.py
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import mock_crm
+from bot import app as bot_app
+from bot.crm_client import AsyncHTTPCRMClient, CRMError
+
+CRM_DELAY = 0.2
+
+
+class SlowAsyncCRM:
+    """Async CRM stand-in whose every call takes CRM_DELAY seconds."""
+    async def create_lead(self, name, phone, city=None, source=None):
+        await asyncio.sleep(CRM_DELAY)
+        return {"lead_id": "slow-lead", "status": "NEW"}
+
+
+class SlowBlockingCRM:
+    """Blocking CRM stand-in, like a sync HTTP client on a slow network."""
+    blocking_io = True
+
+    def create_lead(self, name, phone, city=None, source=None):
+        time.sleep(CRM_DELAY)
+        return {"lead_id": "slow-lead", "status": "NEW"}
+
+
+async def timed_post(client, transcript):
+    start = time.perf_counter()
+    resp = await client.post("/bot/handle", json={"transcript": transcript})
+    return resp, time.perf_counter() - start
+
+
+async def fire(n):
+    transport = httpx.ASGITransport(app=bot_app.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bot") as client:
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            timed_post(client, f"Add a new lead: User {chr(65 + i % 26)} from Pune, phone 98765432{i % 10}0")
+            for i in range(n)
+        ])
+        return results, time.perf_counter() - start
+
+
+def p99(latencies):
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+
+# --- Load test: p99 latency under a slow CRM ---
+def test_slow_async_crm_does_not_serialize_requests(monkeypatch):
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", SlowAsyncCRM())
+    results, elapsed = asyncio.run(fire(50))
+    assert all(resp.status_code == 200 for resp, _ in results)
+    # Sequential handling would take 50 * CRM_DELAY = 10s
+    assert elapsed < 10 * CRM_DELAY
+    assert p99([latency for _, latency in results]) < 5 * CRM_DELAY
+
+def test_blocking_crm_runs_off_the_event_loop(monkeypatch):
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", None)
+    monkeypatch.setattr(bot_app, "crm_client_instance", SlowBlockingCRM())
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=bot_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot") as client:
+            slow = asyncio.create_task(timed_post(client, "Add a new lead: Slow User from Pune, phone 9876543210"))
+            await asyncio.sleep(0.02)
+            # A request that never touches the CRM must not wait behind the slow call
+            _, quick_latency = await timed_post(client, "Can you help me?")
+            (slow_resp, _) = await slow
+            return slow_resp, quick_latency
+
+    slow_resp, quick_latency = asyncio.run(scenario())
+    assert slow_resp.status_code == 200
+    assert quick_latency < CRM_DELAY / 2
+
+def test_nlu_pool_restarts_with_the_app(monkeypatch):
+    monkeypatch.setattr(bot_app.settings, "NLU_WORKERS", 2)
+    for _ in range(2):
+        with TestClient(bot_app.app) as client:
+            assert client.post("/bot/handle", json={"transcript": "Can you help me?"}).status_code == 200
+
+# --- Test async HTTP client ---
+def test_async_http_client_against_mock_crm(crm_server):
+    async def scenario():
+        client = AsyncHTTPCRMClient(crm_server)
+        try:
+            lead = await client.create_lead(name="Asha Rao", phone="9876543210", city="Pune")
+            visit = await client.schedule_visit(lead_id=lead["lead_id"], visit_time="2025-10-02T17:00:00+05:30")
+            with pytest.raises(CRMError) as exc:
+                await client.update_status(lead_id="missing", status="WON")
+            return lead, visit, exc.value
+        finally:
+            await client.aclose()
+
+    lead, visit, error = asyncio.run(scenario())
+    assert mock_crm.LEADS[lead["lead_id"]]["name"] == "Asha Rao"
+    assert visit["status"] == "SCHEDULED"
+    assert error.status_code == 404
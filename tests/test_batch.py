@@ -0,0 +1,87 @@
+# tests/test_batch.py
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot.settings import settings
+
+client = TestClient(bot_app.app)
+
+LEAD_A = "7b1b8f54-aaaa-bbbb-cccc-1234567890ab"
+LEAD_B = "65ce1c14-aaaa-bbbb-cccc-1234567890ab"
+
+
+class RecordingCRM:
+    """Async CRM stand-in that records call order and concurrency."""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = []
+
+    async def _call(self, label):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.calls.append(("start", label))
+        await asyncio.sleep(self.delay)
+        self.calls.append(("end", label))
+        self.in_flight -= 1
+
+    async def update_status(self, lead_id, status, notes=None):
+        await self._call((lead_id, status))
+        return {"lead_id": lead_id, "status": status}
+
+    async def create_lead(self, name, phone, city=None, source=None):
+        await self._call(name)
+        return {"lead_id": "new-lead", "status": "NEW"}
+
+# --- Test ordering and per-lead serialization ---
+def test_batch_keeps_order_and_serializes_per_lead(monkeypatch):
+    crm = RecordingCRM()
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+    transcripts = [
+        f"Update lead {LEAD_A} to in progress",
+        f"Update lead {LEAD_B} to lost",
+        f"Update lead {LEAD_A} to won",
+        "Can you help me?",
+        f"Update lead {LEAD_A} to follow up",
+    ]
+    resp = client.post("/bot/handle", json={"transcripts": transcripts})
+    assert resp.status_code == 200
+    responses = resp.json()["responses"]
+    assert [r["intent"] for r in responses] == ["LEAD_UPDATE", "LEAD_UPDATE", "LEAD_UPDATE", "UNKNOWN", "LEAD_UPDATE"]
+    assert [r["result"].get("status") for r in responses] == ["IN_PROGRESS", "LOST", "WON", "FAILED", "FOLLOW_UP"]
+    assert all(r["elapsed_ms"] >= 0 for r in responses)
+
+    # Calls for LEAD_A never overlap and follow input order
+    lead_a = [(event, status) for event, (lead, status) in crm.calls if lead == LEAD_A]
+    assert lead_a == [("start", "IN_PROGRESS"), ("end", "IN_PROGRESS"), ("start", "WON"), ("end", "WON"),
+                      ("start", "FOLLOW_UP"), ("end", "FOLLOW_UP")]
+    # LEAD_B ran alongside LEAD_A's chain
+    assert crm.max_in_flight == 2
+
+# --- Test concurrency limit ---
+def test_batch_respects_concurrency_limit(monkeypatch):
+    crm = RecordingCRM(delay=0.05)
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 4)
+    names = ["Asha", "Bina", "Chetan", "Deepa", "Esha", "Farhan", "Gita", "Hari", "Isha", "Jai", "Kiran", "Lata"]
+    transcripts = [f"Add a new lead: {name} from Pune, phone 9876543210" for name in names]
+
+    start = time.perf_counter()
+    responses = client.post("/bot/handle", json={"transcripts": transcripts}).json()["responses"]
+    elapsed = time.perf_counter() - start
+
+    assert [r["entities"]["name"] for r in responses] == names
+    assert crm.max_in_flight == 4
+    assert elapsed < len(names) * crm.delay
+
+# --- Test error items ---
+def test_batch_inlines_error_responses():
+    resp = client.post("/bot/handle", json={"transcripts": ["Create lead name Priya Nair, city Mumbai.", "Can you help me?"]})
+    first, second = resp.json()["responses"]
+    assert first["status_code"] == 400
+    assert first["error"]["type"] == "VALIDATION_ERROR"
+    assert second["intent"] == "UNKNOWN"
@@ -0,0 +1,112 @@
+# tests/test_classifier.py
+import asyncio
+import json
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bot import app as bot_app
+from bot import nlu
+from bot.classifier import IntentModel, accuracy, main, train
+
+EXAMPLES = {
+    "LEAD_CREATE": [
+        "please register {name} from {city}, number 98{n}",
+        "got an enquiry from {name} in {city} contact 98{n}",
+        "{name} from {city} is interested, reach at 98{n}",
+    ],
+    "LEAD_UPDATE": ["lead {id} is now won", "move {id} to lost", "{id} status should be follow up"],
+    "VISIT_SCHEDULE": [
+        "book a site tour for {id} at 3 pm tomorrow",
+        "arrange a property viewing for {id} at 10 am monday",
+        "{id} wants to see the flat at 5 pm today",
+    ],
+    "UNKNOWN": ["what's the weather like today", "tell me a joke", "can you play some music"],
+}
+NAMES = ["Rohan Sharma", "Priya Singh", "Amit Verma", "Neha Gupta"]
+CITIES = ["Gurgaon", "Noida", "Pune", "Jaipur"]
+
+
+def labeled():
+    texts, intents = [], []
+    for i in range(40):
+        for intent, templates in EXAMPLES.items():
+            template = templates[i % len(templates)]
+            texts.append(template.format(
+                name=NAMES[i % 4], city=CITIES[i // 4 % 4], n=f"{i * 7919:08d}", id=f"{i * 104729:08x}"))
+            intents.append(intent)
+    return texts, intents
+
+
+@pytest.fixture(scope="module")
+def model_file(tmp_path_factory):
+    texts, intents = labeled()
+    path = tmp_path_factory.mktemp("model") / "intent_model.bin"
+    train(texts, intents, bits=14, epochs=20).save(str(path))
+    return str(path)
+
+
+@pytest.fixture
+def with_model(model_file):
+    nlu.configure_model(IntentModel.load(model_file))
+    yield nlu.INTENT_MODEL
+    nlu.configure_model(None)
+
+# --- Test the model ---
+def test_loads_memory_mapped_and_fits_training_data(model_file):
+    model = IntentModel.load(model_file)
+    assert isinstance(model.weights, np.memmap)
+    assert model.labels == ["LEAD_CREATE", "LEAD_UPDATE", "UNKNOWN", "VISIT_SCHEDULE"]
+    assert accuracy(model, *labeled()) == 1.0
+
+def test_batch_scores_match_single_scores(model_file):
+    model = IntentModel.load(model_file)
+    texts = ["arrange a property viewing for 12ab34cd at noon", "", "tell me a story", "lead 9f9f9f9f is now lost"]
+    batch = model.predict(texts)
+    for text, (intent, confidence) in zip(texts, batch):
+        single_intent, single_confidence = model.classify_intent(text)
+        assert single_intent == intent and single_confidence == pytest.approx(confidence)
+    assert [intent for intent, _ in batch[::3]] == ["VISIT_SCHEDULE", "LEAD_UPDATE"]
+
+def test_cli_train_and_evaluate(tmp_path, capsys):
+    data = tmp_path / "labeled.jsonl"
+    data.write_text("".join(json.dumps({"transcript": t, "intent": i}) + "\n" for t, i in zip(*labeled())))
+    main(["train", str(data), "-o", str(tmp_path / "m.bin"), "--bits", "12", "--epochs", "5"])
+    main(["evaluate", str(data), "-m", str(tmp_path / "m.bin")])
+    assert "accuracy" in capsys.readouterr().err
+
+# --- Test nlu integration ---
+def test_keyword_rules_stay_the_fast_path(with_model):
+    assert nlu.classify_intent("Update lead 65ce1c14 to in progress") == ("LEAD_UPDATE", nlu.KEYWORD_CONFIDENCE)
+
+def test_model_classifies_keyword_misses(with_model):
+    intent, confidence = nlu.classify_intent("arrange a property viewing for 12ab34cd at 3 pm tomorrow")
+    assert intent == "VISIT_SCHEDULE" and 0.7 <= confidence < 1.0
+
+def test_classify_batch_scores_misses_in_one_call(with_model, monkeypatch):
+    calls = []
+    predict = with_model.predict
+    monkeypatch.setattr(with_model, "predict", lambda texts: calls.append(list(texts)) or predict(texts))
+    results = nlu.classify_batch([
+        "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210",
+        "book a site tour for 12ab34cd at 3 pm tomorrow",
+        "move 12ab34cd to lost",
+    ])
+    assert [intent for intent, _ in results] == ["LEAD_CREATE", "VISIT_SCHEDULE", "LEAD_UPDATE"]
+    assert calls == [["book a site tour for 12ab34cd at 3 pm tomorrow", "move 12ab34cd to lost"]]
+
+def test_batch_model_call_runs_off_the_event_loop(with_model, monkeypatch):
+    threads = []
+    predict = with_model.predict
+    monkeypatch.setattr(with_model, "predict", lambda texts: threads.append(threading.current_thread().name) or predict(texts))
+    monkeypatch.setattr(bot_app.settings, "NLU_WORKERS", 2)
+    results = asyncio.run(bot_app.process_batch(["move 12ab34cd to lost", "book a site tour for 12ab34cd at 3 pm tomorrow"]))
+    assert len(results) == 2
+    assert len(threads) == 1 and threads[0].startswith("nlu")
+
+def test_low_model_confidence_asks_to_rephrase(with_model, monkeypatch):
+    monkeypatch.setattr(with_model, "classify_intent", lambda text: ("LEAD_UPDATE", 0.4))
+    body = bot_app.process_single_transcript("flag the customer somehow")
+    assert body["intent"] == "UNKNOWN" and body["fallback"]
@@ -0,0 +1,83 @@
+# tests/test_crm_bulk.py
+from fastapi.testclient import TestClient
+
+import mock_crm
+from bot import app as bot_app
+from bot.crm_client import AsyncHTTPCRMClient, CRMError, HTTPCRMClient
+
+crm = TestClient(mock_crm.app)
+bot = TestClient(bot_app.app)
+
+# --- Test mock CRM bulk endpoints ---
+def test_bulk_endpoints_report_partial_success():
+    resp = crm.post("/crm/leads:batch", json={"items": [
+        {"name": "Asha", "phone": "9876543210", "city": "Pune"},
+        {"name": "Missing Phone", "city": "Pune"},
+    ]})
+    assert resp.status_code == 200
+    ok, bad = resp.json()["results"]
+    assert ok["ok"] and ok["result"]["status"] == "NEW"
+    assert not bad["ok"] and bad["status_code"] == 422
+    lead_id = ok["result"]["lead_id"]
+
+    results = crm.post("/crm/leads/status:batch", json={"items": [
+        {"lead_id": lead_id, "status": "WON"},
+        {"lead_id": "missing", "status": "WON"},
+    ]}).json()["results"]
+    assert [r["status_code"] for r in results] == [200, 404]
+    assert mock_crm.LEADS[lead_id]["status"] == "WON"
+
+    results = crm.post("/crm/visits:batch", json={"items": [
+        {"lead_id": lead_id, "visit_time": "2025-10-02T17:00:00+05:30"},
+        {"lead_id": "missing", "visit_time": "2025-10-02T17:00:00+05:30"},
+    ]}).json()["results"]
+    assert [r["status_code"] for r in results] == [200, 404]
+
+# --- Test bulk client ---
+def test_http_client_bulk(crm_server):
+    client = HTTPCRMClient(crm_server)
+    outcomes = client.bulk("create_lead", [
+        {"name": "Asha", "phone": "9876543210", "city": "Pune", "source": None},
+        {"name": "Bina", "phone": "9876543211", "city": None, "source": None},
+        {"name": "Chetan", "phone": None, "city": "Pune", "source": None},
+    ])
+    client.close()
+    # The bot creates leads without a city; only name and phone are required
+    assert outcomes[0]["status"] == outcomes[1]["status"] == "NEW"
+    assert mock_crm.LEADS[outcomes[1]["lead_id"]]["city"] is None
+    assert isinstance(outcomes[2], CRMError) and outcomes[2].status_code == 422
+
+# --- Test batch requests coalesce into bulk calls ---
+def test_batch_request_uses_bulk_calls(monkeypatch, crm_server):
+    client = AsyncHTTPCRMClient(crm_server)
+    paths = []
+    original_post = client._post
+
+    async def counting_post(path, payload, timeout):
+        paths.append(path)
+        return await original_post(path, payload, timeout)
+
+    client._post = counting_post
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", client)
+
+    resp = bot.post("/bot/handle", json={"transcripts": [
+        f"Add a new lead: {name} from Pune, phone 9876543210" for name in ("Asha", "Bina", "Chetan", "Deepa")
+    ]})
+    responses = resp.json()["responses"]
+    assert [r["result"]["status"] for r in responses] == ["NEW"] * 4
+    assert paths == ["/crm/leads:batch"]
+
+    lead_a, lead_b = responses[0]["result"]["lead_id"], responses[1]["result"]["lead_id"]
+    paths.clear()
+    responses = bot.post("/bot/handle", json={"transcripts": [
+        f"Update lead {lead_a} to in progress",
+        f"Update lead {lead_b} to lost",
+        f"Update lead {lead_a} to won",
+        "Update lead 12345678 to won",
+    ]}).json()["responses"]
+    # Second update of lead_a goes into a second round
+    assert paths == ["/crm/leads/status:batch", "/crm/leads/status:batch"]
+    assert [r.get("status_code", 200) for r in responses] == [200, 200, 200, 502]
+    assert responses[3]["error"]["type"] == "CRM_ERROR"
+    assert mock_crm.LEADS[lead_a]["status"] == "WON"
+    assert mock_crm.LEADS[lead_b]["status"] == "LOST"
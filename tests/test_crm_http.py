@@ -0,0 +1,92 @@
+# tests/test_crm_http.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+import mock_crm
+from bot import app as bot_app
+from bot.crm_client import AsyncHTTPCRMClient, CRMError, HTTPCRMClient
+
+
+@pytest.fixture
+def http_client(crm_server):
+    client = HTTPCRMClient(crm_server, max_connections=4, max_keepalive_connections=2)
+    yield client
+    client.close()
+
+# --- Test CRM round trips ---
+def test_create_schedule_update(http_client):
+    lead = http_client.create_lead(name="Asha Rao", phone="9876543210", city="Pune", source="Instagram")
+    assert lead["status"] == "NEW"
+    assert mock_crm.LEADS[lead["lead_id"]]["city"] == "Pune"
+
+    visit = http_client.schedule_visit(lead_id=lead["lead_id"], visit_time="2025-10-02T17:00:00+05:30")
+    assert visit["status"] == "SCHEDULED"
+
+    updated = http_client.update_status(lead_id=lead["lead_id"], status="WON", notes="booked")
+    assert updated == {"lead_id": lead["lead_id"], "status": "WON"}
+
+def test_connections_are_reused(http_client):
+    for _ in range(5):
+        http_client.create_lead(name="Asha Rao", phone="9876543210", city="Pune")
+    connections = http_client._client._transport._pool.connections
+    assert len(connections) == 1
+
+# --- Test error mapping ---
+def test_http_errors_map_to_crm_error(http_client):
+    with pytest.raises(CRMError) as exc:
+        http_client.update_status(lead_id="missing", status="WON")
+    assert exc.value.status_code == 404
+    assert "Lead not found" in exc.value.message
+
+    with pytest.raises(CRMError) as exc:
+        http_client.update_status(lead_id="missing", status="MAYBE")
+    assert exc.value.status_code == 422
+
+def test_unreachable_crm_maps_to_503():
+    client = HTTPCRMClient("http://127.0.0.1:9", timeout=0.5)
+    with pytest.raises(CRMError) as exc:
+        client.create_lead(name="Asha", phone="9876543210", city="Pune")
+    assert exc.value.status_code in (503, 504)
+    client.close()
+
+def test_non_json_success_maps_to_502():
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, text="<html>proxy login</html>"))
+    client = HTTPCRMClient("http://crm", transport=transport)
+    with pytest.raises(CRMError) as exc:
+        client.create_lead(name="Asha", phone="9876543210", city="Pune")
+    assert exc.value.status_code == 502 and not exc.value.retryable
+    client.close()
+
+# --- Test the async client ---
+def test_async_client_replaced_and_closed_on_new_loop(crm_server):
+    client = AsyncHTTPCRMClient(crm_server)
+    asyncio.run(client.create_lead(name="Asha Rao", phone="9876543210", city="Pune"))
+    first = client._client
+
+    async def second_loop():
+        await client.create_lead(name="Asha Rao", phone="9876543210", city="Pune")
+        assert first.is_closed and client._client is not first and not client._client.is_closed
+        await client.aclose()
+
+    asyncio.run(second_loop())
+
+# --- Test the bot against the HTTP CRM ---
+def test_bot_handle_over_http(monkeypatch, http_client):
+    monkeypatch.setattr(bot_app, "crm_client_instance", http_client)
+    client = TestClient(bot_app.app)
+
+    resp = client.post("/bot/handle", json={"transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"})
+    assert resp.status_code == 200
+    lead_id = resp.json()["result"]["lead_id"]
+    assert mock_crm.LEADS[lead_id]["name"] == "Rohan Sharma"
+
+    resp = client.post("/bot/handle", json={"transcript": f"Update lead {lead_id} to WON"})
+    assert resp.status_code == 200
+    assert mock_crm.LEADS[lead_id]["status"] == "WON"
+
+    resp = client.post("/bot/handle", json={"transcript": "Update lead 12345678 to WON"})
+    assert resp.status_code == 502
+    assert resp.json()["error"]["type"] == "CRM_ERROR"
@@ -0,0 +1,33 @@
+# tests/test_extract_entities.py
+from bot.app import extract_entities
+
+# --- Test LEAD_CREATE entities ---
+def test_extract_lead_create_entities():
+    entities = extract_entities("Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210, source Instagram.", "LEAD_CREATE")
+    assert entities["name"] == "Rohan Sharma"
+    assert entities["phone"] == "9876543210"
+    assert entities["city"] == "Gurgaon"
+    assert entities["source"] == "Instagram"
+
+def test_extract_phone_formats():
+    assert extract_entities("Add a new lead: Priya Nair from Mumbai, phone 91234-56789", "LEAD_CREATE")["phone"] == "9123456789"
+    assert extract_entities("New lead Amit contact 98 765 43 210", "LEAD_CREATE")["phone"] == "9876543210"
+
+def test_extract_city_keyword_fallback():
+    entities = extract_entities("Create lead name Priya Nair, city Mumbai.", "LEAD_CREATE")
+    assert entities["city"] == "Mumbai"
+    assert entities["phone"] is None
+
+# --- Test LEAD_UPDATE entities ---
+def test_extract_lead_update_status_priority():
+    # "won" outranks "new" regardless of position
+    entities = extract_entities("Update lead 65ce1c14 to new, actually won notes booked unit A2", "LEAD_UPDATE")
+    assert entities["lead_id"] == "65ce1c14"
+    assert entities["status"] == "WON"
+    assert entities["notes"] == "booked unit A2"
+
+# --- Test unknown intent ---
+def test_extract_unknown_intent_is_empty():
+    entities = extract_entities("Can you help me?", "UNKNOWN")
+    assert set(entities) == {"name", "phone", "city", "source", "lead_id", "visit_time", "notes", "status"}
+    assert all(v is None for v in entities.values())
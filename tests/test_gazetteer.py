@@ -0,0 +1,47 @@
+# tests/test_gazetteer.py
+import json
+
+from bot.gazetteer import CITIES, Gazetteer, load_gazetteer, tokenize
+from bot.nlu import classify_intent, extract_entities
+
+# --- Test matching ---
+def test_longest_match_and_whole_words():
+    gazetteer = Gazetteer.from_mapping({"Delhi": [], "New Delhi": [], "Navi Mumbai": [], "Mumbai": ["bombay"]})
+    assert gazetteer.find_all("moving from New Delhi to navi-mumbai, not Delhite") == ["New Delhi", "Navi Mumbai"]
+    assert gazetteer.find_all("Bombay then delhi") == ["Mumbai", "Delhi"]
+    assert gazetteer.find_all("new york") == []
+    assert len(gazetteer) == 5 and gazetteer.longest == 2
+
+def test_falls_back_to_shorter_entry_when_longer_path_dead_ends():
+    gazetteer = Gazetteer.from_mapping({"Greater Noida West": [], "Greater": [], "Noida": []})
+    assert gazetteer.find_all("greater noida east") == ["Greater", "Noida"]
+    assert list(gazetteer.scan(tokenize("in greater noida west"))) == [(1, 4, "Greater Noida West")]
+
+def test_find_after_cue():
+    gazetteer = Gazetteer.from_mapping(CITIES)
+    assert gazetteer.find("Ajmer Singh from Gurugram", cues=("from",)) == "Gurgaon"
+    assert gazetteer.find("Ajmer Singh called") == "Ajmer"
+    assert gazetteer.find("Ajmer Singh called", cues=("from",)) is None
+
+def test_file_extends_builtin_entries(tmp_path):
+    path = tmp_path / "cities.json"
+    path.write_text(json.dumps({"Springfield": ["springfeild"], "Pune": ["pcmc"]}))
+    gazetteer = load_gazetteer(CITIES, str(path))
+    assert gazetteer.find_all("springfeild, pcmc and poona") == ["Springfield", "Pune", "Pune"]
+
+# --- Test entity extraction ---
+def test_extracts_multi_word_and_alias_cities():
+    entities = extract_entities("Add a new lead: Asha Rao from New Delhi, phone 9876543210, source insta", "LEAD_CREATE")
+    assert entities["city"] == "New Delhi" and entities["source"] == "Instagram"
+    entities = extract_entities("Add a new lead Ravi from the Facebook ad, lives in Gurgoan, phone 9876543210 via walk in", "LEAD_CREATE")
+    assert entities["city"] == "Gurgaon" and entities["source"] == "Walk-in"
+
+def test_unknown_city_and_source_keep_the_raw_word():
+    entities = extract_entities("Add a new lead Asha from Springfield phone 9876543210 source Billboard", "LEAD_CREATE")
+    assert entities["city"] == "Springfield" and entities["source"] == "Billboard"
+
+def test_city_alias_in_a_name_is_not_a_city():
+    assert extract_entities("Add a new lead: Kashi Verma, phone 9876543210", "LEAD_CREATE")["city"] is None
+    entities = extract_entities("Add a new lead: Kashi Verma phone 9876543210", "LEAD_CREATE")
+    assert entities["name"] == "Kashi Verma" and entities["city"] is None
+    assert classify_intent("Kashi Verma 9876543210")[0] == "UNKNOWN"
@@ -0,0 +1,113 @@
+# tests/test_idempotency.py
+import asyncio
+import uuid
+
+import httpx
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot.crm_client import CRMError
+from bot.idempotency import IdempotencyStore
+
+client = TestClient(bot_app.app)
+
+CREATE = "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+
+
+class CountingCRM:
+    def __init__(self, delay=0.0, fail_first=False):
+        self.delay = delay
+        self.fail_first = fail_first
+        self.calls = 0
+
+    async def create_lead(self, name, phone, city=None, source=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail_first and self.calls == 1:
+            raise CRMError(503, "CRM unavailable")
+        return {"lead_id": str(uuid.uuid4()), "status": "NEW"}
+
+
+def use_crm(monkeypatch, crm):
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+    monkeypatch.setattr(bot_app, "idempotency_store", IdempotencyStore(max_keys=100, ttl=60))
+
+# --- Test replays ---
+def test_header_key_replays_without_calling_crm(monkeypatch):
+    crm = CountingCRM()
+    use_crm(monkeypatch, crm)
+    headers = {"Idempotency-Key": "req-1"}
+    first = client.post("/bot/handle", json={"transcript": CREATE}, headers=headers)
+    second = client.post("/bot/handle", json={"transcript": CREATE}, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert "idempotent-replayed" not in first.headers
+    assert second.headers["idempotent-replayed"] == "true"
+    assert crm.calls == 1
+
+    # No key: every request reaches the CRM
+    client.post("/bot/handle", json={"transcript": CREATE})
+    assert crm.calls == 2
+
+def test_metadata_key(monkeypatch):
+    crm = CountingCRM()
+    use_crm(monkeypatch, crm)
+    body = {"transcript": CREATE, "metadata": {"idempotency_key": "call-42"}}
+    lead_ids = {client.post("/bot/handle", json=body).json()["result"]["lead_id"] for _ in range(3)}
+    assert len(lead_ids) == 1 and crm.calls == 1
+
+def test_key_reuse_with_different_body_conflicts(monkeypatch):
+    use_crm(monkeypatch, CountingCRM())
+    headers = {"Idempotency-Key": "req-2"}
+    client.post("/bot/handle", json={"transcript": CREATE}, headers=headers)
+    resp = client.post("/bot/handle", json={"transcript": "Can you help me?"}, headers=headers)
+    assert resp.status_code == 422
+    assert resp.json()["error"]["type"] == "IDEMPOTENCY_CONFLICT"
+
+def test_failures_are_not_remembered(monkeypatch):
+    crm = CountingCRM(fail_first=True)
+    use_crm(monkeypatch, crm)
+    headers = {"Idempotency-Key": "req-3"}
+    assert client.post("/bot/handle", json={"transcript": CREATE}, headers=headers).status_code == 502
+    assert client.post("/bot/handle", json={"transcript": CREATE}, headers=headers).status_code == 200
+    assert crm.calls == 2
+
+# --- Test concurrent duplicates ---
+def test_concurrent_duplicates_call_crm_once(monkeypatch):
+    crm = CountingCRM(delay=0.05)
+    use_crm(monkeypatch, crm)
+
+    async def submit_all():
+        transport = httpx.ASGITransport(app=bot_app.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bot") as http:
+            return await asyncio.gather(*[
+                http.post("/bot/handle", json={"transcript": CREATE}, headers={"Idempotency-Key": "dup"})
+                for _ in range(20)
+            ])
+
+    responses = asyncio.run(submit_all())
+    assert crm.calls == 1
+    assert {r.status_code for r in responses} == {200}
+    assert len({r.json()["result"]["lead_id"] for r in responses}) == 1
+    assert sum(r.headers.get("idempotent-replayed") == "true" for r in responses) == 19
+
+# --- Test store bounds ---
+def test_store_is_bounded():
+    store = IdempotencyStore(max_keys=2, ttl=60)
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        return 200, {"n": len(calls)}
+
+    async def run(key):
+        return await store.run(key, "fp", produce)
+
+    async def scenario():
+        for key in ("a", "b", "c", "a"):
+            await run(key)
+
+    asyncio.run(scenario())
+    # "a" was evicted by "c" and ran again
+    assert len(calls) == 4
+    assert store.stats()["size"] == 2 and store.stats()["evictions"] == 2
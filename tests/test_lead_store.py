@@ -0,0 +1,84 @@
+# tests/test_lead_store.py
+import threading
+
+from fastapi.testclient import TestClient
+
+import mock_crm
+from bot.lead_store import LeadStore
+
+
+def ids(records):
+    return [record.lead_id for record in records]
+
+# --- Test indexes ---
+def test_secondary_indexes():
+    store = LeadStore()
+    a = store.add("Asha", "98765-43210", "Pune")
+    b = store.add("Bina", "9876543210", " pune ", status="WON")
+    c = store.add("Chetan", "9123456780", "Mumbai", source="Instagram")
+    assert ids(store.find_by_phone("98765 43210")) == [a.lead_id, b.lead_id]
+    assert ids(store.find_by_city("PUNE")) == [a.lead_id, b.lead_id]
+    assert ids(store.find_by_status("new")) == [a.lead_id, c.lead_id]
+    assert ids(store.find(city="pune", status="WON")) == [b.lead_id]
+    assert ids(store.find(phone="9876543210", city="Mumbai")) == []
+    assert ids(store.find(status="NEW", limit=1)) == [a.lead_id]
+    assert len(store.find()) == len(store) == 3
+
+def test_update_and_remove_keep_indexes_in_sync():
+    store = LeadStore()
+    lead = store.add("Asha", "9876543210", "Pune")
+    store.update(lead.lead_id, status="LOST", city="Mumbai", notes="moved")
+    assert store.find_by_city("Pune") == [] and store.find_by_status("NEW") == []
+    assert ids(store.find(city="Mumbai", status="LOST")) == [lead.lead_id]
+    assert store[lead.lead_id].notes == "moved"
+
+    store.remove(lead.lead_id)
+    assert lead.lead_id not in store
+    assert store.find_by_phone("9876543210") == [] and store.find_by_status("LOST") == []
+
+def test_status_spellings_share_an_index_entry():
+    store = LeadStore()
+    lead = store.add("Asha", "9876543210", "Pune", status="In Progress")
+    assert ids(store.find_by_status("IN_PROGRESS")) == ids(store.find_by_status("in-progress")) == [lead.lead_id]
+
+def test_records_are_slotted_and_support_item_access():
+    store = LeadStore()
+    lead = store.add("Asha", "9876543210", "Pune", lead_id="lead-1")
+    assert not hasattr(lead, "__dict__")
+    assert store["lead-1"]["city"] == "Pune" and lead.get("source", "n/a") == "n/a"
+    assert lead.to_dict()["status"] == "NEW"
+
+# --- Test concurrency ---
+def test_concurrent_writers_keep_indexes_consistent():
+    store = LeadStore()
+    leads = [store.add(f"Lead {i}", f"9{i:09d}", "Pune") for i in range(200)]
+    statuses = ["IN_PROGRESS", "FOLLOW_UP", "WON", "LOST"]
+
+    def worker(n):
+        for i in range(300):
+            store.add(f"T{n}", f"8{n}{i:08d}", ["Pune", "Delhi"][i % 2])
+            store.update(leads[(n * 300 + i) % 200].lead_id, status=statuses[i % 4])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(store) == 200 + 8 * 300
+    by_status = sum(len(store.find_by_status(s)) for s in ["NEW"] + statuses)
+    by_city = len(store.find_by_city("Pune")) + len(store.find_by_city("Delhi"))
+    assert by_status == by_city == len(store)
+    for lead in leads:
+        assert lead in store.find_by_status(lead.status)
+
+# --- Test mock CRM lookups ---
+def test_mock_crm_lead_queries():
+    crm = TestClient(mock_crm.app)
+    lead_id = crm.post("/crm/leads", json={"name": "Zoya", "phone": "9000000001", "city": "Shimla"}).json()["lead_id"]
+    crm.post(f"/crm/leads/{lead_id}/status", json={"status": "FOLLOW_UP"})
+    assert crm.get(f"/crm/leads/{lead_id}").json()["status"] == "FOLLOW_UP"
+    assert crm.get("/crm/leads/missing").status_code == 404
+    found = crm.get("/crm/leads", params={"city": "shimla", "status": "FOLLOW_UP"}).json()["leads"]
+    assert [lead["lead_id"] for lead in found] == [lead_id]
+    assert crm.get("/crm/leads", params={"phone": "9000000001"}).json()["leads"][0]["name"] == "Zoya"
@@ -0,0 +1,34 @@
+# tests/test_matcher.py
+import json
+import random
+
+from bot import nlu
+from bot.matcher import KeywordAutomaton
+
+# --- Test automaton matching ---
+def test_finds_overlapping_phrases():
+    automaton = KeywordAutomaton([("he", "A"), ("she", "B"), ("his", "C"), ("hers", "D")])
+    matches = sorted(automaton.iter_matches("ushers"))
+    assert matches == [(4, "he", "A"), (4, "she", "B"), (6, "hers", "D")]
+    assert automaton.find_labels("ushers") == {"A", "B", "D"}
+
+def test_agrees_with_substring_checks():
+    rng = random.Random(3)
+    for _ in range(200):
+        table = [("".join(rng.choice("ab ") for _ in range(rng.randint(1, 4))), str(i % 3)) for i in range(8)]
+        automaton = KeywordAutomaton(table)
+        text = "".join(rng.choice("abc ") for _ in range(rng.randint(0, 25)))
+        assert automaton.find_labels(text) == {label for phrase, label in table if phrase in text}
+
+# --- Test configurable phrase table ---
+def test_phrase_file_extends_intents(tmp_path):
+    path = tmp_path / "phrases.json"
+    path.write_text(json.dumps({"LEAD_CREATE": ["register a buyer"], "CALLBACK": ["call me back"]}))
+    original = nlu.load_intent_keywords()
+    try:
+        nlu.configure_intents(nlu.load_intent_keywords(str(path)))
+        assert nlu.classify_intent("Please register a buyer Asha phone 9876543210") == ("LEAD_CREATE", 0.95)
+        assert nlu.classify_intent("Could you call me back") == ("CALLBACK", 0.95)
+        assert nlu.classify_intent("Add lead Asha") == ("LEAD_CREATE", 0.95)
+    finally:
+        nlu.configure_intents(original)
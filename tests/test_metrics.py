@@ -0,0 +1,120 @@
+# tests/test_metrics.py
+import threading
+
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot import metrics
+from bot.crm_client import CRMError
+from bot.metrics import Counter, Gauge, Histogram, Registry
+from bot.resilience import CircuitBreaker, RetryBudget
+
+client = TestClient(bot_app.app)
+
+
+def sample(text, line_prefix):
+    """Value of the exposition line starting with line_prefix"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+# --- Test primitives ---
+def test_histogram_exposition():
+    registry = Registry()
+    hist = registry.register(Histogram("t_seconds", "Test", ["stage"], buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value, "a")
+    text = registry.render()
+    assert "# TYPE t_seconds histogram" in text
+    assert sample(text, 't_seconds_bucket{stage="a",le="0.1"}') == 2
+    assert sample(text, 't_seconds_bucket{stage="a",le="1.0"}') == 3
+    assert sample(text, 't_seconds_bucket{stage="a",le="+Inf"}') == 4
+    assert sample(text, 't_seconds_count{stage="a"}') == 4
+    assert abs(sample(text, 't_seconds_sum{stage="a"}') - 3.65) < 1e-9
+
+def test_counter_shards_sum_across_threads():
+    counter = Counter("t_total", "Test", ["kind"])
+
+    def work():
+        for _ in range(10000):
+            counter.inc("x")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.value("x") == 80000
+    assert 't_total{kind="x"} 80000' in "\n".join(counter.render())
+
+def test_label_values_are_escaped():
+    counter = Counter("t_total", "Test", ["v"])
+    counter.inc('a"b\\c')
+    assert 't_total{v="a\\"b\\\\c"} 1' in counter.render()
+
+def test_gauge_keeps_last_value():
+    gauge = Gauge("t_state", "Test", ["state"])
+    gauge.set(1, "open")
+    # A set from another thread replaces the value instead of adding to it
+    thread = threading.Thread(target=gauge.set, args=(0, "open"))
+    thread.start()
+    thread.join()
+    gauge.set(1, "closed")
+    lines = gauge.render()
+    assert "# TYPE t_state gauge" in lines
+    assert 't_state{state="open"} 0' in lines and 't_state{state="closed"} 1' in lines
+
+# --- Test /metrics ---
+def test_metrics_endpoint_records_stages():
+    before = metrics.REGISTRY.render()
+    client.post("/bot/handle", json={"transcripts": [
+        "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210",
+        "Schedule a visit for lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab at 3 pm tomorrow",
+    ]})
+    resp = client.get("/metrics")
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain")
+    text = resp.text
+
+    def grew(prefix):
+        return sample(text, prefix) - sample(before, prefix)
+
+    assert grew('bot_requests_total{intent="LEAD_CREATE"}') == 1
+    assert grew('bot_requests_total{intent="VISIT_SCHEDULE"}') == 1
+    assert grew('bot_stage_seconds_count{stage="intent"}') == 2
+    assert grew('bot_stage_seconds_count{stage="entities"}') == 2
+    assert grew('bot_stage_seconds_count{stage="datetime"}') == 1
+    assert grew('bot_stage_seconds_count{stage="crm"}') == 2
+    assert grew('bot_crm_responses_total{method="create_lead",status="200"}') == 1
+    assert grew('bot_batch_size_count{kind="request"}') == 1
+
+def test_crm_errors_count_by_status(monkeypatch):
+    class FailingCRM:
+        def create_lead(self, name, phone, city=None, source=None):
+            raise CRMError(500, "boom")
+
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", FailingCRM())
+    prefix = 'bot_crm_responses_total{method="create_lead",status="500"}'
+    before = sample(metrics.REGISTRY.render(), prefix)
+    client.post("/bot/handle", json={"transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"})
+    assert sample(client.get("/metrics").text, prefix) == before + 1
+
+def test_breaker_and_retry_budget_exported():
+    before = metrics.REGISTRY.render()
+    breaker = CircuitBreaker(min_calls=2, open_seconds=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.allow()
+    budget = RetryBudget(ratio=0.1, min_per_second=0, max_requests=10)
+    assert budget.try_retry() and not budget.try_retry()
+    text = client.get("/metrics").text
+
+    def grew(prefix):
+        return sample(text, prefix) - sample(before, prefix)
+
+    assert sample(text, 'bot_crm_breaker_state{state="open"}') == 1
+    assert sample(text, 'bot_crm_breaker_state{state="closed"}') == 0
+    assert grew("bot_crm_breaker_opened_total") == 1
+    assert grew("bot_crm_breaker_rejected_total") == 1
+    assert grew("bot_crm_retries_total") == 1
+    assert grew("bot_crm_retry_budget_exhausted_total") == 1
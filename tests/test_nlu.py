@@ -0,0 +1,49 @@
+# tests/test_nlu.py
+import json
+
+from bot import analytics, nlu
+
+# --- Test classification ---
+def test_classify_intent_priority():
+    assert nlu.classify_intent("Update lead 65ce1c14 to WON and schedule a visit at 5 pm") == ("VISIT_SCHEDULE", 0.95)
+    assert nlu.classify_intent("Update lead 65ce1c14 to in progress") == ("LEAD_UPDATE", 0.95)
+    assert nlu.classify_intent("Can you help me?") == ("UNKNOWN", 0.5)
+
+def test_phone_and_city_fallback():
+    intent, confidence = nlu.classify_intent("Rohan from Pune phone 9876543210")
+    assert intent == "LEAD_CREATE"
+    assert confidence == 0.7
+
+def test_transcript_is_normalized_once():
+    doc = nlu.prepare("  Add a new lead:   Rohan Sharma from Gurgaon,  phone 9876543210 ")
+    assert doc.text == "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+    assert nlu.prepare(doc) is doc
+    assert nlu.extract_entities(doc, "LEAD_CREATE")["name"] == "Rohan Sharma"
+
+# --- Test extract() shares work between stages ---
+def test_extract_runs_entity_extraction_once(monkeypatch, tmp_path):
+    writer = analytics.AnalyticsWriter(str(tmp_path / "analytics.jsonl"))
+    monkeypatch.setattr(analytics, "_default_writer", writer)
+    calls = []
+    original = nlu.ENTITY_EXTRACTORS["LEAD_CREATE"]
+
+    def counting(doc, entities):
+        calls.append(doc.text)
+        original(doc, entities)
+
+    monkeypatch.setitem(nlu.ENTITY_EXTRACTORS, "LEAD_CREATE", counting)
+
+    # Fallback classification needs LEAD_CREATE entities; extraction must reuse them
+    result = nlu.extract("Rohan from Pune phone 9876543210")
+    assert result["intent"] == "LEAD_CREATE"
+    assert result["entities"]["phone"] == "9876543210"
+    assert len(calls) == 1
+
+    writer.close()
+    record = json.loads((tmp_path / "analytics.jsonl").read_text().splitlines()[0])
+    assert record["intents"] == result["intents"]
+
+def test_extract_entities_returns_copy():
+    doc = nlu.prepare("Update lead 65ce1c14 to WON")
+    nlu.extract_entities(doc, "LEAD_UPDATE")["status"] = "LOST"
+    assert nlu.extract_entities(doc, "LEAD_UPDATE")["status"] == "WON"
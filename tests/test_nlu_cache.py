@@ -0,0 +1,98 @@
+# tests/test_nlu_cache.py
+from datetime import date, timedelta
+
+from bot import nlu
+from bot.app import analyze_transcript
+from bot.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# --- Test TTLCache ---
+def test_lru_eviction_and_counters():
+    cache = TTLCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1       # "b" is now least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 1, "evictions": 1, "expirations": 0, "invalidations": 0}
+
+def test_ttl_expiry_and_validation():
+    clock = FakeClock()
+    cache = TTLCache(max_size=10, ttl=5, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    assert cache.get("b", valid=lambda value: value != 2) is None
+    clock.now = 5.0
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["expirations"], stats["invalidations"], stats["size"]) == (1, 1, 0)
+
+def test_zero_size_disables_cache():
+    cache = TTLCache(max_size=0)
+    cache.put("a", 1)
+    assert cache.get("a") is None and len(cache) == 0
+
+# --- Test NLU results cache ---
+def counting_analyze(calls):
+    def analyze(doc):
+        calls.append(doc.text)
+        intent, confidence = nlu.classify_intent(doc)
+        return intent, confidence, nlu.extract_entities(doc, intent)
+    return analyze
+
+def test_identical_and_whitespace_variants_hit():
+    calls = []
+    analyze = counting_analyze(calls)
+    first = nlu.analyze_cached("Update lead 65ce1c14 to WON", analyze)
+    second = nlu.analyze_cached("  Update lead   65ce1c14 to WON\n", analyze)
+    assert first == second and len(calls) == 1
+    # Callers get their own entities dict
+    second[2]["status"] = "LOST"
+    assert nlu.analyze_cached("Update lead 65ce1c14 to WON", analyze)[2]["status"] == "WON"
+    assert nlu.cache_stats()["hits"] >= 2
+
+def test_visit_time_is_invalidated_when_the_date_changes(monkeypatch):
+    calls = []
+    analyze = counting_analyze(calls)
+    transcript = "Schedule a visit for lead 65ce1c14 at 5 pm tomorrow"
+    today = date.today()
+    monkeypatch.setattr(nlu, "_reference_day", lambda: today)
+    nlu.analyze_cached(transcript, analyze)
+    nlu.analyze_cached(transcript, analyze)
+    assert len(calls) == 1
+
+    monkeypatch.setattr(nlu, "_reference_day", lambda: today + timedelta(days=1))
+    nlu.analyze_cached(transcript, analyze)
+    assert len(calls) == 2
+    assert nlu.cache_stats()["invalidations"] == 1
+
+def test_date_independent_results_survive_date_change(monkeypatch):
+    calls = []
+    analyze = counting_analyze(calls)
+    nlu.analyze_cached("Can you help me?", analyze)
+    monkeypatch.setattr(nlu, "_reference_day", lambda: date.today() + timedelta(days=1))
+    nlu.analyze_cached("Can you help me?", analyze)
+    assert len(calls) == 1
+
+def test_clock_relative_visit_times_are_not_cached():
+    calls = []
+    analyze = counting_analyze(calls)
+    for _ in range(2):
+        nlu.analyze_cached("Schedule a visit for lead 65ce1c14 at 2 hours from now", analyze)
+    assert len(calls) == 2
+
+def test_reconfiguring_intents_clears_cache():
+    analyze_transcript("Update lead 65ce1c14 to WON")
+    assert len(nlu.RESULTS_CACHE) == 1
+    nlu.configure_intents(nlu.load_intent_keywords())
+    assert len(nlu.RESULTS_CACHE) == 0
@@ -0,0 +1,221 @@
+# tests/test_outbox.py
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot.crm_client import CRMError, CRMUnavailable
+from bot.outbox import Outbox
+from bot.settings import settings
+
+client = TestClient(bot_app.app)
+
+CREATE = "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+UPDATE = "Update lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab to in progress"
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+def transient(e):
+    return isinstance(e, CRMUnavailable)
+
+
+class FlakyCRM:
+    """Sync CRM stand-in that is unavailable while `down` is set"""
+    def __init__(self, down=True):
+        self.down = down
+        self.calls = []
+
+    def _call(self, method, **kwargs):
+        if self.down:
+            raise CRMUnavailable()
+        self.calls.append((method, kwargs))
+        return {"lead_id": kwargs.get("lead_id", "lead-1"), "status": "OK"}
+
+    def create_lead(self, name, phone, city=None, source=None):
+        return self._call("create_lead", name=name, phone=phone)
+
+    def update_status(self, lead_id, status, notes=None):
+        return self._call("update_status", lead_id=lead_id, status=status)
+
+
+@pytest.fixture
+def outbox_app(monkeypatch, tmp_path):
+    crm = FlakyCRM()
+    box = Outbox(str(tmp_path / "outbox.db"), bot_app.deliver_action, bot_app.outbox_transient, poll_interval=0.01)
+    monkeypatch.setattr(bot_app, "crm_client_instance", crm)
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", None)
+    monkeypatch.setattr(bot_app, "outbox_instance", box)
+    monkeypatch.setattr(settings, "OUTBOX_MODE", "fallback")
+    yield crm, box
+    box.close()
+
+# --- Test the queue ---
+def test_keeps_per_lead_order_across_transient_failures(tmp_path):
+    calls, failed_once = [], set()
+
+    def perform(method, kwargs):
+        key = kwargs["n"]
+        if key == "a1" and key not in failed_once:
+            failed_once.add(key)
+            raise CRMUnavailable()
+        calls.append(key)
+        return {"ok": key}
+
+    box = Outbox(str(tmp_path / "o.db"), perform, transient, poll_interval=0.01)
+    ids = [box.enqueue("m", {"n": n}, lead_key=n[0]) for n in ("a1", "b1", "a2", "b2", "a3")]
+    wait_until(lambda: box.stats()["done"] == 5)
+    assert [c for c in calls if c[0] == "a"] == ["a1", "a2", "a3"]
+    assert [c for c in calls if c[0] == "b"] == ["b1", "b2"]
+    assert box.get(ids[0])["attempts"] == 2 and box.get(ids[0])["result"] == {"ok": "a1"}
+    assert box.pending_for("a") == 0 and box.stats()["deferred"] == 1
+    box.close()
+
+def test_permanent_failure_does_not_block_lead(tmp_path):
+    def perform(method, kwargs):
+        if kwargs["n"] == 1:
+            raise CRMError(404, "Lead not found")
+        return {}
+
+    box = Outbox(str(tmp_path / "o.db"), perform, transient, poll_interval=0.01)
+    first, second = box.enqueue("m", {"n": 1}, "lead"), box.enqueue("m", {"n": 2}, "lead")
+    wait_until(lambda: box.stats()["done"] + box.stats()["failed"] == 2)
+    assert box.get(first)["status"] == "FAILED" and "Lead not found" in box.get(first)["error"]
+    assert box.get(second)["status"] == "DONE"
+    box.close()
+
+def test_survives_restart(tmp_path):
+    path = str(tmp_path / "o.db")
+    down = Outbox(path, lambda m, k: (_ for _ in ()).throw(CRMUnavailable()), transient, poll_interval=0.01)
+    tracking_id = down.enqueue("m", {"n": 1}, "lead")
+    down.close()
+
+    delivered = []
+    up = Outbox(path, lambda m, k: delivered.append(k) or {}, transient, poll_interval=0.01)
+    assert up.pending_for("lead") == 1
+    up.start()
+    wait_until(lambda: up.get(tracking_id)["status"] == "DONE")
+    assert delivered == [{"n": 1}]
+    up.close()
+
+def test_workers_sharing_a_database_deliver_each_action_once(tmp_path):
+    path = str(tmp_path / "o.db")
+    calls, calls_lock = [], threading.Lock()
+
+    def perform(method, kwargs):
+        time.sleep(0.001)
+        with calls_lock:
+            calls.append(kwargs["n"])
+        return {}
+
+    producer = Outbox(path, perform, transient)
+    expected = [f"{lead}{i}" for i in range(20) for lead in "abcd"]
+    for n in expected:
+        producer._conn.execute(
+            "INSERT INTO outbox (tracking_id, lead_key, method, kwargs, status, created, updated) "
+            "VALUES (?, ?, 'm', ?, 'PENDING', 0, 0)", (n, n[0], f'{{"n": "{n}"}}'))
+    workers = [Outbox(path, perform, transient, batch_size=7, poll_interval=0.01) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    wait_until(lambda: producer.stats()["done"] == len(expected))
+    assert sorted(calls) == sorted(expected)
+    for lead in "abcd":
+        assert [n for n in calls if n[0] == lead] == [f"{lead}{i}" for i in range(20)]
+    for box in (producer, *workers):
+        box.close()
+
+def test_lapsed_claim_is_redelivered(tmp_path):
+    path = str(tmp_path / "o.db")
+    delivered = []
+    crashed = Outbox(path, lambda m, k: {}, transient, lease=0.05)
+    crashed._conn.execute(
+        "INSERT INTO outbox (tracking_id, lead_key, method, kwargs, status, created, updated) "
+        "VALUES ('t1', 'lead', 'm', '{\"n\": 1}', 'PENDING', 0, 0)")
+    assert len(crashed._claim()) == 1               # claimed, then the worker dies
+    other = Outbox(path, lambda m, k: delivered.append(k) or {}, transient, lease=0.05)
+    assert other.drain_once() == (0, 0)             # the lead is still held
+    time.sleep(0.06)
+    assert other.drain_once() == (1, 0)
+    assert delivered == [{"n": 1}] and other.get("t1")["status"] == "DONE"
+    crashed.close()
+    other.close()
+
+# --- Test the bot endpoints ---
+def test_app_start_delivers_actions_queued_by_an_earlier_run(monkeypatch, tmp_path):
+    path = str(tmp_path / "outbox.db")
+    down = Outbox(path, bot_app.deliver_action, bot_app.outbox_transient)
+    down._conn.execute(
+        "INSERT INTO outbox (tracking_id, lead_key, method, kwargs, status, created, updated) VALUES "
+        "('t1', NULL, 'create_lead', '{\"name\": \"Asha\", \"phone\": \"9876543210\"}', 'PENDING', 0, 0)")
+    down.close()
+
+    crm = FlakyCRM(down=False)
+    monkeypatch.setattr(bot_app, "crm_client_instance", crm)
+    monkeypatch.setattr(bot_app, "outbox_instance", None)
+    monkeypatch.setattr(settings, "OUTBOX_MODE", "fallback")
+    monkeypatch.setattr(settings, "OUTBOX_DB", path)
+    with TestClient(bot_app.app):
+        wait_until(lambda: crm.calls == [("create_lead", {"name": "Asha", "phone": "9876543210"})])
+
+def test_fallback_accepts_when_crm_unavailable(outbox_app):
+    crm, box = outbox_app
+    resp = client.post("/bot/handle", json={"transcript": CREATE})
+    assert resp.status_code == 202
+    body = resp.json()
+    assert body["result"]["status"] == "ACCEPTED" and body["crm_call"]["queued"] is True
+    tracking_id = body["result"]["tracking_id"]
+    assert client.get(f"/bot/outbox/{tracking_id}").json()["status"] == "PENDING"
+
+    crm.down = False
+    wait_until(lambda: box.get(tracking_id)["status"] == "DONE")
+    status = client.get(f"/bot/outbox/{tracking_id}").json()
+    assert status["result"] == {"lead_id": "lead-1", "status": "OK"}
+    assert client.get("/bot/outbox/unknown").status_code == 404
+    assert client.get("/bot/metrics").json()["outbox"]["delivered"] == 1
+
+def test_later_actions_queue_behind_pending_ones(outbox_app):
+    crm, box = outbox_app
+    assert client.post("/bot/handle", json={"transcript": UPDATE}).status_code == 202
+    box._stop.set()  # park the worker so the queued action stays pending
+    box._wake.set()
+    box._thread.join()
+    # The CRM is back, but the lead still has a queued action: this one must not overtake it
+    crm.down = False
+    resp = client.post("/bot/handle", json={"transcript": UPDATE.replace("in progress", "won")})
+    assert resp.status_code == 202 and crm.calls == []
+    box.drain_once()
+    assert [kwargs["status"] for _, kwargs in crm.calls] == ["IN_PROGRESS", "WON"]
+
+def test_always_mode_skips_crm_on_request_path(outbox_app, monkeypatch):
+    crm, box = outbox_app
+    crm.down = False
+    monkeypatch.setattr(settings, "OUTBOX_MODE", "always")
+    resp = client.post("/bot/handle", json={"transcripts": [CREATE, UPDATE]})
+    assert [r["status_code"] for r in resp.json()["responses"]] == [202, 202]
+    wait_until(lambda: len(crm.calls) == 2)
+
+def test_off_mode_still_fails_fast(outbox_app, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_MODE", "off")
+    assert client.post("/bot/handle", json={"transcript": CREATE}).status_code == 503
+
+def test_outbox_reopens_after_app_restart(monkeypatch, tmp_path):
+    crm = FlakyCRM(down=False)
+    monkeypatch.setattr(bot_app, "crm_client_instance", crm)
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", None)
+    monkeypatch.setattr(bot_app, "outbox_instance", None)
+    monkeypatch.setattr(settings, "OUTBOX_MODE", "always")
+    monkeypatch.setattr(settings, "OUTBOX_DB", str(tmp_path / "outbox.db"))
+    monkeypatch.setattr(settings, "OUTBOX_POLL_INTERVAL", 0.01)
+    for _ in range(2):
+        with TestClient(bot_app.app) as restarted:
+            assert restarted.post("/bot/handle", json={"transcript": CREATE}).status_code == 202
+            wait_until(lambda: bot_app.outbox_instance.stats()["delivered"] >= 1)
+        assert bot_app.outbox_instance is None
+    assert len(crm.calls) == 2
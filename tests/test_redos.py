@@ -0,0 +1,138 @@
+# tests/test_redos.py
+import json
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot import metrics, nlu, timeparse
+from bot.settings import settings
+
+client = TestClient(bot_app.app)
+
+# Every entity pattern, by name
+PATTERNS = {
+    **{f"name{i}": p for i, p in enumerate(nlu.NAME_PATTERNS)},
+    **{f"phone{i}": p for i, p in enumerate(nlu.PHONE_PATTERNS)},
+    **{f"city{i}": p for i, p in enumerate(nlu.CITY_PATTERNS)},
+    "source": nlu.SOURCE_RE,
+    "lead_id": nlu.LEAD_ID_RE,
+    "notes": nlu.NOTES_RE,
+    "visit_time": nlu.VISIT_TIME_RE,
+    "iso": timeparse.ISO_RE,
+    "time_hint": timeparse.TIME_HINT_RE,
+    "clock_relative": timeparse.CLOCK_RELATIVE_RE,
+}
+
+# Repeated units that make a backtracking pattern retry at every occurrence.
+# The trailing "!" stops "$" alternatives from ending the search early.
+WORST_UNITS = [
+    "lead ", "lead a", "lead: ", "name ", "at ", "at", "from ", "phone ", "contact ",
+    "notes ", "source ", "1", "1 ", "1-", "12 345 ", "2024-01-01T", "a ", " , ",
+]
+
+
+def worst_case(unit: str, length: int) -> str:
+    return (unit * (length // len(unit) + 1))[:length - 1] + "!"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def warm_parsers():
+    nlu.warm_up()
+
+
+# --- Test linear-time patterns ---
+@pytest.mark.parametrize("unit", WORST_UNITS)
+def test_patterns_stay_fast_on_worst_case_inputs(unit):
+    # Four times the accepted length; the old lazy name pattern took ~250 ms here
+    text = worst_case(unit, 4 * settings.TRANSCRIPT_MAX_LEN)
+    for name, pattern in PATTERNS.items():
+        start = time.perf_counter()
+        pattern.search(text)
+        assert time.perf_counter() - start < 0.05, name
+    for pattern in timeparse.RELATIVE_PATTERNS:
+        start = time.perf_counter()
+        pattern.fullmatch(text.lower())
+        assert time.perf_counter() - start < 0.05
+
+def test_bounded_name_pattern_keeps_matches():
+    assert nlu.extract_entities("Add lead: Rohan Sharma from Gurgaon, phone 9876543210")["name"] == "Rohan Sharma"
+    assert nlu.extract_entities("Customer name Priya Nair phone 9876543210", "LEAD_CREATE")["name"] == "Priya Nair"
+
+# --- Test end-to-end latency ---
+@pytest.mark.parametrize("prefix", [
+    "Add a new lead: ", "Schedule a visit for lead 65ce1c14 at ", "Update lead 65ce1c14 to won notes ", "",
+])
+@pytest.mark.parametrize("unit", ["1 ", "lead ", "at ", "tomorrow 5 pm monday ", "from delhi ", "1:2:"])
+def test_worst_case_transcripts_within_budget(prefix, unit):
+    transcript = prefix + worst_case(unit, settings.TRANSCRIPT_MAX_LEN - len(prefix))
+    start = time.perf_counter()
+    bot_app.analyze_transcript(transcript)
+    assert time.perf_counter() - start < 0.25
+
+def test_digit_phrase_does_not_stall_dateparser():
+    # Language detection made dateparser take seconds on bare numbers
+    start = time.perf_counter()
+    assert timeparse.resolve_time("1 1 1 1 1 1") is None
+    assert time.perf_counter() - start < 0.25
+
+def test_fuzzed_transcripts():
+    vocabulary = [
+        "add", "a", "new", "lead", "lead:", "name", "from", "in", "city", "phone", "contact", "source",
+        "via", "schedule", "visit", "at", "on", "update", "mark", "won", "notes", "notes:", "tomorrow",
+        "5", "pm", "9876543210", "98", "765", "-", "+", ",", ":", "65ce1c14", "gurgaon", "new delhi",
+        "2024-01-01T10:00", "\t", "\n", "é", "🏠",
+    ]
+    rng = random.Random(0)
+    slowest = 0.0
+    for _ in range(300):
+        words = rng.choices(vocabulary, k=rng.randint(0, 250))
+        transcript = " ".join(words)[:settings.TRANSCRIPT_MAX_LEN]
+        start = time.perf_counter()
+        intent, confidence, entities = bot_app.analyze_transcript(transcript)
+        slowest = max(slowest, time.perf_counter() - start)
+        assert set(entities) == set(nlu.ENTITY_KEYS)
+    assert slowest < 0.25
+
+# --- Test time budget ---
+def test_budget_skips_dateparser_and_is_not_cached(monkeypatch):
+    def boom(*args, **kwargs):
+        raise AssertionError("dateparser should not run past the budget")
+    monkeypatch.setattr(timeparse, "_parse_fallback", boom)
+    monkeypatch.setattr(settings, "NLU_TIME_BUDGET_MS", 1e-9)
+    exceeded = metrics.BUDGET_EXCEEDED.value()
+
+    transcript = "Schedule a visit for lead 65ce1c14 at October 20 around 5pm"
+    _, _, entities = nlu.analyze_cached(transcript, bot_app._analyze)
+    assert entities["visit_time"] == "October 20 around 5pm"
+    assert metrics.BUDGET_EXCEEDED.value() == exceeded + 1
+    assert nlu.cache_stats()["size"] == 0
+
+def test_budget_keeps_fast_grammar(monkeypatch):
+    monkeypatch.setattr(settings, "NLU_TIME_BUDGET_MS", 1e-9)
+    _, _, entities = nlu.analyze_cached("Schedule a visit for lead 65ce1c14 at 3 pm tomorrow", bot_app._analyze)
+    assert entities["visit_time"].endswith("T15:00:00")
+
+# --- Test length limit ---
+def test_oversized_transcript_rejected():
+    transcript = "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210 " + "x" * settings.TRANSCRIPT_MAX_LEN
+    resp = client.post("/bot/handle", json={"transcript": transcript})
+    assert resp.status_code == 413
+    assert resp.json()["error"]["type"] == "VALIDATION_ERROR"
+
+def test_oversized_transcript_rejected_in_batch():
+    ok = "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+    resp = client.post("/bot/handle", json={"transcripts": [ok, "x" * (settings.TRANSCRIPT_MAX_LEN + 1), ok]})
+    assert resp.status_code == 200
+    responses = resp.json()["responses"]
+    assert [r.get("status_code") for r in responses] == [None, 413, None]
+    assert responses[0]["intent"] == responses[2]["intent"] == "LEAD_CREATE"
+
+def test_oversized_transcript_rejected_in_stream():
+    body = "\n".join([json.dumps({"transcript": "x" * (settings.TRANSCRIPT_MAX_LEN + 1)}), "Can you help me?"])
+    resp = client.post("/bot/handle/stream", content=body.encode())
+    results = {r["line"]: r for r in map(json.loads, resp.text.splitlines())}
+    assert results[1]["status_code"] == 413
+    assert results[2]["intent"] == "UNKNOWN"
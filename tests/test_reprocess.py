@@ -0,0 +1,51 @@
+# tests/test_reprocess.py
+import json
+
+from bot import app as bot_app
+from bot import reprocess
+from tests.test_batch import LEAD_A, LEAD_B, RecordingCRM
+
+LINES = [
+    json.dumps({"transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"}),
+    "",
+    f"Update lead {LEAD_A} to in progress",
+    json.dumps(f"Update lead {LEAD_B} to lost"),
+    "Create lead name Priya Nair, city Mumbai.",
+    f"Update lead {LEAD_A} to won",
+    "Can you help me?",
+]
+
+
+def run_cli(tmp_path, *args):
+    src, dst = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    src.write_text("\n".join(LINES) + "\n")
+    stats = reprocess.main([str(src), "-o", str(dst), *args])
+    return stats, [json.loads(line) for line in dst.read_text().splitlines()]
+
+# --- Test dry run ---
+def test_dry_run_plans_without_crm_calls(tmp_path, monkeypatch):
+    crm = RecordingCRM()
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+    stats, results = run_cli(tmp_path, "--dry-run", "--workers", "0")
+    assert stats["lines"] == 6
+    assert [r["line"] for r in results] == [1, 3, 4, 5, 6, 7]
+    assert [r.get("intent") for r in results] == ["LEAD_CREATE", "LEAD_UPDATE", "LEAD_UPDATE", None, "LEAD_UPDATE", "UNKNOWN"]
+    assert results[0]["crm_call"] == {"endpoint": "/crm/leads", "method": "POST", "status_code": 200, "dry_run": True}
+    assert results[3]["status_code"] == 400
+    assert crm.calls == []
+
+def test_process_pool_matches_in_process(tmp_path):
+    _, inline = run_cli(tmp_path, "--dry-run", "--workers", "0")
+    _, pooled = run_cli(tmp_path, "--dry-run", "--workers", "2", "--chunk-size", "2")
+    strip = lambda rows: [{k: v for k, v in r.items() if k != "elapsed_ms"} for r in rows]
+    assert strip(pooled) == strip(inline)
+
+# --- Test CRM mode ---
+def test_crm_actions_keep_per_lead_order(tmp_path, monkeypatch):
+    crm = RecordingCRM(delay=0.01)
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+    _, results = run_cli(tmp_path, "--workers", "2", "--chunk-size", "2")
+    assert [r["line"] for r in results] == [1, 3, 4, 5, 6, 7]
+    assert results[1]["result"]["status"] == "IN_PROGRESS" and results[4]["result"]["status"] == "WON"
+    lead_a = [label[1] for event, label in crm.calls if event == "start" and label[0] == LEAD_A]
+    assert lead_a == ["IN_PROGRESS", "WON"]
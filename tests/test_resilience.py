@@ -0,0 +1,170 @@
+# tests/test_resilience.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot.crm_client import (
+    AsyncHTTPCRMClient, CRMError, CRMUnavailable, HTTPCRMClient, _is_crm_failure, _is_retryable,
+)
+from bot.resilience import CircuitBreaker, ResiliencePolicy, RetryBudget, backoff_delay
+
+client = TestClient(bot_app.app)
+
+CREATE = "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def policy(min_calls=4, retries=2, budget=None, clock=None):
+    clock = clock or FakeClock()
+    return ResiliencePolicy(
+        CircuitBreaker(failure_rate=0.5, min_calls=min_calls, window=10, open_seconds=5, clock=clock),
+        budget or RetryBudget(ratio=0.5, min_per_second=0, max_requests=100, clock=clock),
+        is_failure=_is_crm_failure,
+        is_retryable=_is_retryable,
+        max_retries=retries,
+        backoff_base=0,
+    )
+
+
+def transport(statuses, calls):
+    """MockTransport answering with the given status codes in turn (the last one repeats)"""
+    def handler(request):
+        calls.append(request.url.path)
+        status = statuses[min(len(calls), len(statuses)) - 1]
+        if isinstance(status, Exception):
+            raise status
+        return httpx.Response(status, json={"lead_id": "lead-1", "status": "NEW"} if status == 200 else {"detail": "x"})
+    return handler
+
+# --- Test circuit breaker ---
+def test_breaker_opens_half_opens_and_closes():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=10, open_seconds=5, clock=clock)
+    for failed in (False, True, False):
+        breaker.record_failure() if failed else breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.record_failure()                      # 2 of 4 failed
+    assert breaker.state == "open" and not breaker.allow()
+
+    clock.now += 5
+    assert breaker.state == "half_open"
+    assert breaker.allow() and not breaker.allow()  # one trial call at a time
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now += 5
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.stats() == {"state": "closed", "window_calls": 1, "window_failures": 0, "opened": 2, "rejected": 2}
+
+def test_breaker_forgets_old_failures():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_rate=0.5, min_calls=4, window=10, clock=clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 11
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_cancelled_trial_frees_the_slot():
+    clock = FakeClock()
+    crm = policy(clock=clock)
+    for _ in range(4):
+        crm.breaker.record_failure()
+    clock.now += 5
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def cancel_trial():
+        task = asyncio.create_task(crm.acall(hang))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert crm.breaker.state == "half_open"
+    assert crm.breaker.allow()
+
+# --- Test retries ---
+def test_retry_budget_limits_retries():
+    clock = FakeClock()
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_requests=4, clock=clock)
+    assert [budget.try_retry() for _ in range(3)] == [True, True, False]
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_retry() and not budget.try_retry()
+    assert budget.stats()["exhausted"] == 2
+
+def test_backoff_is_jittered_and_capped():
+    assert backoff_delay(0, 0.1, 1.0, rand=lambda: 0.5) == pytest.approx(0.05)
+    assert backoff_delay(10, 0.1, 1.0, rand=lambda: 0.999) < 1.0
+    assert backoff_delay(3, 0.1, 1.0, rand=lambda: 0.0) == 0.0
+
+def test_http_client_retries_only_safe_failures():
+    calls = []
+    crm = HTTPCRMClient("http://crm", transport=httpx.MockTransport(transport([503, 503, 200], calls)), resilience=policy())
+    assert crm.create_lead("Rohan", "9876543210", "Pune")["lead_id"] == "lead-1"
+    assert len(calls) == 3
+
+    # A read timeout may have created the lead: no retry
+    calls.clear()
+    crm = HTTPCRMClient("http://crm", transport=httpx.MockTransport(transport([httpx.ReadTimeout("slow"), 200], calls)),
+                        resilience=policy())
+    with pytest.raises(CRMError) as exc:
+        crm.create_lead("Rohan", "9876543210", "Pune")
+    assert exc.value.status_code == 504 and len(calls) == 1
+
+    # Connection refused: the request never left, so it is retried
+    calls.clear()
+    crm = HTTPCRMClient("http://crm", transport=httpx.MockTransport(transport([httpx.ConnectError("refused"), 200], calls)),
+                        resilience=policy())
+    assert crm.create_lead("Rohan", "9876543210", "Pune")["status"] == "NEW" and len(calls) == 2
+
+def test_client_errors_do_not_trip_the_breaker():
+    calls = []
+    resilience = policy(min_calls=2)
+    crm = HTTPCRMClient("http://crm", transport=httpx.MockTransport(transport([404], calls)), resilience=resilience)
+    for _ in range(5):
+        with pytest.raises(CRMError):
+            crm.update_status("missing", "WON")
+    assert len(calls) == 5 and resilience.breaker.state == "closed"
+
+def test_open_circuit_fails_fast():
+    calls = []
+    resilience = policy(min_calls=4, retries=0)
+    crm = HTTPCRMClient("http://crm", transport=httpx.MockTransport(transport([500], calls)), resilience=resilience)
+    for _ in range(4):
+        with pytest.raises(CRMError):
+            crm.create_lead("Rohan", "9876543210", "Pune")
+    with pytest.raises(CRMUnavailable):
+        crm.create_lead("Rohan", "9876543210", "Pune")
+    assert len(calls) == 4
+
+# --- Test request path ---
+def test_bot_returns_crm_unavailable_while_open(monkeypatch):
+    calls = []
+    resilience = policy(min_calls=2, retries=0)
+    crm = AsyncHTTPCRMClient("http://crm", transport=httpx.MockTransport(transport([500], calls)), resilience=resilience)
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+
+    statuses = [client.post("/bot/handle", json={"transcript": CREATE}).status_code for _ in range(2)]
+    assert statuses == [502, 502]
+    resp = client.post("/bot/handle", json={"transcript": CREATE})
+    assert resp.status_code == 503
+    assert resp.json()["error"]["type"] == "CRM_UNAVAILABLE"
+    assert len(calls) == 2
+
+    metrics = client.get("/bot/metrics").json()["crm"]
+    assert metrics["breaker"]["state"] == "open" and metrics["breaker"]["rejected"] == 1
@@ -0,0 +1,106 @@
+# tests/test_sessions.py
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot import nlu
+from bot.sessions import SessionStore
+
+client = TestClient(bot_app.app)
+
+
+@pytest.fixture(autouse=True)
+def fresh_sessions():
+    bot_app.session_store.clear()
+    yield
+
+
+def turn(transcript: str, session_id: str = "call-1"):
+    return client.post("/bot/handle", json={"transcript": transcript, "metadata": {"session_id": session_id}})
+
+# --- Test carry-over ---
+def test_lead_id_carried_to_next_turn():
+    created = turn("Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210")
+    assert created.status_code == 200
+    lead_id = created.json()["result"]["lead_id"]
+
+    visit = turn("Schedule a visit for him at 5 pm tomorrow")
+    assert visit.status_code == 200
+    body = visit.json()
+    assert body["intent"] == "VISIT_SCHEDULE"
+    assert body["entities"]["lead_id"] == lead_id
+    assert body["session"] == {"id": "call-1", "carried_over": ["lead_id"], "awaiting": []}
+
+def test_explicit_lead_id_wins_and_becomes_current():
+    turn("Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210")
+    body = turn("Update lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab to won").json()
+    assert body["entities"]["lead_id"] == "7b1b8f54-aaaa-bbbb-cccc-1234567890ab"
+    assert body["session"]["carried_over"] == []
+    assert turn("Schedule a visit at 3 pm tomorrow").json()["entities"]["lead_id"] == "7b1b8f54-aaaa-bbbb-cccc-1234567890ab"
+
+def test_sessions_are_isolated():
+    turn("Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210", session_id="a")
+    resp = turn("Schedule a visit for him at 5 pm tomorrow", session_id="b")
+    assert resp.status_code == 400
+    assert resp.json()["session"]["awaiting"] == ["lead_id"]
+
+def test_no_session_stays_stateless():
+    client.post("/bot/handle", json={"transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"})
+    resp = client.post("/bot/handle", json={"transcript": "Schedule a visit for him at 5 pm tomorrow"})
+    assert resp.status_code == 400
+    assert "session" not in resp.json()
+    assert len(bot_app.session_store) == 0
+
+# --- Test completing partial turns ---
+def test_follow_up_completes_missing_entities():
+    first = turn("Add a new lead: Rohan Sharma from Gurgaon")
+    assert first.status_code == 400
+    assert first.json()["session"]["awaiting"] == ["phone"]
+
+    second = turn("his number is 9876543210")
+    assert second.status_code == 200
+    body = second.json()
+    assert body["intent"] == "LEAD_CREATE"
+    assert body["entities"]["name"] == "Rohan Sharma"
+    assert body["entities"]["city"] == "Gurgaon"
+    assert body["entities"]["phone"] == "9876543210"
+    assert body["session"]["carried_over"] == ["name", "city"]
+    assert bot_app.session_store.get("call-1").pending is None
+
+def test_new_complete_request_replaces_pending_turn():
+    turn("Add a new lead: Rohan Sharma from Gurgaon")
+    body = turn("Add a new lead: Priya Nair from Mumbai, phone 9123456780").json()
+    assert body["entities"]["name"] == "Priya Nair"
+    assert body["session"]["carried_over"] == []
+
+def test_follow_up_extracted_in_pool_under_budget(monkeypatch):
+    extract = nlu.extract_entities
+    calls = []
+    monkeypatch.setattr(nlu, "extract_entities", lambda doc, intent=None: calls.append(
+        (threading.current_thread().name, doc.deadline, intent)) or extract(doc, intent))
+    monkeypatch.setattr(bot_app.settings, "NLU_WORKERS", 2)
+    monkeypatch.setattr(bot_app.session_store, "budget", 5.0)
+    turn("Add a new lead: Rohan Sharma from Gurgaon")
+    assert turn("his number is 9876543210").status_code == 200
+    ((thread, deadline, intent),) = calls
+    assert thread.startswith("nlu") and deadline is not None and intent == "LEAD_CREATE"
+
+def test_invalid_session_id():
+    resp = client.post("/bot/handle", json={"transcript": "hi", "metadata": {"session_id": 42}})
+    assert resp.status_code == 400
+
+# --- Test eviction ---
+def test_sessions_expire_and_evict_least_recent():
+    now = [0.0]
+    store = SessionStore(2, ttl=60, required=bot_app.REQUIRED_ENTITIES, clock=lambda: now[0])
+    for session_id in ("a", "b"):
+        store.end_turn(session_id, "LEAD_CREATE", 0.95, {"name": "X", "phone": "1"}, lead_id=session_id)
+    store.get("a")
+    store.end_turn("c", "LEAD_CREATE", 0.95, {"name": "X", "phone": "1"}, lead_id="c")
+    assert store.get("b") is None and store.get("a").lead_id == "a"
+
+    now[0] = 61
+    assert store.get("a") is None
+    assert store.stats()["evictions"] == 1 and store.stats()["expirations"] == 1
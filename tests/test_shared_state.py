@@ -0,0 +1,195 @@
+# tests/test_shared_state.py
+import asyncio
+import json
+import multiprocessing
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot.idempotency import IdempotencyConflict, IdempotencyStore, IdempotencyUnavailable
+from bot.ratelimit import RateLimiter
+from bot.sessions import SessionStore
+from bot.shared_state import SharedState
+
+client = TestClient(bot_app.app)
+
+
+@pytest.fixture
+def state_file(tmp_path):
+    return str(tmp_path / "state")
+
+
+def count_up(path, n):
+    state = SharedState(path, slots=1024)
+    for _ in range(n):
+        state.incr("hits")
+    state.close()
+
+# --- Test counters and values ---
+def test_counters(state_file):
+    state = SharedState(state_file, slots=1024)
+    assert state.counter("a") == 0
+    assert state.incr("a") == 1
+    assert state.incr("a", 5) == 6
+    assert state.incr("b", -2) == -2
+    assert SharedState(state_file, slots=1024).counter("a") == 6
+
+def test_values(state_file):
+    state = SharedState(state_file, slots=1024, value_bytes=16)
+    assert state.get("k") is None
+    state.set("k", b"one")
+    assert state.add("k", b"two") is False
+    assert state.get("k") == b"one"
+    assert state.add("other", b"two") is True
+    assert state.delete("k") is True and state.delete("k") is False
+    assert state.get("k") is None
+    with pytest.raises(ValueError):
+        state.set("k", b"x" * 17)
+
+def test_ttl_and_eviction_bound():
+    now = [1000.0]
+    state = SharedState(slots=8, clock=lambda: now[0])
+    state.set("short", b"v", ttl=10)
+    state.incr("forever")
+    now[0] += 11
+    assert state.get("short") is None
+    assert state.add("short", b"again", ttl=10) is True
+
+    for i in range(20):
+        state.set(f"key-{i}", b"v", ttl=100 + i)
+    assert state.used() == 8
+    assert state.get("key-19") == b"v"
+    assert state.stats()["evictions"] > 0
+
+def test_shape_mismatch_rejected(state_file):
+    SharedState(state_file, slots=1024).close()
+    with pytest.raises(ValueError):
+        SharedState(state_file, slots=2048)
+
+def test_counters_are_atomic_across_processes(state_file):
+    context = multiprocessing.get_context("spawn")
+    processes = [context.Process(target=count_up, args=(state_file, 500)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+    assert all(process.exitcode == 0 for process in processes)
+    assert SharedState(state_file, slots=1024).counter("hits") == 2000
+
+# --- Test rate limiting ---
+def test_sliding_window():
+    now = [600.0]
+    limiter = RateLimiter(SharedState(slots=64), limit=3, window=60, clock=lambda: now[0])
+    assert [limiter.check("c")[0] for _ in range(4)] == [True, True, True, False]
+    assert limiter.check("other")[0] is True
+    # Half a window later, half of the previous window's 4 still counts
+    now[0] += 90
+    assert limiter.check("c")[0] is True
+    allowed, retry_after = limiter.check("c", cost=2)
+    assert not allowed and 0 < retry_after <= 60
+
+def test_handle_returns_429(monkeypatch):
+    monkeypatch.setattr(bot_app, "rate_limiter", RateLimiter(SharedState(slots=64), limit=2, window=60))
+    monkeypatch.setattr(bot_app.settings, "RATE_LIMIT", 2)
+    monkeypatch.setattr(bot_app.settings, "RATE_LIMIT_CLIENT_HEADER", "X-Client-Id")
+    headers = {"X-Client-Id": "agent-7"}
+    body = {"transcript": "hello"}
+    assert client.post("/bot/handle", json=body, headers=headers).status_code == 200
+    assert client.post("/bot/handle", json=body, headers=headers).status_code == 200
+    limited = client.post("/bot/handle", json=body, headers=headers)
+    assert limited.status_code == 429
+    assert limited.json()["error"]["type"] == "RATE_LIMITED"
+    assert int(limited.headers["retry-after"]) == limited.json()["error"]["retry_after"] >= 1
+    assert client.post("/bot/handle", json=body, headers={"X-Client-Id": "agent-8"}).status_code == 200
+    # A batch spends one unit per transcript
+    batch = client.post("/bot/handle", json={"transcripts": ["a", "b", "c"]}, headers={"X-Client-Id": "agent-9"})
+    assert batch.status_code == 429
+
+def test_client_header_ignored_unless_trusted(monkeypatch):
+    monkeypatch.setattr(bot_app, "rate_limiter", RateLimiter(SharedState(slots=64), limit=2, window=60))
+    monkeypatch.setattr(bot_app.settings, "RATE_LIMIT", 2)
+    statuses = [client.post("/bot/handle", json={"transcript": "hello"}, headers={"X-Client-Id": f"fresh-{i}"}).status_code
+                for i in range(3)]
+    assert statuses == [200, 200, 429]
+
+def test_stream_lines_are_rate_limited(monkeypatch):
+    monkeypatch.setattr(bot_app, "rate_limiter", RateLimiter(SharedState(slots=64), limit=2, window=60))
+    monkeypatch.setattr(bot_app.settings, "RATE_LIMIT", 2)
+    resp = client.post("/bot/handle/stream", content=b"hello\nhello\nhello\n")
+    results = {r["line"]: r for r in map(json.loads, resp.text.splitlines())}
+    assert [results[line].get("status_code", 200) for line in (1, 2, 3)] == [200, 200, 429]
+    assert results[3]["error"]["type"] == "RATE_LIMITED"
+
+def test_limiter_survives_app_restart(monkeypatch):
+    monkeypatch.setattr(bot_app, "rate_limiter", None)
+    monkeypatch.setattr(bot_app, "shared_state", None)
+    monkeypatch.setattr(bot_app.settings, "RATE_LIMIT", 100)
+    for _ in range(2):
+        with TestClient(bot_app.app) as restarted:
+            assert restarted.post("/bot/handle", json={"transcript": "hello"}).status_code == 200
+    assert bot_app.rate_limiter.stats()["rejected"] == 0
+
+def test_shared_state_not_created_while_unused(monkeypatch):
+    monkeypatch.setattr(bot_app, "rate_limiter", None)
+    monkeypatch.setattr(bot_app, "shared_state", None)
+    assert client.post("/bot/handle", json={"transcript": "hello"}).status_code == 200
+    assert bot_app.shared_state is None
+    assert client.get("/bot/metrics").json()["rate_limit"] is None
+
+# --- Test idempotency across workers ---
+def test_idempotent_replay_across_stores(state_file):
+    workers = [IdempotencyStore(100, 60, shared=SharedState(state_file, slots=1024), poll_interval=0.005)
+               for _ in range(2)]
+    calls = []
+
+    async def produce():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 200, {"result": {"lead_id": "abc"}}
+
+    async def main():
+        return await asyncio.gather(workers[0].run("k", "ab" * 32, produce), workers[1].run("k", "ab" * 32, produce))
+
+    first, second = asyncio.run(main())
+    assert len(calls) == 1
+    assert first == ((200, {"result": {"lead_id": "abc"}}), False)
+    assert second == ((200, {"result": {"lead_id": "abc"}}), True)
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(workers[1].run("k", "cd" * 32, produce))
+
+def test_failed_attempt_releases_claim(state_file):
+    workers = [IdempotencyStore(100, 60, shared=SharedState(state_file, slots=1024)) for _ in range(2)]
+
+    async def fail():
+        return 503, {"error": {}}
+
+    async def succeed():
+        return 200, {"ok": True}
+
+    assert asyncio.run(workers[0].run("k", "ab" * 32, fail)) == ((503, {"error": {}}), False)
+    assert asyncio.run(workers[1].run("k", "ab" * 32, succeed)) == ((200, {"ok": True}), False)
+
+def test_outcome_too_large_to_share(state_file):
+    workers = [IdempotencyStore(100, 60, shared=SharedState(state_file, slots=1024, value_bytes=64)) for _ in range(2)]
+
+    async def produce():
+        return 200, {"blob": "".join(chr(0x4e00 + i) for i in range(200))}
+
+    asyncio.run(workers[0].run("k", "ab" * 32, produce))
+    with pytest.raises(IdempotencyUnavailable):
+        asyncio.run(workers[1].run("k", "ab" * 32, produce))
+
+# --- Test sessions across workers ---
+def test_sessions_shared_across_stores(state_file):
+    state = SharedState(state_file, slots=1024)
+    first = SessionStore(100, 60, bot_app.REQUIRED_ENTITIES, shared=state)
+    second = SessionStore(100, 60, bot_app.REQUIRED_ENTITIES, shared=SharedState(state_file, slots=1024))
+    assert first.end_turn("call-1", "LEAD_CREATE", 0.95, {"name": "Rohan Sharma", "phone": None}) == ["phone"]
+    first.end_turn("call-2", "LEAD_CREATE", 0.95, {"name": "Priya Nair", "phone": "1"}, lead_id="lead-2")
+
+    assert second.get("call-1").pending == ("LEAD_CREATE", 0.95, (("name", "Rohan Sharma"),))
+    (intent, _, entities), filled = second.resume("call-2", "schedule a visit for her", "VISIT_SCHEDULE", 0.95,
+                                                  {"lead_id": None, "visit_time": "2026-10-18T17:00:00"})
+    assert entities["lead_id"] == "lead-2" and filled == ["lead_id"]
@@ -0,0 +1,102 @@
+# tests/test_sqlite_store.py
+import sqlite3
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import mock_crm
+from bot.sqlite_store import SQLiteLeadStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLiteLeadStore(str(tmp_path / "crm.db"), commit_batch=10, commit_interval=0.05)
+    yield store
+    store.close()
+
+
+def ids(records):
+    return [record.lead_id for record in records]
+
+# --- Test LeadStore interface ---
+def test_queries_match_lead_store(store):
+    a = store.add("Asha", "98765-43210", "Pune")
+    b = store.add("Bina", "9876543210", " pune ", status="WON")
+    c = store.add("Chetan", "9123456780", "Mumbai", source="Instagram")
+    assert ids(store.find_by_phone("98765 43210")) == [a.lead_id, b.lead_id]
+    assert ids(store.find(city="PUNE", status="won")) == [b.lead_id]
+    assert ids(store.find_by_status("NEW")) == [a.lead_id, c.lead_id]
+    assert ids(store.find(limit=2)) == [a.lead_id, b.lead_id]
+
+    store.update(a.lead_id, status="LOST", city="Delhi", notes="moved")
+    assert store[a.lead_id]["city"] == "Delhi" and store.get(a.lead_id).notes == "moved"
+    assert ids(store.find_by_city("delhi")) == [a.lead_id]
+    with pytest.raises(KeyError):
+        store.update("missing", status="WON")
+    assert store.remove(c.lead_id).name == "Chetan"
+    assert c.lead_id not in store and len(store) == 2
+
+def test_indexed_columns_are_used(store):
+    plan = store._conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM leads WHERE city_key = ? AND status_key = ?", ("pune", "NEW")
+    ).fetchall()
+    assert "leads_city_status_key" in str(plan)
+    plan = store._conn.execute("EXPLAIN QUERY PLAN SELECT * FROM leads WHERE phone_key = ?", ("1",)).fetchall()
+    assert "leads_phone_key" in str(plan)
+
+def test_status_is_matched_normalized(store):
+    a = store.add("Asha", "9876543210", "Pune", status="In Progress")
+    b = store.add("Bina", "9123456780", "Pune", status="won")
+    assert ids(store.find(status="IN_PROGRESS")) == [a.lead_id]
+    assert ids(store.find_by_status("WON")) == [b.lead_id]
+    store.update(b.lead_id, status="follow-up")
+    assert ids(store.find(city="pune", status="Follow Up")) == [b.lead_id]
+    assert store[b.lead_id]["status"] == "follow-up"
+
+# --- Test durability and batching ---
+def test_wal_mode_and_persistence(tmp_path):
+    path = str(tmp_path / "crm.db")
+    store = SQLiteLeadStore(path)
+    lead = store.add("Asha", "9876543210", "Pune")
+    store.visits["visit-1"] = {"lead_id": lead.lead_id, "visit_time": "2025-10-02T17:00:00", "status": "SCHEDULED"}
+    assert store._conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    store.close()
+
+    reopened = SQLiteLeadStore(path)
+    assert reopened[lead.lead_id]["name"] == "Asha"
+    assert reopened.visits["visit-1"]["lead_id"] == lead.lead_id
+    reopened.close()
+
+def test_writes_commit_in_batches(store):
+    other = sqlite3.connect(store.path)
+    count = lambda: other.execute("SELECT COUNT(*) FROM leads").fetchone()[0]
+    for i in range(9):
+        store.add(f"Lead {i}", f"9{i:09d}", "Pune")
+    assert count() == 0 and len(store) == 9      # pending, visible only to the writer
+    store.add("Lead 9", "9000000009", "Pune")
+    assert count() == 10 and store.commits == 1  # the 10th write commits the batch
+
+    store.add("Late", "9000000010", "Pune")
+    deadline = time.monotonic() + 2
+    while count() < 11 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert count() == 11                         # flushed by the interval
+    other.close()
+
+# --- Test mock CRM on SQLite ---
+def test_mock_crm_sqlite_storage(tmp_path):
+    mock_crm.use_storage("sqlite", str(tmp_path / "mock.db"))
+    try:
+        crm = TestClient(mock_crm.app)
+        lead_id = crm.post("/crm/leads", json={"name": "Asha", "phone": "9876543210", "city": "Pune"}).json()["lead_id"]
+        assert crm.post(f"/crm/leads/{lead_id}/status", json={"status": "WON"}).json()["status"] == "WON"
+        visit = crm.post("/crm/visits", json={"lead_id": lead_id, "visit_time": "2025-10-02T17:00:00+05:30"}).json()
+        assert mock_crm.VISITS[visit["visit_id"]]["lead_id"] == lead_id
+        results = crm.post("/crm/leads/status:batch", json={"items": [
+            {"lead_id": lead_id, "status": "LOST"}, {"lead_id": "missing", "status": "WON"},
+        ]}).json()["results"]
+        assert [r["status_code"] for r in results] == [200, 404]
+        assert crm.get("/crm/leads", params={"city": "pune", "status": "LOST"}).json()["leads"][0]["lead_id"] == lead_id
+    finally:
+        mock_crm.use_storage("memory")
@@ -0,0 +1,106 @@
+# tests/test_stream.py
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot.settings import settings
+from tests.test_batch import LEAD_A, LEAD_B, RecordingCRM
+
+client = TestClient(bot_app.app)
+
+
+def post_stream(body: bytes):
+    resp = client.post("/bot/handle/stream", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+# --- Test line formats ---
+def test_stream_accepts_json_and_plain_lines():
+    body = "\n".join([
+        json.dumps({"transcript": "Add a new lead: Rohan Sharma from Gurgaon, phone 9876543210"}),
+        "",
+        json.dumps("Can you help me?"),
+        "Create lead name Priya Nair, city Mumbai.",
+    ]).encode()
+    results = {r["line"]: r for r in post_stream(body)}
+    assert sorted(results) == [1, 3, 4]
+    assert results[1]["intent"] == "LEAD_CREATE" and results[1]["result"]["status"] == "NEW"
+    assert results[3]["intent"] == "UNKNOWN"
+    assert results[4]["status_code"] == 400
+    assert all(r["elapsed_ms"] >= 0 for r in results.values())
+
+def test_stream_rejects_overlong_lines(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_MAX_LINE_BYTES", 100)
+    body = b"x" * 250 + b"\nCan you help me?\n" + b"y" * 250
+    results = {r["line"]: r for r in post_stream(body)}
+    assert results[1]["status_code"] == 413 and results[3]["status_code"] == 413
+    assert results[2]["intent"] == "UNKNOWN"
+
+# --- Test per-lead ordering ---
+def test_stream_serializes_per_lead(monkeypatch):
+    crm = RecordingCRM()
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+    body = "\n".join([
+        f"Update lead {LEAD_A} to in progress",
+        f"Update lead {LEAD_B} to lost",
+        f"Update lead {LEAD_A} to won",
+        f"Update lead {LEAD_A} to follow up",
+    ]).encode()
+    results = post_stream(body)
+    assert sorted(r["line"] for r in results) == [1, 2, 3, 4]
+    lead_a = [(event, status) for event, (lead, status) in crm.calls if lead == LEAD_A]
+    assert lead_a == [("start", "IN_PROGRESS"), ("end", "IN_PROGRESS"), ("start", "WON"), ("end", "WON"),
+                      ("start", "FOLLOW_UP"), ("end", "FOLLOW_UP")]
+    assert crm.max_in_flight == 2
+
+def test_stream_rejected_line_keeps_per_lead_order(monkeypatch):
+    crm = RecordingCRM()
+    monkeypatch.setattr(bot_app, "async_crm_client_instance", crm)
+    monkeypatch.setattr(settings, "STREAM_MAX_LINE_BYTES", 200)
+    monkeypatch.setattr(settings, "TRANSCRIPT_MAX_LEN", 100)
+    run_nlu = bot_app.run_nlu
+
+    async def slow_first(transcript):
+        if "in progress" in transcript:
+            await asyncio.sleep(0.1)
+        return await run_nlu(transcript)
+
+    monkeypatch.setattr(bot_app, "run_nlu", slow_first)
+    body = "\n".join([
+        f"Update lead {LEAD_A} to in progress",
+        "x" * 300,
+        "y" * 150,
+        f"Update lead {LEAD_A} to won",
+    ]).encode()
+    results = {r["line"]: r for r in post_stream(body)}
+    assert results[2]["status_code"] == 413 and results[3]["status_code"] == 413
+    lead_a = [(event, status) for event, (lead, status) in crm.calls if lead == LEAD_A]
+    assert lead_a == [("start", "IN_PROGRESS"), ("end", "IN_PROGRESS"), ("start", "WON"), ("end", "WON")]
+
+# --- Test backpressure ---
+def test_stream_stops_reading_while_results_are_unread(monkeypatch):
+    monkeypatch.setattr(settings, "STREAM_WINDOW", 5)
+    consumed = 0
+
+    async def source():
+        nonlocal consumed
+        for _ in range(1000):
+            consumed += 1
+            yield b"Can you help me?\n"
+
+    async def run():
+        stream = bot_app.stream_transcripts(source())
+        first = json.loads(await stream.__anext__())
+        await asyncio.sleep(0.1)
+        read_ahead = consumed
+        rest = [json.loads(line) async for line in stream]
+        return first, read_ahead, rest
+
+    first, read_ahead, rest = asyncio.run(run())
+    assert first["intent"] == "UNKNOWN"
+    # One result taken, so at most window + 1 lines pulled from the source
+    assert read_ahead <= 7
+    assert sorted(r["line"] for r in [first] + rest) == list(range(1, 1001))
@@ -0,0 +1,73 @@
+# tests/test_timeparse.py
+import subprocess
+import sys
+from datetime import datetime
+
+from bot import timeparse
+from bot.nlu import extract_entities, parse_datetime
+
+# Saturday
+REF = datetime(2026, 10, 17, 9, 30)
+
+# --- Test fast-path grammar ---
+def test_iso_passthrough():
+    assert timeparse.resolve_time("2025-10-02T17:00:00+05:30", REF) == "2025-10-02T17:00:00+05:30"
+    assert timeparse.resolve_time("2025-10-02 17:00", REF) == "2025-10-02T17:00:00"
+
+def test_relative_forms():
+    assert timeparse.resolve_time("3 pm tomorrow", REF) == "2026-10-18T15:00:00"
+    assert timeparse.resolve_time("tomorrow at 3:30pm", REF) == "2026-10-18T15:30:00"
+    assert timeparse.resolve_time("next Monday 5pm", REF) == "2026-10-19T17:00:00"
+    assert timeparse.resolve_time("next saturday 11 am", REF) == "2026-10-24T11:00:00"
+    assert timeparse.resolve_time("this saturday at 5 p.m.", REF) == "2026-10-17T17:00:00"
+    assert timeparse.resolve_time("17:45", REF) == "2026-10-17T17:45:00"
+    assert timeparse.resolve_time("noon day after tomorrow", REF) == "2026-10-19T12:00:00"
+
+def test_fast_path_skips_dateparser(monkeypatch):
+    def boom(*args, **kwargs):
+        raise AssertionError("dateparser should not be called")
+    monkeypatch.setattr(timeparse, "_parse_fallback", boom)
+    assert timeparse.resolve_time("5 pm on friday", REF) == "2026-10-23T17:00:00"
+
+def test_no_time_hint_never_loads_dateparser(monkeypatch):
+    calls = []
+    monkeypatch.setattr(timeparse, "_load_dateparser", lambda: calls.append(1))
+    assert timeparse.resolve_time("the blue building", REF) is None
+    assert calls == []
+
+def test_fallback_to_dateparser():
+    assert timeparse.resolve_time("October 20 at 5pm", REF) == "2026-10-20T17:00:00"
+
+def test_invalid_clock_is_rejected():
+    assert timeparse._parse_relative("13 pm tomorrow", REF.date()) is None
+    assert timeparse._parse_relative("25:00", REF.date()) is None
+
+# --- Test cache keyed on reference date ---
+def test_cache_keyed_on_reference_date():
+    timeparse._resolve_for_day.cache_clear()
+    assert timeparse.resolve_time("3 PM  tomorrow.", REF) == "2026-10-18T15:00:00"
+    assert timeparse.resolve_time("3 pm tomorrow", REF.replace(hour=18)) == "2026-10-18T15:00:00"
+    assert timeparse.cache_info().hits == 1
+    assert timeparse.resolve_time("3 pm tomorrow", datetime(2026, 10, 18, 8)) == "2026-10-19T15:00:00"
+
+# --- Test NLU integration ---
+def test_visit_time_entity():
+    entities = extract_entities("Schedule a visit for lead 65ce1c14 at 2025-10-02T17:00:00+05:30", "VISIT_SCHEDULE")
+    assert entities["visit_time"] == "2025-10-02T17:00:00+05:30"
+    entities = extract_entities("Schedule a visit for lead 65ce1c14 at the blue building", "VISIT_SCHEDULE")
+    assert entities["visit_time"] == "the blue building"
+
+def test_parse_datetime_finds_embedded_iso():
+    assert parse_datetime("visit at 2025-10-05T17:00:00+05:30 please", REF) == "2025-10-05T17:00:00+05:30"
+    assert parse_datetime("Can you help me?", REF) is None
+
+# --- Test lazy loading ---
+def test_import_does_not_load_dateparser():
+    code = "import sys, bot.app; print('dateparser' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "False"
+
+def test_warm_up_loads_dateparser():
+    code = "import sys, bot.nlu; bot.nlu.warm_up(); print('dateparser' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "True"
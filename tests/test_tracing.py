@@ -0,0 +1,62 @@
+# tests/test_tracing.py
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from bot import app as bot_app
+from bot import tracing
+from bot.settings import settings
+
+client = TestClient(bot_app.app)
+
+VISIT = "Schedule a visit for lead 7b1b8f54-aaaa-bbbb-cccc-1234567890ab at 3 pm tomorrow"
+
+
+@pytest.fixture
+def slow_log(monkeypatch, tmp_path):
+    """Tracing on with every transcript counted as slow; returns a reader for the log"""
+    path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(settings, "TRACING", True)
+    monkeypatch.setattr(settings, "TRACE_SLOW_MS", 0)
+    monkeypatch.setattr(settings, "TRACE_LOG_FILE", str(path))
+    tracing.shutdown()
+
+    def read():
+        tracing.shutdown()
+        return [json.loads(line) for line in path.read_text().splitlines()] if path.exists() else []
+
+    yield read
+    tracing.shutdown()
+
+# --- Test slow-transcript log ---
+def test_slow_transcript_logged_with_stage_breakdown(slow_log):
+    assert client.post("/bot/handle", json={"transcript": VISIT}).status_code == 200
+    [entry] = slow_log()
+    assert entry["transcript"] == VISIT
+    assert set(entry["stages"]) == {"intent", "entities", "datetime", "crm"}
+    assert entry["stages"]["datetime"] <= entry["stages"]["entities"] <= entry["total_ms"]
+
+def test_sync_path_and_nlu_pool_are_traced(slow_log, monkeypatch):
+    bot_app.process_single_transcript(VISIT)
+    monkeypatch.setattr(settings, "NLU_WORKERS", 2)
+    client.post("/bot/handle", json={"transcript": VISIT.replace("3 pm", "4 pm")})
+    first, second = slow_log()
+    assert "crm" in first["stages"]
+    # Stages recorded on the NLU pool thread still reach the request's trace
+    assert {"intent", "entities", "crm"} <= set(second["stages"])
+
+def test_fast_and_unsampled_transcripts_are_skipped(slow_log, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SLOW_MS", 60000)
+    client.post("/bot/handle", json={"transcript": VISIT})
+    monkeypatch.setattr(settings, "TRACE_SLOW_MS", 0)
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    client.post("/bot/handle", json={"transcript": VISIT})
+    assert slow_log() == []
+
+def test_disabled_tracing_records_nothing(slow_log, monkeypatch):
+    monkeypatch.setattr(settings, "TRACING", False)
+    client.post("/bot/handle", json={"transcript": VISIT})
+    tracing.record("intent", 1.0)  # no active trace: ignored
+    assert tracing._slow_log is None
+    assert slow_log() == []